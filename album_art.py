@@ -0,0 +1,161 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from mutagen.id3 import APIC
+
+import storage
+
+# Covers larger than this (longest side, in pixels) or heavier than
+# MAX_ART_BYTES are resized and recompressed to JPEG before embedding.
+MAX_ART_SIZE = 1000
+MAX_ART_BYTES = 512 * 1024
+JPEG_QUALITY = 88
+THUMB_SIZE = (100, 100)
+
+_MAGIC = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+
+def detect_mime(data):
+    """Return the MIME type of image bytes from their signature, or None."""
+    for magic, mime in _MAGIC:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def art_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+# --- Embedding ---
+
+_prepared = OrderedDict()
+_prepared_lock = threading.Lock()
+PREPARED_CACHE_SIZE = 16
+
+
+def prepare_art(data, max_size=MAX_ART_SIZE, max_bytes=MAX_ART_BYTES, quality=JPEG_QUALITY):
+    """Return (data, mime) ready to embed, resizing/recompressing oversized covers.
+
+    Results are memoized by source hash, so applying one cover to a whole
+    album decodes and compresses it only once.
+    """
+    key = (art_hash(data), max_size, max_bytes, quality)
+    with _prepared_lock:
+        if key in _prepared:
+            _prepared.move_to_end(key)
+            return _prepared[key]
+    mime = detect_mime(data)
+    if mime is None:
+        raise ValueError("지원하지 않는 이미지 형식입니다.")
+    from PIL import Image  # deferred: Pillow is only needed when a cover is actually processed
+    img = Image.open(io.BytesIO(data))  # lazy: only the header is read here
+    if mime not in ('image/jpeg', 'image/png') or len(data) > max_bytes or max(img.size) > max_size:
+        if img.format == 'JPEG':
+            img.draft('RGB', (max_size, max_size))
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((max_size, max_size), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=quality, optimize=True)
+        data, mime = out.getvalue(), 'image/jpeg'
+    result = (data, mime)
+    with _prepared_lock:
+        _prepared[key] = result
+        while len(_prepared) > PREPARED_CACHE_SIZE:
+            _prepared.popitem(last=False)
+    return result
+
+
+def load_art_file(path, **options):
+    with open(path, 'rb') as f:
+        return prepare_art(f.read(), **options)
+
+
+def apply_art(tags, data, mime):
+    """Set the front cover; returns False if the identical picture is already embedded."""
+    current = tags.getall('APIC')
+    if len(current) == 1 and current[0].type == 3 and current[0].data == data:
+        return False
+    tags.delall('APIC')
+    tags.add(APIC(encoding=3, mime=mime, type=3, desc='Cover', data=data))
+    return True
+
+
+# --- Thumbnails ---
+
+class ThumbnailCache:
+    """Thumbnails keyed by image hash, kept in an in-memory LRU backed by PNGs on disk."""
+
+    def __init__(self, size=THUMB_SIZE, capacity=256, directory=None):
+        self.size = size
+        self.capacity = capacity
+        self.directory = directory or storage.cache_dir('thumbs')
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, f"{digest}_{self.size[0]}x{self.size[1]}.png")
+
+    def _remember(self, digest, img):
+        with self.lock:
+            self.memory[digest] = img
+            self.memory.move_to_end(digest)
+            while len(self.memory) > self.capacity:
+                self.memory.popitem(last=False)
+        return img
+
+    def get(self, digest):
+        """Return the cached thumbnail for digest, or None without touching the MP3."""
+        with self.lock:
+            if digest in self.memory:
+                self.memory.move_to_end(digest)
+                return self.memory[digest]
+        path = self._path(digest)
+        if os.path.exists(path):
+            from PIL import Image
+            img = Image.open(path)
+            img.load()
+            return self._remember(digest, img)
+        return None
+
+    def get_or_create(self, data, digest=None):
+        digest = digest or art_hash(data)
+        img = self.get(digest)
+        if img is not None:
+            return img
+        from PIL import Image
+        img = Image.open(io.BytesIO(data))
+        if img.format == 'JPEG':
+            # Let libjpeg decode at a reduced scale instead of full resolution.
+            img.draft('RGB', self.size)
+        img = img.convert('RGBA') if img.mode in ('RGBA', 'LA', 'P') else img.convert('RGB')
+        img.thumbnail(self.size, Image.LANCZOS)
+        # A private temp file per caller, so concurrent creators of the same
+        # digest never write into each other's output.
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix='.thumb-', suffix='.png', delete=False) as tmp:
+            try:
+                img.save(tmp, format='PNG')
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        os.replace(tmp.name, self._path(digest))
+        return self._remember(digest, img)
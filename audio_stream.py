@@ -0,0 +1,191 @@
+import os
+import shutil
+import subprocess
+import time
+
+import metrics
+import mp3_frames
+
+PCM_CHUNK = 256 * 1024
+
+
+class FFmpegError(Exception):
+    """Raised when an FFmpeg subprocess fails."""
+
+
+# --- FFmpeg Pipes ---
+
+def ffmpeg_binary():
+    """Return the FFmpeg executable pydub is configured to use."""
+    from pydub import AudioSegment
+    return AudioSegment.converter
+
+
+def ffmpeg_available():
+    """True if the FFmpeg executable can be found."""
+    try:
+        binary = ffmpeg_binary()
+    except ImportError:
+        return False
+    return bool(binary and shutil.which(binary))
+
+
+def decode_pcm(path, sample_rate=None, channels=None, start_ms=None, duration_ms=None, chunk_size=PCM_CHUNK):
+    """Decode a file with FFmpeg and yield signed 16-bit little-endian PCM chunks."""
+    cmd = [ffmpeg_binary(), '-nostdin', '-loglevel', 'error']
+    if start_ms is not None:
+        cmd += ['-ss', f"{start_ms / 1000:.6f}"]
+    cmd += ['-i', path]
+    if duration_ms is not None:
+        cmd += ['-t', f"{duration_ms / 1000:.6f}"]
+    if sample_rate:
+        cmd += ['-ar', str(sample_rate)]
+    if channels:
+        cmd += ['-ac', str(channels)]
+    cmd += ['-f', 's16le', '-acodec', 'pcm_s16le', '-']
+    op = metrics.current()
+    started = time.perf_counter()
+    decoded = 0
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finished = False
+    try:
+        while True:
+            chunk = proc.stdout.read(chunk_size)
+            if not chunk:
+                break
+            decoded += len(chunk)
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            # The consumer stopped early (cancelled, or an error downstream): stop FFmpeg
+            # and let that exception through instead of FFmpeg's broken-pipe complaint.
+            proc.kill()
+        proc.stdout.close()
+        stderr = proc.stderr.read()
+        proc.stderr.close()
+        returncode = proc.wait()
+        if op is not None:
+            op.counters['pcm_decoded'] = op.counters.get('pcm_decoded', 0) + decoded
+            metrics.ffmpeg_time(op, time.perf_counter() - started)
+        if finished and returncode != 0 and stderr:
+            raise FFmpegError(stderr.decode('utf-8', 'replace').strip())
+
+
+def open_encoder(dst_path, sample_rate, channels, bitrate, extra_args=()):
+    """Start an FFmpeg MP3 encoder that reads s16le PCM from its stdin."""
+    cmd = [ffmpeg_binary(), '-nostdin', '-loglevel', 'error', '-y',
+           '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', '-',
+           '-acodec', 'libmp3lame', '-b:a', f"{bitrate // 1000}k", *extra_args, dst_path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    proc.metrics = (metrics.current(), time.perf_counter())
+    return proc
+
+
+def close_encoder(proc):
+    """Flush the encoder and raise FFmpegError if it failed."""
+    proc.stdin.close()
+    stderr = proc.stderr.read()
+    proc.stderr.close()
+    returncode = proc.wait()
+    op, started = getattr(proc, 'metrics', (None, 0))
+    metrics.ffmpeg_time(op, time.perf_counter() - started)
+    if returncode != 0:
+        raise FFmpegError(stderr.decode('utf-8', 'replace').strip())
+
+
+def decode_bytes(data):
+    """Decode an in-memory run of MP3 frames to s16le PCM at its native rate and channels."""
+    cmd = [ffmpeg_binary(), '-nostdin', '-loglevel', 'error', '-f', 'mp3', '-i', '-',
+           '-f', 's16le', '-acodec', 'pcm_s16le', '-']
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    metrics.ffmpeg_time(metrics.current(), time.perf_counter() - started)
+    metrics.count('pcm_decoded', len(proc.stdout))
+    if proc.returncode != 0:
+        raise FFmpegError(proc.stderr.decode('utf-8', 'replace').strip())
+    return proc.stdout
+
+
+def encode_file(pcm, dst_path, sample_rate, channels, bitrate, extra_args=()):
+    """Encode a short in-memory s16le buffer to an MP3 file."""
+    encoder = open_encoder(dst_path, sample_rate, channels, bitrate, extra_args)
+    try:
+        encoder.stdin.write(pcm)
+        metrics.count('pcm_encoded', len(pcm))
+    except BaseException:
+        encoder.kill()
+        encoder.wait()
+        raise
+    close_encoder(encoder)
+
+
+# --- Merge ---
+
+def transcode_concat(paths, dst_path, sample_rate, channels, bitrate, progress=None):
+    """Decode each input in chunks and feed one encoder, never holding a whole file.
+
+    progress is called after every chunk, so a cancelling callback stops even
+    a long single-file transcode promptly; the encoder is killed and the
+    partial output removed.
+    """
+    expected = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            info = mp3_frames.read_stream_info(f)
+        samples = mp3_frames.frame_count(info) * info.first.samples * sample_rate // info.first.sample_rate
+        expected.append(max(samples * 2 * channels, 1))
+    encoder = open_encoder(dst_path, sample_rate, channels, bitrate)
+    try:
+        for i, path in enumerate(paths):
+            done = 0
+            chunks = decode_pcm(path, sample_rate, channels)
+            try:
+                for chunk in chunks:
+                    encoder.stdin.write(chunk)
+                    metrics.count('pcm_encoded', len(chunk))
+                    done += len(chunk)
+                    if progress:
+                        progress((i + min(done / expected[i], 1.0)) / len(paths))
+            finally:
+                chunks.close()
+    except BaseException:
+        encoder.kill()
+        encoder.wait()
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
+    close_encoder(encoder)
+
+
+MERGE_MODE_LABELS = {
+    'gapless': "무손실, 간격 없음",
+    'lossless': "무손실",
+    'transcode': "재인코딩",
+}
+
+
+def merge_files(paths, dst_path, progress=None, gapless=False):
+    """Merge any number of MP3 files, losslessly when their formats allow it.
+
+    With gapless=True, and when every input carries a LAME header with its
+    encoder delay and FFmpeg is available, the joins are made gapless (only
+    a short bridge around each join is re-encoded).
+    The frame-level paths keep the first file's ID3v2 and ID3v1/APEv2 tags;
+    a transcoded result carries no tags.
+    Returns "gapless", "lossless" or "transcode" depending on the path taken.
+    """
+    if mp3_frames.can_merge_losslessly(paths):
+        if gapless and ffmpeg_available():
+            import effects   # numpy; only needed for the bridges
+            if all(effects.has_gapless_info(p) for p in paths):
+                effects.join_gapless(paths, dst_path, progress)
+                return "gapless"
+        mp3_frames.merge_frames(paths, dst_path, progress)
+        return "lossless"
+    with open(paths[0], 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    first = info.first
+    channels = 1 if first.channel_mode == mp3_frames.CHANNEL_MONO else 2
+    transcode_concat(paths, dst_path, first.sample_rate, channels, mp3_frames.average_bitrate(info), progress)
+    return "transcode"
@@ -0,0 +1,238 @@
+import argparse
+import glob
+import os
+import string
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from mutagen import id3
+from mutagen.id3 import ID3, ID3NoHeaderError
+
+import album_art
+import metrics
+import tag_writer
+
+# Field names accepted on the command line and the ID3 frames they map to.
+FIELDS = {
+    'title': 'TIT2',
+    'artist': 'TPE1',
+    'album': 'TALB',
+    'albumartist': 'TPE2',
+    'genre': 'TCON',
+    'tracknumber': 'TRCK',
+    'date': 'TDRC',
+}
+
+# Placeholders a template may use besides the field names themselves.
+EXTRA_KEYS = ('tracktotal', 'filename', 'dirname', 'index', 'count')
+
+TagResult = namedtuple('TagResult', 'path ok changes error in_place')
+
+
+# --- File Collection ---
+
+def collect_files(targets):
+    """Expand directories (recursively) and glob patterns into a sorted list of MP3 paths."""
+    found = set()
+    for target in targets:
+        if os.path.isdir(target):
+            for root, _, names in os.walk(target):
+                found.update(os.path.join(root, n) for n in names if n.lower().endswith('.mp3'))
+        else:
+            found.update(p for p in glob.glob(target, recursive=True) if os.path.isfile(p))
+    return sorted(found)
+
+
+# --- Mapping ---
+
+def parse_mapping(set_args=(), clear_args=()):
+    """Turn FIELD=TEMPLATE and FIELD arguments into a list of (field, template or None)."""
+    mapping = []
+    for arg in set_args:
+        field, sep, template = arg.partition('=')
+        field = field.strip().lower()
+        if not sep or field not in FIELDS:
+            raise ValueError(f"잘못된 필드 지정입니다: {arg} (사용 가능: {', '.join(FIELDS)})")
+        _check_template(field, template)
+        mapping.append((field, template))
+    for field in clear_args:
+        field = field.strip().lower()
+        if field not in FIELDS:
+            raise ValueError(f"알 수 없는 필드입니다: {field}")
+        mapping.append((field, None))
+    return mapping
+
+
+def _check_template(field, template):
+    """Reject unknown {placeholders} before any file is touched."""
+    try:
+        keys = [name for _, name, _, _ in string.Formatter().parse(template) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"{field} 템플릿이 잘못되었습니다: {template} ({e})")
+    for key in keys:
+        base = key.split('.')[0].split('[')[0]
+        if base not in FIELDS and base not in EXTRA_KEYS:
+            raise ValueError(f"{field} 템플릿에 알 수 없는 항목이 있습니다: {{{key}}} "
+                             f"(사용 가능: {', '.join(list(FIELDS) + list(EXTRA_KEYS))})")
+
+
+def _split_number(text):
+    number, _, total = text.partition('/')
+    try:
+        return int(number), int(total) if total else 0
+    except ValueError:
+        return 0, 0
+
+
+def template_context(path, tags, index, count):
+    """Values available to {placeholders} in a template."""
+    context = {}
+    for field, frame_id in FIELDS.items():
+        frame = tags.get(frame_id)
+        context[field] = str(frame.text[0]) if frame and frame.text else ''
+    context['tracknumber'], context['tracktotal'] = _split_number(context['tracknumber'])
+    context['filename'] = os.path.splitext(os.path.basename(path))[0]
+    context['dirname'] = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    context['index'] = index
+    context['count'] = count
+    return context
+
+
+def apply_mapping(tags, mapping, context):
+    """Apply the mapping to an ID3 object in memory, returning the changed fields."""
+    changes = {}
+    for field, template in mapping:
+        frame_id = FIELDS[field]
+        if template is None:
+            if frame_id in tags:
+                tags.delall(frame_id)
+                changes[field] = None
+            continue
+        try:
+            value = template.format(**context)
+        except KeyError as e:
+            raise ValueError(f"{field} 템플릿에 알 수 없는 항목이 있습니다: {{{e.args[0]}}}")
+        except (ValueError, IndexError) as e:
+            raise ValueError(f"{field} 템플릿을 적용할 수 없습니다: {template} ({e})")
+        current = tags.get(frame_id)
+        if current is None or [str(t) for t in current.text] != [value]:
+            tags.setall(frame_id, [getattr(id3, frame_id)(encoding=3, text=value)])
+            changes[field] = value
+    return changes
+
+
+# --- Writing ---
+
+def _load_tags(path):
+    with metrics.stage('tag_parse'):
+        try:
+            return ID3(path)
+        except ID3NoHeaderError:
+            return ID3()
+
+
+def tag_file(path, mapping, index=1, count=1, dry_run=False, padding=tag_writer.DEFAULT_PADDING, art=None,
+             atomic=False):
+    """Read, modify and save one file. Errors are reported, never raised.
+
+    art is an optional (data, mime) pair from album_art.prepare_art; it is only
+    written to files that do not already carry the identical picture. A tag
+    that fits its padding is patched in place unless atomic is set; see
+    tag_writer.save_tags.
+    """
+    with metrics.operation('tag', path=path) as op:
+        try:
+            tags = _load_tags(path)
+            changes = apply_mapping(tags, mapping, template_context(path, tags, index, count))
+            if art and album_art.apply_art(tags, *art):
+                changes['art'] = f"{art[1]}, {len(art[0]) // 1024} KB"
+            in_place = None
+            if changes and not dry_run:
+                in_place = tag_writer.save_tags(tags, path, padding, atomic)
+            op.set(changes=len(changes), in_place=in_place)
+            return TagResult(path, True, changes, None, in_place)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            op.set(ok=False, error=error)
+            return TagResult(path, False, {}, error, None)
+
+
+def run_batch(paths, mapping, jobs=4, dry_run=False, on_result=None, padding=tag_writer.DEFAULT_PADDING, art=None,
+              atomic=False):
+    """Apply the mapping to every path on a thread pool and return TagResults in input order."""
+    count = len(paths)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(tag_file, path, mapping, i + 1, count, dry_run, padding, art, atomic)
+                   for i, path in enumerate(paths)]
+        results = []
+        for future in futures:
+            result = future.result()
+            if on_result:
+                on_result(result)
+            results.append(result)
+    return results
+
+
+# --- Command Line ---
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="여러 MP3 파일의 태그를 한 번에 편집합니다.")
+    parser.add_argument('targets', nargs='+', help="MP3 파일, 폴더 또는 glob 패턴")
+    parser.add_argument('--set', dest='set_args', action='append', default=[], metavar='FIELD=TEMPLATE',
+                        help="필드 값 지정 (예: title=\"{tracknumber:02d} {title}\")")
+    parser.add_argument('--clear', dest='clear_args', action='append', default=[], metavar='FIELD',
+                        help="필드 삭제")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help="동시에 처리할 파일 수")
+    parser.add_argument('--dry-run', action='store_true', help="파일을 저장하지 않고 결과만 출력")
+    parser.add_argument('--art', metavar='IMAGE', help="모든 파일에 넣을 앨범 아트 이미지")
+    parser.add_argument('--art-max-size', type=int, default=album_art.MAX_ART_SIZE,
+                        help="앨범 아트의 최대 가로/세로 크기 (픽셀), 넘으면 축소 후 JPEG로 재압축")
+    parser.add_argument('--padding', type=int, default=tag_writer.DEFAULT_PADDING,
+                        help="태그를 새로 쓸 때 예약할 ID3 패딩 크기 (바이트)")
+    parser.add_argument('--atomic', action='store_true',
+                        help="태그가 패딩에 들어가도 제자리 갱신 대신 임시 파일로 전체를 다시 써서 교체")
+    return parser
+
+
+def print_result(result):
+    if not result.ok:
+        print(f"실패: {result.path} ({result.error})")
+    elif result.changes:
+        summary = ", ".join(f"{k}={'(삭제)' if v is None else v}" for k, v in result.changes.items())
+        where = "제자리 갱신" if result.in_place else "전체 재작성"
+        print(f"성공: {result.path} [{summary}] ({where})" if result.in_place is not None
+              else f"성공: {result.path} [{summary}]")
+    else:
+        print(f"변경 없음: {result.path}")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        mapping = parse_mapping(args.set_args, args.clear_args)
+    except ValueError as e:
+        print(f"오류: {e}")
+        return 2
+    if not mapping and not args.art:
+        print("오류: --set, --clear 또는 --art 로 변경할 내용을 지정하세요.")
+        return 2
+    art = None
+    if args.art:
+        try:
+            art = album_art.load_art_file(args.art, max_size=args.art_max_size)
+        except (OSError, ValueError) as e:
+            print(f"오류: 앨범 아트를 읽을 수 없습니다. ({e})")
+            return 2
+    paths = collect_files(args.targets)
+    if not paths:
+        print("오류: 처리할 MP3 파일이 없습니다.")
+        return 1
+    results = run_batch(paths, mapping, args.jobs, args.dry_run, on_result=print_result, padding=args.padding, art=art,
+                        atomic=args.atomic)
+    failed = sum(1 for r in results if not r.ok)
+    print(f"\n완료: {len(results) - failed}개 성공, {failed}개 실패")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,346 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import mp3_frames
+
+# --- Synthetic Corpus ---
+
+# MPEG-1 Layer III, 44.1 kHz, joint stereo, no CRC. A frame whose payload is
+# all zeros is valid and decodes to silence, so no encoder is needed.
+HEADER_PREFIX = 0xFFFB
+CBR_BITRATE_INDEX = 9          # 128 kbps
+VBR_BITRATE_INDEXES = (5, 7, 9, 10, 11, 13)
+
+
+def _frame(bitrate_index, padding):
+    raw = struct.pack('>HBB', HEADER_PREFIX, (bitrate_index << 4) | (padding << 1), 0x44)
+    header = mp3_frames.parse_header(raw)
+    return raw + bytes(header.size - 4)
+
+
+def _syncsafe(n):
+    return bytes([(n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F])
+
+
+def _id3_frame(frame_id, body):
+    return frame_id + _syncsafe(len(body)) + b'\x00\x00' + body
+
+
+def synthetic_tag(title, art_bytes=0, padding=1024, seed=0):
+    """Build an ID3v2.4 tag with a title and an optional fake JPEG cover of art_bytes bytes."""
+    frames = _id3_frame(b'TIT2', b'\x03' + title.encode('utf-8'))
+    if art_bytes:
+        rng = random.Random(seed)
+        data = b'\xff\xd8\xff\xe0' + bytes(rng.getrandbits(8) for _ in range(min(art_bytes, 4096)))
+        data = (data * (art_bytes // len(data) + 1))[:art_bytes]
+        frames += _id3_frame(b'APIC', b'\x00image/jpeg\x00\x03Cover\x00' + data)
+    body = frames + bytes(padding)
+    return b'ID3\x04\x00\x00' + _syncsafe(len(body)) + body
+
+
+def write_synthetic_mp3(path, seconds, vbr=False, art_bytes=0, seed=0):
+    """Write a silent MP3 of the given length, CBR or VBR (with a Xing header)."""
+    rng = random.Random(seed)
+    frames = int(seconds * 44100 / 1152)
+    with open(path, 'wb') as f:
+        f.write(synthetic_tag(os.path.basename(path), art_bytes, seed=seed))
+        if vbr:
+            first = mp3_frames.parse_header(_frame(VBR_BITRATE_INDEXES[0], 0))
+            xing_pos = f.tell()
+            f.write(mp3_frames.build_xing_frame(first, 0, 0, [0] * 100))
+            toc = mp3_frames.TocBuilder()
+            cache = {i: _frame(i, 0) for i in VBR_BITRATE_INDEXES}
+            for _ in range(frames):
+                toc.add(f.tell())
+                f.write(cache[rng.choice(VBR_BITRATE_INDEXES)])
+            nbytes = f.tell() - xing_pos
+            f.seek(xing_pos)
+            f.write(mp3_frames.build_xing_frame(first, frames, nbytes, toc.toc(xing_pos, nbytes)))
+        else:
+            # 128 kbps at 44.1 kHz is 417.96 bytes per frame: pad like an encoder would.
+            plain, padded = _frame(CBR_BITRATE_INDEX, 0), _frame(CBR_BITRATE_INDEX, 1)
+            exact = 144 * 128000 / 44100
+            written = 0
+            for i in range(frames):
+                frame = padded if (i + 1) * exact - written >= len(padded) else plain
+                f.write(frame)
+                written += len(frame)
+
+
+CORPUS = (
+    # name, seconds (or 'long'), vbr, art bytes
+    ('cbr_short', 30, False, 0),
+    ('vbr_short', 30, True, 0),
+    ('cbr_art', 30, False, 2 * 1024 * 1024),
+    ('cbr_long', 'long', False, 0),
+    ('vbr_long', 'long', True, 0),
+)
+
+
+def build_corpus(directory, long_minutes):
+    paths = {}
+    for i, (name, seconds, vbr, art) in enumerate(CORPUS):
+        path = os.path.join(directory, f"{name}.mp3")
+        if not os.path.exists(path):
+            write_synthetic_mp3(path, long_minutes * 60 if seconds == 'long' else seconds, vbr, art, seed=i)
+        paths[name] = path
+    return paths
+
+
+# --- Operations ---
+# Each runs in a fresh worker process and returns the number of bytes it wrote.
+
+def op_cut(path, workdir):
+    import mp3_frames
+    out = os.path.join(workdir, 'cut.mp3')
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    duration = mp3_frames.frame_to_ms(info, mp3_frames.frame_count(info))
+    mp3_frames.cut_frames(path, out, duration * 0.25, duration * 0.75)
+    return os.path.getsize(out)
+
+
+def op_merge(path, workdir):
+    import audio_stream
+    out = os.path.join(workdir, 'merged.mp3')
+    audio_stream.merge_files([path, path, path], out)
+    return os.path.getsize(out)
+
+
+def _tag_copy(path, workdir):
+    copy = os.path.join(workdir, 'tagged.mp3')
+    shutil.copyfile(path, copy)
+    return copy
+
+
+def op_tag_save(path, workdir):
+    from mutagen.id3 import ID3, TIT2
+    import tag_writer
+    copy = _tag_copy(path, workdir)
+    tags = ID3(copy)
+    tags.setall('TIT2', [TIT2(encoding=3, text='Benchmark title')])
+    tag_writer.save_tags(tags, copy)
+    return os.path.getsize(copy)
+
+
+def op_tag_save_art(path, workdir):
+    from mutagen.id3 import ID3
+    import album_art
+    import tag_writer
+    copy = _tag_copy(path, workdir)
+    tags = ID3(copy)
+    album_art.apply_art(tags, b'\xff\xd8\xff\xe0' + bytes(256 * 1024), 'image/jpeg')
+    tag_writer.save_tags(tags, copy)
+    return os.path.getsize(copy)
+
+
+def op_load(path, workdir):
+    # What App.load_tags / open_player_file pay on a cold index.
+    import metadata_index
+    metadata_index.read_track(path)
+    return 0
+
+
+def op_seek_index(path, workdir):
+    import mp3_frames
+    with open(path, 'rb') as f:
+        mp3_frames.build_frame_index(f, mp3_frames.read_stream_info(f))
+    return 0
+
+
+def op_legacy_cut(path, workdir):
+    # The original decode-everything path, kept for comparison (needs FFmpeg).
+    from pydub import AudioSegment
+    out = os.path.join(workdir, 'legacy_cut.mp3')
+    audio = AudioSegment.from_mp3(path)
+    audio[len(audio) // 4:len(audio) * 3 // 4].export(out, format='mp3')
+    return os.path.getsize(out)
+
+
+OPERATIONS = {
+    'cut': op_cut,
+    'merge': op_merge,
+    'tag_save': op_tag_save,
+    'tag_save_art': op_tag_save_art,
+    'load': op_load,
+    'seek_index': op_seek_index,
+    'legacy_cut': op_legacy_cut,
+}
+DEFAULT_OPERATIONS = ('cut', 'merge', 'tag_save', 'tag_save_art', 'load', 'seek_index')
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _phase(operation, path, workdir, name):
+    """Run the operation once with its own output folder and cache, returning what it wrote."""
+    phase_dir = os.path.join(workdir, name)
+    os.makedirs(phase_dir)
+    os.environ['MP3_EDITOR_CACHE'] = os.path.join(phase_dir, 'cache')
+    return OPERATIONS[operation](path, phase_dir)
+
+
+def _measure(operation, path, workdir):
+    # A warm-up run pays for imports and the first read of the file, so the
+    # timed run measures the operation alone. tracemalloc slows allocation
+    # down several times, so peak memory comes from a third, untimed run.
+    _phase(operation, path, workdir, 'warmup')
+    start = time.perf_counter()
+    written = _phase(operation, path, workdir, 'timed')
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        _phase(operation, path, workdir, 'memory')
+        _, traced_peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': elapsed, 'tracemalloc_peak': traced_peak, 'peak_rss': _peak_rss_bytes(),
+            'bytes_written': written}
+
+
+def run_one(operation, path, workdir):
+    """Run one measurement in a fresh process so peak RSS belongs to that operation alone."""
+    run_dir = tempfile.mkdtemp(dir=workdir)
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            return pool.submit(_measure, operation, path, run_dir).result()
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def run_suite(paths, operations, repeat, workdir, on_result=None):
+    results = []
+    for case, path in paths.items():
+        for operation in operations:
+            runs = []
+            error = None
+            for _ in range(repeat):
+                try:
+                    runs.append(run_one(operation, path, workdir))
+                except Exception as e:
+                    error = str(e)
+                    break
+            result = {'case': case, 'operation': operation, 'file_bytes': os.path.getsize(path)}
+            if runs:
+                seconds = [r['seconds'] for r in runs]
+                result.update({
+                    'seconds': seconds,
+                    'median_seconds': statistics.median(seconds),
+                    'tracemalloc_peak': max(r['tracemalloc_peak'] for r in runs),
+                    'peak_rss': max((r['peak_rss'] or 0) for r in runs) or None,
+                    'bytes_written': runs[-1]['bytes_written'],
+                })
+            if error:
+                result['error'] = error
+            if on_result:
+                on_result(result)
+            results.append(result)
+    return results
+
+
+def _revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# --- Comparison ---
+
+def compare(base_path, new_path, threshold):
+    """Print per-measurement time/memory ratios; return 1 if anything regressed past threshold."""
+    with open(base_path) as f:
+        base = {(r['case'], r['operation']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+    regressed = False
+    print(f"{'case':<12} {'operation':<14} {'time':>9} {'memory':>9}")
+    for r in new:
+        old = base.get((r['case'], r['operation']))
+        if not old or 'median_seconds' not in old or 'median_seconds' not in r:
+            continue
+        time_ratio = r['median_seconds'] / max(old['median_seconds'], 1e-9)
+        mem_ratio = r['tracemalloc_peak'] / max(old['tracemalloc_peak'], 1)
+        flag = ''
+        if time_ratio > threshold or mem_ratio > threshold:
+            regressed = True
+            flag = '  <-- 회귀'
+        print(f"{r['case']:<12} {r['operation']:<14} {time_ratio:>8.2f}x {mem_ratio:>8.2f}x{flag}")
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="자르기/붙이기/태그/로딩 경로의 시간과 메모리를 측정합니다.")
+    parser.add_argument('--workdir', help="합성 MP3를 보관할 폴더 (기본값: 임시 폴더, 실행 후 삭제)")
+    parser.add_argument('--long-minutes', type=float, default=120, help="긴 파일의 길이 (분)")
+    parser.add_argument('--operations', default=','.join(DEFAULT_OPERATIONS),
+                        help=f"쉼표로 구분한 측정 항목 ({', '.join(OPERATIONS)})")
+    parser.add_argument('--cases', help="쉼표로 구분한 코퍼스 이름 (기본값: 전체)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="결과 JSON 파일 (기본값: 표준 출력)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="두 결과 파일 비교")
+    parser.add_argument('--threshold', type=float, default=1.2, help="회귀로 판단할 비율")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+
+    operations = [op.strip() for op in args.operations.split(',') if op.strip()]
+    unknown = [op for op in operations if op not in OPERATIONS]
+    if unknown:
+        parser.error(f"알 수 없는 측정 항목: {', '.join(unknown)}")
+    workdir = args.workdir or tempfile.mkdtemp(prefix='mp3-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        paths = build_corpus(workdir, args.long_minutes)
+        if args.cases:
+            wanted = {c.strip() for c in args.cases.split(',')}
+            paths = {k: v for k, v in paths.items() if k in wanted}
+        progress = lambda r: print(
+            f"{r['case']:<12} {r['operation']:<14} "
+            + (f"{r['median_seconds'] * 1000:9.1f} ms  {r['tracemalloc_peak'] / 1024:9.0f} KB" if 'median_seconds' in r
+               else f"오류: {r.get('error')}"), file=sys.stderr)
+        results = run_suite(paths, operations, args.repeat, workdir, on_result=progress)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    report = {
+        'meta': {'revision': _revision(), 'python': platform.python_version(), 'platform': platform.platform(),
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'long_minutes': args.long_minutes,
+                 'repeat': args.repeat},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,341 @@
+import argparse
+import importlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# Commands that keep their own argument parsers.
+DELEGATED = {
+    'replaygain': 'loudness',
+    'index': 'metadata_index',
+    'check': 'integrity',
+}
+
+
+def time_arg(text):
+    """argparse type for [[H:]M:]S[.mmm] -> milliseconds."""
+    try:
+        seconds = 0.0
+        for part in text.strip().split(':'):
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"시간 형식이 잘못되었습니다: {text}")
+    return int(round(seconds * 1000))
+
+
+def default_jobs():
+    return os.cpu_count() or 4
+
+
+# --- Output ---
+
+class Reporter:
+    """Prints one line per result: human-readable text, or a JSON object per line with --json."""
+
+    def __init__(self, as_json):
+        self.as_json = as_json
+        self.failed = 0
+        self.count = 0
+
+    def __call__(self, record, text=None):
+        self.count += 1
+        if not record.get('ok', True):
+            self.failed += 1
+        if self.as_json:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        elif not record.get('ok', True):
+            print(f"실패: {record.get('path', '')} ({record.get('error')})")
+        else:
+            print(text)
+
+    def finish(self):
+        if not self.as_json and self.count > 1:
+            print(f"\n완료: {self.count - self.failed}개 성공, {self.failed}개 실패")
+        return 1 if self.failed else 0
+
+
+def run_parallel(fn, items, jobs, report):
+    """Call fn(item) -> (record, text) on a thread pool and report in input order.
+
+    The heavy lifting happens in FFmpeg subprocesses and file I/O, so threads
+    are enough to keep every core busy.
+    """
+    def guarded(item):
+        try:
+            return fn(item)
+        except Exception as e:
+            return {'path': item, 'ok': False, 'error': str(e)}, None
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for record, text in pool.map(guarded, items):
+            report(record, text)
+    return report.finish()
+
+
+# --- info ---
+
+def stream_summary(path):
+    """Header-level facts about one file; reads frame headers and tags, never decodes."""
+    import mp3_frames
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    frames = mp3_frames.frame_count(info)
+    duration_ms = mp3_frames.frame_to_ms(info, frames)
+    vbr = mp3_frames.is_vbr(info)
+    audio_bytes = info.audio_end - info.tag_end
+    record = {
+        'path': path,
+        'ok': True,
+        'duration_ms': round(duration_ms, 3),
+        'frames': frames,
+        'sample_rate': info.first.sample_rate,
+        'channels': 1 if info.first.channel_mode == mp3_frames.CHANNEL_MONO else 2,
+        'vbr': vbr,
+        'bitrate': int(audio_bytes * 8000 / duration_ms) if vbr and duration_ms else info.first.bitrate,
+        'encoder_delay': info.encoder_delay,
+        'encoder_padding': info.encoder_padding,
+        'size': info.file_size,
+        'tags': read_tag_summary(path),
+    }
+    return record
+
+
+def read_tag_summary(path):
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    import batch_tags
+    try:
+        tags = ID3(path)
+    except ID3NoHeaderError:
+        return {}
+    summary = {}
+    for field, frame_id in batch_tags.FIELDS.items():
+        frame = tags.get(frame_id)
+        if frame is not None and frame.text:
+            summary[field] = str(frame.text[0])
+    for frame in tags.getall('TXXX'):
+        if frame.desc.upper().startswith('REPLAYGAIN_') and frame.text:
+            summary[frame.desc.lower()] = str(frame.text[0])
+    art = tags.getall('APIC')
+    if art:
+        summary['art'] = {'mime': art[0].mime, 'bytes': len(art[0].data)}
+    return summary
+
+
+def cmd_info(args, report):
+    import batch_tags
+
+    def one(path):
+        with metrics.operation('info', path=path):
+            record = stream_summary(path)
+        seconds = record['duration_ms'] / 1000
+        text = (f"{path}: {int(seconds // 60)}:{seconds % 60:06.3f}, {record['bitrate'] // 1000} kbps"
+                f"{' VBR' if record['vbr'] else ''}, {record['sample_rate']} Hz, {record['channels']}ch, "
+                f"{record['frames']} 프레임")
+        tags = record['tags']
+        if tags:
+            text += "\n  " + ", ".join(f"{k}={v}" for k, v in tags.items() if k != 'art')
+        return record, text
+
+    return run_parallel(one, batch_tags.collect_files(args.targets) or args.targets, args.jobs, report)
+
+
+# --- tag ---
+
+def cmd_tag(args, report):
+    import album_art
+    import batch_tags
+    mapping = batch_tags.parse_mapping(args.set_args, args.clear_args)
+    if not mapping and not args.art:
+        raise ValueError("--set, --clear 또는 --art 로 변경할 내용을 지정하세요.")
+    art = album_art.load_art_file(args.art, max_size=args.art_max_size) if args.art else None
+    paths = batch_tags.collect_files(args.targets)
+    if not paths:
+        raise ValueError("처리할 MP3 파일이 없습니다.")
+
+    def on_result(result):
+        record = {'path': result.path, 'ok': result.ok, 'changes': result.changes, 'in_place': result.in_place}
+        if not result.ok:
+            record['error'] = result.error
+        if report.as_json or not result.ok:
+            report(record)
+        else:
+            report.count += 1
+            batch_tags.print_result(result)
+
+    batch_tags.run_batch(paths, mapping, args.jobs, args.dry_run, on_result, args.padding, art, args.atomic)
+    return report.finish()
+
+
+# --- cut ---
+
+def cut_output(src, args, many):
+    if args.output and not many:
+        return args.output
+    stem = os.path.splitext(os.path.basename(src))[0]
+    out_dir = args.output or os.path.dirname(os.path.abspath(src))
+    return os.path.join(out_dir, f"{stem}{args.suffix}.mp3")
+
+
+def cmd_cut(args, report):
+    import mp3_frames
+    many = len(args.sources) > 1
+    if many and args.output:
+        os.makedirs(args.output, exist_ok=True)
+    if args.end is not None and args.end <= args.start:
+        raise ValueError("종료 시간은 시작 시간보다 커야 합니다.")
+
+    def one(src):
+        dst = cut_output(src, args, many)
+        start_ms = args.start
+        end_ms = args.end
+        with metrics.operation('cut', path=src, output=dst, fades=bool(args.fade_in or args.fade_out)):
+            if end_ms is None:
+                with open(src, 'rb') as f:
+                    info = mp3_frames.read_stream_info(f)
+                end_ms = mp3_frames.frame_to_ms(info, mp3_frames.frame_count(info))
+            if args.auto_trim:
+                import silence
+                with metrics.stage('silence'):
+                    start_ms, end_ms = silence.suggest_trim(src, start_ms, end_ms, args.threshold)
+            if args.fade_in or args.fade_out:
+                import effects
+                actual = effects.cut_with_fades(src, dst, start_ms, end_ms, args.fade_in, args.fade_out, args.curve)
+            else:
+                actual = mp3_frames.cut_frames(src, dst, start_ms, end_ms)
+        record = {'path': src, 'ok': True, 'output': dst,
+                  'start_ms': round(actual[0], 3), 'end_ms': round(actual[1], 3)}
+        return record, f"{dst}: {actual[0] / 1000:.3f}초 ~ {actual[1] / 1000:.3f}초"
+
+    return run_parallel(one, args.sources, args.jobs, report)
+
+
+# --- merge ---
+
+def cmd_merge(args, report):
+    import audio_stream
+    with metrics.operation('merge', output=args.output, inputs=len(args.inputs)) as op:
+        mode = audio_stream.merge_files(args.inputs, args.output, gapless=args.gapless)
+        op.set(mode=mode)
+    report({'path': args.output, 'ok': True, 'inputs': args.inputs, 'mode': mode},
+           f"{args.output}: {len(args.inputs)}개 파일 ({audio_stream.MERGE_MODE_LABELS[mode]})")
+    return report.finish()
+
+
+# --- split ---
+
+def cmd_split(args, report):
+    import splitter
+    many = len(args.sources) > 1
+
+    def one(src):
+        out_dir = args.out_dir
+        if many:
+            out_dir = os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0])
+        with metrics.operation('split', path=src) as op:
+            with metrics.stage('segments'):
+                segments = splitter.segments_from_args(argparse.Namespace(**{**vars(args), 'source': src}))
+            if args.auto_trim:
+                with metrics.stage('silence'):
+                    segments = splitter.trim_segments(src, segments, args.threshold)
+            tracks = splitter.split_file(src, segments, out_dir, args.name)
+            op.set(tracks=len(tracks))
+        record = {'path': src, 'ok': True, 'tracks': [
+            {'output': path, 'start_ms': round(start, 3), 'end_ms': round(end, 3)} for path, start, end in tracks]}
+        return record, "\n".join(f"{path}: {start / 1000:.3f}초 ~ {end / 1000:.3f}초" for path, start, end in tracks)
+
+    return run_parallel(one, args.sources, args.jobs, report)
+
+
+# --- Parser ---
+
+def _add_common(parser, jobs=True):
+    parser.add_argument('--json', action='store_true', help="결과를 한 줄에 하나씩 JSON으로 출력")
+    if jobs:
+        parser.add_argument('--jobs', type=int, default=default_jobs(), help="동시에 처리할 파일 수")
+
+
+def build_parser():
+    # Both only pull in mutagen and the frame parser; Pillow, NumPy and pydub stay unloaded.
+    import batch_tags
+    import splitter
+    parser = argparse.ArgumentParser(prog='mp3_editor.py', description="MP3 편집기 명령줄 모드 (인자 없이 실행하면 대화형 모드)")
+    metrics.add_arguments(parser)   # taken out of argv by main() so they also work for delegated commands
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    info = sub.add_parser('info', help="길이, 비트레이트, 태그 등 파일 정보 (디코딩 없음)")
+    info.add_argument('targets', nargs='+', help="MP3 파일, 폴더 또는 glob 패턴")
+    _add_common(info)
+    info.set_defaults(func=cmd_info)
+
+    tag = sub.add_parser('tag', aliases=['batch-tag'], help="여러 파일의 태그 일괄 편집")
+    batch_tags.build_parser(tag)
+    tag.add_argument('--json', action='store_true', help="결과를 한 줄에 하나씩 JSON으로 출력")
+    tag.set_defaults(func=cmd_tag)
+
+    cut = sub.add_parser('cut', help="구간 자르기 (페이드가 없으면 무손실)")
+    cut.add_argument('sources', nargs='+', help="자를 MP3 파일 (여러 개면 같은 구간을 각각 자름)")
+    cut.add_argument('--start', type=time_arg, default=0, help="시작 시간 (예: 1:25.350, 기본 0)")
+    cut.add_argument('--end', type=time_arg, help="종료 시간 (기본: 파일 끝)")
+    cut.add_argument('-o', '--output', help="결과 파일 (원본이 여러 개면 폴더)")
+    cut.add_argument('--suffix', default='_cut', help="-o 없이 여러 파일을 자를 때 붙일 이름")
+    cut.add_argument('--fade-in', type=time_arg, default=0, help="페이드 인 길이 (초)")
+    cut.add_argument('--fade-out', type=time_arg, default=0, help="페이드 아웃 길이 (초)")
+    cut.add_argument('--curve', default='linear', help="페이드 곡선 (linear, equal-power, exponential, logarithmic, s-curve)")
+    cut.add_argument('--auto-trim', action='store_true', help="구간 앞뒤의 무음 제거")
+    cut.add_argument('--threshold', type=float, default=-50.0, metavar='DB', help="무음으로 볼 음량 (dBFS)")
+    _add_common(cut)
+    cut.set_defaults(func=cmd_cut)
+
+    merge = sub.add_parser('merge', help="여러 파일 붙이기 (형식이 같으면 무손실)")
+    merge.add_argument('inputs', nargs='+', help="붙일 MP3 파일 (순서대로)")
+    merge.add_argument('-o', '--output', required=True, help="결과 파일")
+    merge.add_argument('--gapless', action='store_true',
+                       help="LAME 지연/패딩 정보가 있으면 이음새만 다시 인코딩해 간격 없이 붙이기 (FFmpeg 필요)")
+    _add_common(merge, jobs=False)
+    merge.set_defaults(func=cmd_merge)
+
+    split = sub.add_parser('split', help="여러 트랙으로 나누기 (원본을 한 번만 읽음)")
+    splitter.build_parser(split)
+    split.add_argument('sources', nargs='*', help="함께 나눌 MP3 파일 (같은 규칙 적용, 파일마다 하위 폴더)")
+    _add_common(split)
+    split.set_defaults(func=cmd_split)
+    return parser
+
+
+def expected_errors():
+    """Exception types that mean a bad input or a failed tool run, not a bug.
+
+    mutagen is only consulted when some command already imported it, so a
+    command that never touched tags does not pay for loading it here.
+    """
+    import audio_stream
+    import mp3_frames
+    errors = (OSError, ValueError, mp3_frames.MP3FrameError, audio_stream.FFmpegError)
+    if 'mutagen' in sys.modules:
+        errors += (sys.modules['mutagen'].MutagenError,)
+    return errors
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    options, argv = metrics.add_arguments(argparse.ArgumentParser(add_help=False, allow_abbrev=False)).parse_known_args(argv)
+    metrics.configure_from_args(options)
+    if argv and argv[0] in DELEGATED:
+        return importlib.import_module(DELEGATED[argv[0]]).main(argv[1:])
+    args = build_parser().parse_args(argv)
+    if args.command == 'split':
+        args.sources = [args.source] + args.sources
+    report = Reporter(getattr(args, 'json', False))
+    try:
+        return args.func(args, report)
+    except Exception as e:
+        if not isinstance(e, expected_errors()):
+            raise
+        if report.as_json:
+            print(json.dumps({'command': args.command, 'ok': False, 'error': str(e)}, ensure_ascii=False))
+        else:
+            print(f"오류: {e}")
+        return 2
@@ -0,0 +1,347 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+
+import audio_stream
+import metrics
+import mp3_frames
+
+# LAME's encoder delay plus the 529-sample MPEG synthesis filter delay: the
+# shift between the PCM fed to the encoder and the decoder's raw output.
+ENCODER_DELAY = 576
+DECODER_DELAY = 529
+
+# Frames decoded ahead of a region so the bit reservoir and the MDCT overlap
+# of its first frame are primed.
+RESERVOIR_LEAD = 8
+# How far the lossless part may be pushed back to start on a frame that does
+# not borrow from the reservoir.
+RESERVOIR_SEARCH = 16
+
+GAIN_CURVES = {
+    'linear': lambda x: x,
+    'equal-power': lambda x: np.sin(x * (np.pi / 2)),
+    'exponential': lambda x: x * x,
+    'logarithmic': lambda x: 1 - (1 - x) ** 2,
+    's-curve': lambda x: (1 - np.cos(x * np.pi)) / 2,
+}
+
+
+# --- Decode / Encode Primitives ---
+
+def _channels(header):
+    return 1 if header.channel_mode == mp3_frames.CHANNEL_MONO else 2
+
+
+def decode_frames(f, info, first, last):
+    """Decode frames [first, last) into an int16 array of shape (samples, channels).
+
+    Row 0 is the first sample of frame `first`, as a decoder playing the whole
+    stream would produce it (given enough lead-in before `first`).
+    """
+    offsets = mp3_frames.frame_offsets(f, info, first, last - first)
+    with metrics.stage('decode'):
+        f.seek(offsets[0])
+        metrics.count('bytes_read', offsets[-1] - offsets[0])
+        pcm = audio_stream.decode_bytes(f.read(offsets[-1] - offsets[0]))
+    channels = _channels(info.first)
+    samples = np.frombuffer(pcm, dtype='<i2').reshape(-1, channels)
+    expected = (len(offsets) - 1) * info.first.samples
+    if len(samples) < expected:
+        # The decoder trimmed its start-up delay; realign to frame boundaries.
+        samples = np.concatenate([np.zeros((expected - len(samples), channels), dtype=np.int16), samples])
+    return samples[:expected]
+
+
+def encode_aligned(pcm, lead, n_frames, info, bitrate, delay=ENCODER_DELAY):
+    """Encode pcm[lead : lead + n_frames * spf] into exactly n_frames frames.
+
+    The encoder input is shifted by the codec delay and a few warm-up frames
+    are encoded and thrown away, so that the returned frames decode to the
+    target samples at the same positions when spliced between copied frames.
+    The bit reservoir is disabled so each returned frame stands on its own.
+    """
+    spf = info.first.samples
+    channels = pcm.shape[1]
+    total_delay = delay + DECODER_DELAY
+    warmup = math.ceil(total_delay / spf) + 1
+    start = lead - warmup * spf + total_delay
+    stop = lead + (n_frames + 1) * spf
+    before = max(-start, 0)
+    after = max(stop - len(pcm), 0)
+    source = pcm[max(start, 0):min(stop, len(pcm))]
+    if before or after:
+        source = np.concatenate([np.zeros((before, channels), dtype=np.int16), source,
+                                 np.zeros((after, channels), dtype=np.int16)])
+    fd, tmp_path = tempfile.mkstemp(suffix='.mp3')
+    os.close(fd)
+    try:
+        with metrics.stage('encode'):
+            audio_stream.encode_file(source.astype('<i2').tobytes(), tmp_path, info.first.sample_rate, channels,
+                                     bitrate, extra_args=('-reservoir', '0'))
+        with open(tmp_path, 'rb') as f:
+            encoded = mp3_frames.read_stream_info(f)
+            frames = []
+            for offset, header in mp3_frames.iter_frames(f, encoded.data_start, encoded.audio_end, encoded.first):
+                f.seek(offset)
+                frames.append(f.read(header.size))
+    finally:
+        os.remove(tmp_path)
+    if encoded.xing_tag and encoded.encoder_delay and encoded.encoder_delay != delay:
+        return encode_aligned(pcm, lead, n_frames, info, bitrate, encoded.encoder_delay)
+    frames = frames[warmup:warmup + n_frames]
+    if len(frames) < n_frames:
+        raise audio_stream.FFmpegError("인코더가 예상보다 적은 프레임을 출력했습니다.")
+    return frames
+
+
+def render_region(f, info, first, last, bitrate, gain=None):
+    """Re-encode frames [first, last) of the source, optionally through a gain function.
+
+    gain(positions) receives absolute sample positions (frame index * spf based)
+    and returns per-sample multipliers.
+    """
+    spf = info.first.samples
+    total = mp3_frames.frame_count(info)
+    warmup = math.ceil((ENCODER_DELAY + DECODER_DELAY) / spf) + 1
+    decode_from = max(first - warmup - RESERVOIR_LEAD, 0)
+    decode_to = min(last + warmup + 1, total)
+    pcm = decode_frames(f, info, decode_from, decode_to)
+    if gain is not None:
+        with metrics.stage('gain'):
+            positions = np.arange(len(pcm), dtype=np.float64) + decode_from * spf
+            pcm = np.clip(pcm * gain(positions)[:, None], -32768, 32767).astype(np.int16)
+    return encode_aligned(pcm, (first - decode_from) * spf, last - first, info, bitrate)
+
+
+# --- Fades ---
+
+def fade_gain(cut_start, cut_length, fade_in, fade_out, curve='linear'):
+    """Build a vectorized gain function for fades measured in samples."""
+    shape = GAIN_CURVES[curve]
+    def gain(positions):
+        pos = positions - cut_start
+        g = np.ones_like(pos)
+        if fade_in:
+            g *= shape(np.clip(pos / fade_in, 0.0, 1.0))
+        if fade_out:
+            g *= shape(np.clip((cut_length - pos) / fade_out, 0.0, 1.0))
+        g[(pos < 0) | (pos >= cut_length)] = 0.0
+        return g
+    return gain
+
+
+def _self_contained_frame(f, info, index, limit):
+    """First frame at or after index (up to limit) whose data does not start in the reservoir."""
+    offsets = mp3_frames.frame_offsets(f, info, index, max(limit - index, 0))
+    for i, offset in enumerate(offsets[:-1]):
+        f.seek(offset)
+        header_bytes = f.read(40)
+        header = mp3_frames.parse_header(header_bytes)
+        if header and mp3_frames.main_data_begin(header_bytes, header) == 0:
+            return index + i
+    return index
+
+
+def cut_with_fades(src_path, dst_path, start_ms, end_ms, fade_in_ms=500, fade_out_ms=500, curve='linear',
+                   progress=None):
+    """Cut [start_ms, end_ms) with fades, re-encoding only the faded head and tail.
+
+    The frames between the fades are copied losslessly. The head region is
+    extended to the next frame that does not reach back into the bit reservoir,
+    so the first copied frame decodes cleanly after the re-encoded ones.
+    Returns the frame-aligned (start_ms, end_ms) that was written.
+    """
+    report = progress or (lambda fraction: None)
+    with open(src_path, 'rb') as src:
+        info = mp3_frames.read_stream_info(src)
+        spf = info.first.samples
+        total = mp3_frames.frame_count(info)
+        a = min(mp3_frames.frame_at_ms(info, start_ms), total)
+        b = min(mp3_frames.frame_at_ms(info, end_ms), total)
+        if b <= a:
+            raise mp3_frames.MP3FrameError("자를 구간에 오디오 프레임이 없습니다.")
+        fade_in = int(fade_in_ms * info.first.sample_rate / 1000)
+        fade_out = int(fade_out_ms * info.first.sample_rate / 1000)
+        head_end = a + math.ceil(fade_in / spf) if fade_in else a
+        tail_start = b - math.ceil(fade_out / spf) if fade_out else b
+        if fade_in and head_end < tail_start:
+            head_end = _self_contained_frame(src, info, head_end, min(head_end + RESERVOIR_SEARCH, tail_start))
+        if head_end >= tail_start:
+            head_end = tail_start = b
+        gain = fade_gain(a * spf, (b - a) * spf, fade_in, fade_out, curve)
+        bitrate = mp3_frames.average_bitrate(info)
+
+        head = render_region(src, info, a, head_end, bitrate, gain) if head_end > a else []
+        report(0.3)
+        tail = render_region(src, info, tail_start, b, bitrate, gain) if b > tail_start else []
+        report(0.6)
+        middle_start, middle_end = mp3_frames.frame_offsets(src, info, head_end, 0)[0], \
+            mp3_frames.frame_offsets(src, info, tail_start, 0)[0]
+
+        toc = mp3_frames.TocBuilder()
+        bitrates = set()
+        try:
+            with metrics.stage('copy'), open(dst_path, 'wb') as dst:
+                mp3_frames.copy_range(src, dst, 0, info.tag_end)
+                xing_pos = dst.tell()
+                dst.write(mp3_frames.build_xing_frame(info.first, 0, 0, [0] * 100))
+                for frame in head:
+                    toc.add(dst.tell())
+                    dst.write(frame)
+                frames = len(head) + len(tail)
+                if middle_end > middle_start:
+                    frames += mp3_frames.copy_frames(src, middle_start, middle_end, info.first, dst, toc, bitrates,
+                                                     lambda done: report(0.6 + 0.4 * done))
+                for frame in tail:
+                    toc.add(dst.tell())
+                    dst.write(frame)
+                audio_end = dst.tell()
+                mp3_frames.copy_range(src, dst, info.audio_end, info.file_size)
+                nbytes = audio_end - xing_pos
+                dst.seek(xing_pos)
+                dst.write(mp3_frames.build_xing_frame(info.first, frames, nbytes, toc.toc(xing_pos, nbytes)))
+        except BaseException:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            raise
+    report(1.0)
+    return mp3_frames.frame_to_ms(info, a), mp3_frames.frame_to_ms(info, b)
+
+
+# --- Gapless Joins ---
+
+def _gapless_fields(info):
+    """(encoder delay, padding) of a stream; LAME's default delay when the file does not say."""
+    if info.xing_tag and (info.encoder_delay or info.encoder_padding):
+        return info.encoder_delay, info.encoder_padding
+    return ENCODER_DELAY, 0
+
+
+def has_gapless_info(path):
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    return bool(info.xing_tag and info.encoder_delay)
+
+
+def render_bridge(fa, ia, fb, ib, bitrate):
+    """Re-encode the end of stream A and the start of stream B into one seamless run of frames.
+
+    A's end padding and B's start-up delay are cut out of the decoded audio,
+    so the join has no gap. The real samples of the bridge are rarely a whole
+    number of frames; see _fit_to_frames for how the remainder is absorbed
+    without blending the two streams. Returns (frames, a_end,
+    b_start): A is copied up to frame a_end and B resumes at frame b_start,
+    which is chosen so it does not borrow from the bit reservoir.
+    """
+    spf = ia.first.samples
+    warmup = math.ceil((ENCODER_DELAY + DECODER_DELAY) / spf) + 1
+    n_a, n_b = mp3_frames.frame_count(ia), mp3_frames.frame_count(ib)
+    _, padding_a = _gapless_fields(ia)
+    delay_b, _ = _gapless_fields(ib)
+    # Positions in each stream's raw decoder output (which includes the 529-sample filter delay).
+    end_a = min(n_a * spf - padding_a + DECODER_DELAY, n_a * spf)
+    start_b = delay_b + DECODER_DELAY
+    a_end = n_a - (math.ceil((n_a * spf - end_a) / spf) + 2)
+    b_start = math.ceil(start_b / spf) + 2
+    b_start = _self_contained_frame(fb, ib, b_start, min(b_start + RESERVOIR_SEARCH, n_b))
+    if a_end <= 0 or b_start >= n_b:
+        raise mp3_frames.MP3FrameError("파일이 너무 짧아 간격 없이 붙일 수 없습니다.")
+
+    decode_from = max(a_end - warmup - RESERVOIR_LEAD, 0)
+    pcm_a = decode_frames(fa, ia, decode_from, n_a)[:end_a - decode_from * spf]
+    pcm_b = decode_frames(fb, ib, 0, min(b_start + warmup + 1, n_b))[start_b:]
+    real = len(pcm_a) - (a_end - decode_from) * spf + (b_start * spf - start_b)
+    pcm_a, real = _fit_to_frames(pcm_a, real, spf)
+    frames = encode_aligned(np.concatenate([pcm_a, pcm_b]), (a_end - decode_from) * spf, real // spf, ia, bitrate)
+    return frames, a_end, b_start
+
+
+def _fit_to_frames(pcm_a, real, spf):
+    """Make the bridge a whole number of frames by trimming or padding A's end.
+
+    The remainder is under one frame. Up to half a frame of A's last samples
+    is dropped; a larger remainder is instead filled up with silence, so at
+    most spf / 2 samples change and a hard cut at the join stays hard.
+    Returns the adjusted A samples and bridge length.
+    """
+    remainder = real % spf
+    if not remainder:
+        return pcm_a, real
+    if remainder <= spf // 2:
+        return pcm_a[:len(pcm_a) - remainder], real - remainder
+    pad = np.zeros((spf - remainder, pcm_a.shape[1]), dtype=pcm_a.dtype)
+    return np.concatenate([pcm_a, pad]), real + spf - remainder
+
+
+def join_gapless(paths, dst_path, progress=None):
+    """Join MP3 files frame by frame, re-encoding only a short bridge at each join.
+
+    Each bridge replaces a few frames on either side of a join (see
+    render_bridge); everything else is copied unchanged. The output carries a
+    LAME tag with the first file's encoder delay and the last file's padding,
+    so gapless players trim exactly the codec's own silence. The first file's
+    ID3v2 and trailing ID3v1/APEv2 tags are kept. All inputs must share one
+    stream format. Returns the total frame count.
+    """
+    report = progress or (lambda fraction: None)
+    infos = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            infos.append(mp3_frames.read_stream_info(f))
+    reference = infos[0].first
+    for path, info in zip(paths, infos):
+        if not mp3_frames.same_format(reference, info.first):
+            raise mp3_frames.MP3FrameError(f"형식이 다른 파일은 무손실로 붙일 수 없습니다: {path}")
+    bitrate = max(mp3_frames.average_bitrate(info) for info in infos)
+
+    # bridges[i] joins paths[i] and paths[i + 1]; ranges[i] is the part of paths[i] copied as-is.
+    bridges = []
+    ranges = [[0, mp3_frames.frame_count(info)] for info in infos]
+    for i in range(len(paths) - 1):
+        with open(paths[i], 'rb') as fa, open(paths[i + 1], 'rb') as fb:
+            frames, a_end, b_start = render_bridge(fa, infos[i], fb, infos[i + 1], bitrate)
+        bridges.append(frames)
+        ranges[i][1] = a_end
+        ranges[i + 1][0] = b_start
+        report(0.5 * (i + 1) / len(paths))
+    for path, (first, last) in zip(paths, ranges):
+        if last <= first:
+            raise mp3_frames.MP3FrameError(f"파일이 너무 짧아 간격 없이 붙일 수 없습니다: {path}")
+
+    gapless = (_gapless_fields(infos[0])[0], _gapless_fields(infos[-1])[1])
+    toc = mp3_frames.TocBuilder()
+    bitrates = set()
+    frames = 0
+    try:
+        with metrics.stage('copy'), open(dst_path, 'wb') as dst:
+            with open(paths[0], 'rb') as src:
+                mp3_frames.copy_range(src, dst, 0, infos[0].tag_end)
+            xing_pos = dst.tell()
+            dst.write(mp3_frames.build_xing_frame(reference, 0, 0, [0] * 100, gapless=gapless))
+            for i, (path, info) in enumerate(zip(paths, infos)):
+                first, last = ranges[i]
+                with open(path, 'rb') as src:
+                    start = mp3_frames.locate_frame(src, info, first)
+                    end = mp3_frames.locate_frame(src, info, last)
+                    frames += mp3_frames.copy_frames(src, start, end, info.first, dst, toc, bitrates)
+                if i < len(bridges):
+                    for frame in bridges[i]:
+                        toc.add(dst.tell())
+                        bitrates.add(mp3_frames.parse_header(frame).bitrate)
+                        dst.write(frame)
+                    frames += len(bridges[i])
+                report(0.5 + 0.5 * (i + 1) / len(paths))
+            nbytes = dst.tell() - xing_pos
+            with open(paths[0], 'rb') as src:
+                mp3_frames.copy_range(src, dst, infos[0].audio_end, infos[0].file_size)
+            dst.seek(xing_pos)
+            dst.write(mp3_frames.build_xing_frame(reference, frames, nbytes, toc.toc(xing_pos, nbytes),
+                                                  vbr=len(bitrates) > 1, gapless=gapless))
+    except BaseException:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
+    return frames
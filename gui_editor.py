@@ -1,73 +1,357 @@
+import sys
+import time
+
+_STARTED = time.perf_counter()
+
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-from PIL import Image
-import os
 import io
-import pygame
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TCON, TRCK, APIC
-from pydub import AudioSegment
+import os
+import audio_stream
+import metrics
+import mp3_frames
+import tag_writer
+from jobs import JobScheduler
+
+# pygame, mutagen, Pillow and the NumPy-based modules (effects, silence,
+# waveform) are imported where they are first needed, so the window can
+# appear before any of them load.
+
+# --- Startup Profiling ---
+
+class StartupProfile:
+    """Phase-by-phase startup timings, printed to stderr with --profile-startup."""
+
+    def __init__(self, enabled, origin):
+        self.enabled = enabled
+        self.origin = origin
+        self.last = origin
+        self.phases = []
+        self.reported = False
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.reported:
+            # Deferred work done after the window appeared, reported as it happens.
+            print(f"[startup] {phase}: {(now - self.last) * 1000:.1f} ms", file=sys.stderr)
+        else:
+            self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def begin(self):
+        """Start timing a deferred phase from now rather than from the previous mark."""
+        self.last = time.perf_counter()
+
+    def report(self):
+        if not self.enabled or self.reported:
+            return
+        for phase, seconds in self.phases:
+            print(f"[startup] {phase:<20} {seconds * 1000:8.1f} ms", file=sys.stderr)
+        print(f"[startup] {'total':<20} {(self.last - self.origin) * 1000:8.1f} ms", file=sys.stderr)
+        self.reported = True
+
+
+startup = StartupProfile('--profile-startup' in sys.argv, _STARTED)
+startup.mark("imports")
 
 # --- Core Logic Functions ---
 
 def parse_time(time_str):
     try:
         if ':' in time_str:
-            parts = list(map(int, time_str.split(':')))
+            parts = time_str.split(':')
             if len(parts) == 2:
-                mins, secs = parts
-                return (mins * 60 + secs) * 1000
-        return int(time_str) * 1000
+                mins, secs = int(parts[0]), float(parts[1])
+                return int(round((mins * 60 + secs) * 1000))
+        return int(round(float(time_str) * 1000))
     except (ValueError, TypeError):
         return None
 
-def format_time(ms):
+def format_time(ms, precise=False):
     if ms is None:
         return "00:00"
+    if precise:
+        mins, secs = divmod(ms / 1000, 60)
+        return f"{int(mins):02d}:{secs:06.3f}"
     seconds = int(ms / 1000)
     mins, secs = divmod(seconds, 60)
     return f"{mins:02d}:{secs:02d}"
 
+def run_cut(src_path, output_path, start_ms, end_ms, fade_in_ms=0, fade_out_ms=0, curve="linear", auto_trim=False,
+            progress=None):
+    """Cut worker: lossless frame copy, re-encoding only the faded edges when fades are requested."""
+    with metrics.operation('cut', path=src_path, output=output_path, fades=bool(fade_in_ms or fade_out_ms)):
+        if auto_trim:
+            import silence
+            with metrics.stage('silence'):
+                start_ms, end_ms = silence.suggest_trim(src_path, start_ms, end_ms)
+        if fade_in_ms or fade_out_ms:
+            import effects
+            effects.cut_with_fades(src_path, output_path, start_ms, end_ms, fade_in_ms, fade_out_ms, curve, progress)
+        else:
+            # Without fades the frames can be copied as-is, no decode/re-encode.
+            mp3_frames.cut_frames(src_path, output_path, start_ms, end_ms, progress)
+    return output_path
+
+def load_frame_index(path, progress=None):
+    # Scheduler jobs take a progress callback; building the index is one sequential pass without one.
+    return mp3_frames.load_frame_index(path)
+
+def run_merge(paths, output_path, progress=None):
+    with metrics.operation('merge', output=output_path, inputs=len(paths)) as op:
+        mode = audio_stream.merge_files(paths, output_path, progress)
+        op.set(mode=mode)
+    return output_path, mode
+
+# --- Playback Source ---
+
+class FileTail(io.RawIOBase):
+    """Read-only view of a file from byte `start` on, which the reader sees as a whole file.
+
+    Playback is fed from a frame's byte offset this way, so it starts exactly
+    on that frame instead of relying on the decoder's own (approximate) seek.
+    """
+
+    def __init__(self, path, start):
+        self.f = open(path, 'rb')
+        self.start = start
+        self.f.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.f.readinto(buffer)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos += self.start
+        pos = self.f.seek(pos, whence)
+        if pos < self.start:
+            pos = self.f.seek(self.start)
+        return pos - self.start
+
+    def tell(self):
+        return self.f.tell() - self.start
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+# --- Waveform View ---
+
+class WaveformView(ctk.CTkCanvas):
+    """Zoomable waveform with draggable start/end markers, drawn from cached peaks."""
+
+    MARKER_GRAB_PX = 6
+
+    def __init__(self, master, on_marker_change=None, height=110):
+        super().__init__(master, height=height, bg="#1f1f1f", highlightthickness=0)
+        self.on_marker_change = on_marker_change
+        self.peaks = None
+        self.view = (0.0, 1.0)
+        self.markers = {'start': None, 'end': None}
+        self.playhead = None
+        self.dragging = None
+        self.drag_origin = None
+        self.bind("<Configure>", lambda e: self.redraw())
+        self.bind("<ButtonPress-1>", self.on_press)
+        self.bind("<B1-Motion>", self.on_drag)
+        self.bind("<ButtonRelease-1>", lambda e: setattr(self, 'dragging', None))
+        self.bind("<MouseWheel>", lambda e: self.zoom(e.x, 0.8 if e.delta > 0 else 1.25))
+        self.bind("<Button-4>", lambda e: self.zoom(e.x, 0.8))
+        self.bind("<Button-5>", lambda e: self.zoom(e.x, 1.25))
+
+    def set_peaks(self, peaks):
+        self.peaks = peaks
+        self.view = (0.0, peaks.duration_ms if peaks else 1.0)
+        self.redraw()
+
+    def set_markers(self, start_ms, end_ms):
+        self.markers = {'start': start_ms, 'end': end_ms}
+        self.redraw()
+
+    def set_playhead(self, ms):
+        self.playhead = ms
+        self.delete("playhead")
+        self.draw_line(ms, "#ffffff", "playhead")
+
+    def x_to_ms(self, x):
+        start, end = self.view
+        return start + (end - start) * min(max(x, 0), self.winfo_width()) / max(self.winfo_width(), 1)
+
+    def ms_to_x(self, ms):
+        start, end = self.view
+        return (ms - start) / max(end - start, 1e-9) * self.winfo_width()
+
+    def zoom(self, x, factor):
+        if not self.peaks:
+            return
+        center = self.x_to_ms(x)
+        start, end = self.view
+        span = min(max((end - start) * factor, 50.0), self.peaks.duration_ms)
+        ratio = x / max(self.winfo_width(), 1)
+        start = min(max(center - span * ratio, 0.0), self.peaks.duration_ms - span)
+        self.view = (start, start + span)
+        self.redraw()
+
+    def on_press(self, event):
+        self.dragging = None
+        for target, ms in self.markers.items():
+            if ms is not None and abs(self.ms_to_x(ms) - event.x) <= self.MARKER_GRAB_PX:
+                self.dragging = target
+                return
+        self.drag_origin = (event.x, self.view)
+
+    def on_drag(self, event):
+        if not self.peaks:
+            return
+        if self.dragging:
+            ms = self.x_to_ms(event.x)
+            self.markers[self.dragging] = ms
+            if self.on_marker_change:
+                self.on_marker_change(self.dragging, ms)
+            self.redraw()
+        elif self.drag_origin:
+            x0, (start, end) = self.drag_origin
+            shift = (x0 - event.x) / max(self.winfo_width(), 1) * (end - start)
+            shift = min(max(shift, -start), self.peaks.duration_ms - end)
+            self.view = (start + shift, end + shift)
+            self.redraw()
+
+    def draw_line(self, ms, color, tag):
+        if ms is not None and self.view[0] <= ms <= self.view[1]:
+            x = self.ms_to_x(ms)
+            self.create_line(x, 0, x, self.winfo_height(), fill=color, width=2, tags=tag)
+
+    def redraw(self):
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        if not self.peaks or width <= 1:
+            return
+        start_ms, end_ms = self.markers['start'], self.markers['end']
+        if start_ms is not None and end_ms is not None and start_ms < end_ms:
+            self.create_rectangle(self.ms_to_x(start_ms), 0, self.ms_to_x(end_ms), height, fill="#2d3b4f", outline="")
+        mins, maxs = self.peaks.columns(self.view[0], self.view[1], width)
+        mid = height / 2
+        for x in range(width):
+            self.create_line(x, mid - maxs[x] * mid, x, mid - mins[x] * mid + 1, fill="#3a8fd9")
+        self.draw_line(start_ms, "#4caf50", "marker")
+        self.draw_line(end_ms, "#e05252", "marker")
+        self.draw_line(self.playhead, "#ffffff", "playhead")
+
+
 # --- GUI Application ---
 
 class App(ctk.CTk):
     def __init__(self):
         super().__init__()
+        startup.mark("window")
 
         # --- Font Definition ---
         self.main_font = ctk.CTkFont(family="Malgun Gothic", size=12)
         self.bold_font = ctk.CTkFont(family="Malgun Gothic", size=13, weight="bold")
 
         self.title("MP3 편집기")
-        self.geometry("550x700")
+        self.geometry("550x860")
         self.resizable(False, False)
 
-        pygame.mixer.init()
+        self.mixer = None
+        self._index = None
+        self._thumbnails = None
+        self.player_file_path = ""
+        self.jobs = JobScheduler(max_workers=2)
+        # Frame indexes and waveforms load on their own pool, so opening a file
+        # never queues a cut or merge behind a whole-file decode.
+        self.loads = JobScheduler(max_workers=2, name='mp3-load')
+        self.load_generation = 0
+        self.load_jobs = []   # background loads for the current player file
         self.playback_active = False
         self.paused = False
         self.song_length_ms = 0
         self.seek_pos_ms = 0
+        self.pos_base_ms = 0
+        self.frame_index = None
+        self.playback_source = None   # FileTail currently loaded into the player
 
         ctk.set_appearance_mode("System")
         ctk.set_default_color_theme("blue")
 
-        self.tab_view = ctk.CTkTabview(self, width=500)
+        self.tab_view = ctk.CTkTabview(self, width=500, command=self.on_tab_change)
         self.tab_view.pack(padx=20, pady=10, fill="both", expand=True)
         self.tab_view.add("태그 편집기")
         self.tab_view.add("오디오 편집기")
 
+        # The audio tab is only built the first time it is opened.
         self.setup_tag_editor_tab(self.tab_view.tab("태그 편집기"))
-        self.setup_audio_editor_tab(self.tab_view.tab("오디오 편집기"))
-
-        self.status_label = ctk.CTkLabel(self, text="준비 완료.", anchor="w", font=self.main_font)
-        self.status_label.pack(side="bottom", fill="x", padx=10, pady=5)
+        self.audio_tab_ready = False
+        startup.mark("tag tab")
+
+        status_frame = ctk.CTkFrame(self, fg_color="transparent")
+        status_frame.pack(side="bottom", fill="x", padx=10, pady=5)
+        self.cancel_button = ctk.CTkButton(status_frame, text="작업 취소", width=80, font=self.main_font, state="disabled", command=self.jobs.cancel_all)
+        self.cancel_button.pack(side="right")
+        self.status_label = ctk.CTkLabel(status_frame, text="준비 완료.", anchor="w", font=self.main_font)
+        self.status_label.pack(side="left", fill="x", expand=True)
         
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.poll_jobs()
+        startup.mark("status bar")
+        self.after_idle(self.on_first_idle)
+
+    def on_first_idle(self):
+        startup.mark("first draw")
+        startup.report()
 
     def on_closing(self):
-        pygame.mixer.quit()
+        self.jobs.shutdown()
+        self.loads.shutdown()
+        if self.mixer is not None:
+            self.mixer.quit()
+        if self._index is not None:
+            self._index.close()
         self.destroy()
 
+    # --- Deferred Initialization ---
+    @property
+    def index(self):
+        if self._index is None:
+            from metadata_index import MetadataIndex
+            self._index = MetadataIndex()
+        return self._index
+
+    @property
+    def thumbnails(self):
+        if self._thumbnails is None:
+            import album_art
+            self._thumbnails = album_art.ThumbnailCache()
+        return self._thumbnails
+
+    def on_tab_change(self):
+        if self.tab_view.get() == "오디오 편집기" and not self.audio_tab_ready:
+            startup.begin()
+            self.setup_audio_editor_tab(self.tab_view.tab("오디오 편집기"))
+            self.audio_tab_ready = True
+            startup.mark("audio tab")
+
+    def music(self):
+        """pygame's music player; pygame and the mixer are started on first use."""
+        if self.mixer is None:
+            startup.begin()
+            import pygame
+            pygame.mixer.init()
+            self.mixer = pygame.mixer
+            startup.mark("mixer")
+        return self.mixer.music
+
+    def music_busy(self):
+        return self.mixer is not None and self.mixer.music.get_busy()
+
     # --- Tab 1: Tag Editor ---
     def setup_tag_editor_tab(self, tab):
         self.tag_file_path = ""
@@ -91,7 +375,10 @@ class App(ctk.CTk):
 
     # --- Tab 2: Audio Editor ---
     def setup_audio_editor_tab(self, tab):
-        self.player_file_path = ""
+        import effects
+        import pcm_cache
+        # Waveform, auto-trim and silence analysis share one decode per file.
+        pcm_cache.enable()
         tab.grid_columnconfigure(0, weight=1)
 
         cutter_frame = ctk.CTkFrame(tab)
@@ -104,21 +391,24 @@ class App(ctk.CTk):
         self.player_file_label = ctk.CTkLabel(cutter_frame, text="선택된 파일 없음", font=self.main_font)
         self.player_file_label.grid(row=2, column=0, columnspan=4, padx=10, pady=(0, 10))
 
+        self.waveform = WaveformView(cutter_frame, on_marker_change=self.on_marker_change, height=110)
+        self.waveform.grid(row=3, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
+
         self.time_label = ctk.CTkLabel(cutter_frame, text="00:00 / 00:00", font=self.main_font)
-        self.time_label.grid(row=3, column=0, columnspan=4, pady=5)
+        self.time_label.grid(row=4, column=0, columnspan=4, pady=5)
 
         self.progress_slider = ctk.CTkSlider(cutter_frame, from_=0, to=100, command=self.seek_audio)
-        self.progress_slider.grid(row=4, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
+        self.progress_slider.grid(row=5, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
         self.progress_slider.set(0)
 
         controls_frame = ctk.CTkFrame(cutter_frame, fg_color="transparent")
-        controls_frame.grid(row=5, column=0, columnspan=4, pady=5)
+        controls_frame.grid(row=6, column=0, columnspan=4, pady=5)
         self.play_button = ctk.CTkButton(controls_frame, text="▶", width=50, font=self.main_font, command=self.play_audio).pack(side="left", padx=5)
         self.pause_button = ctk.CTkButton(controls_frame, text="⏸", width=50, font=self.main_font, command=self.pause_audio).pack(side="left", padx=5)
         self.stop_button = ctk.CTkButton(controls_frame, text="⏹", width=50, font=self.main_font, command=self.stop_audio).pack(side="left", padx=5)
 
         time_set_frame = ctk.CTkFrame(cutter_frame)
-        time_set_frame.grid(row=6, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
+        time_set_frame.grid(row=7, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
         time_set_frame.grid_columnconfigure(1, weight=1)
         ctk.CTkLabel(time_set_frame, text="시작:", font=self.main_font).grid(row=0, column=0, padx=(10,0))
         self.start_time_entry = ctk.CTkEntry(time_set_frame, font=self.main_font)
@@ -127,29 +417,37 @@ class App(ctk.CTk):
         ctk.CTkLabel(time_set_frame, text="종료:", font=self.main_font).grid(row=1, column=0, padx=(10,0), pady=5)
         self.end_time_entry = ctk.CTkEntry(time_set_frame, font=self.main_font)
         self.end_time_entry.grid(row=1, column=1, padx=5, pady=5, sticky="ew")
+        for entry in (self.start_time_entry, self.end_time_entry):
+            entry.bind("<Return>", lambda e: self.sync_markers_from_entries())
+            entry.bind("<FocusOut>", lambda e: self.sync_markers_from_entries())
         ctk.CTkButton(time_set_frame, text="설정", width=50, font=self.main_font, command=lambda: self.set_time_from_player('end')).grid(row=1, column=2, padx=(0,10), pady=5)
 
         fade_frame = ctk.CTkFrame(cutter_frame, fg_color="transparent")
-        fade_frame.grid(row=7, column=0, columnspan=4, pady=5)
+        fade_frame.grid(row=8, column=0, columnspan=4, pady=5)
         self.fade_in_var = ctk.StringVar(value="off")
         self.fade_out_var = ctk.StringVar(value="off")
-        ctk.CTkCheckBox(fade_frame, text="페이드 인 (0.5초)", font=self.main_font, variable=self.fade_in_var, onvalue="on", offvalue="off").pack(side="left", padx=10)
-        ctk.CTkCheckBox(fade_frame, text="페이드 아웃 (0.5초)", font=self.main_font, variable=self.fade_out_var, onvalue="on", offvalue="off").pack(side="left", padx=10)
-
-        ctk.CTkButton(cutter_frame, text="자르기 & 저장", height=40, font=self.main_font, command=self.cut_audio).grid(row=8, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
+        ctk.CTkCheckBox(fade_frame, text="페이드 인", font=self.main_font, variable=self.fade_in_var, onvalue="on", offvalue="off").pack(side="left", padx=5)
+        ctk.CTkCheckBox(fade_frame, text="페이드 아웃", font=self.main_font, variable=self.fade_out_var, onvalue="on", offvalue="off").pack(side="left", padx=5)
+        self.fade_length_entry = ctk.CTkEntry(fade_frame, width=50, font=self.main_font)
+        self.fade_length_entry.insert(0, "0.5")
+        self.fade_length_entry.pack(side="left", padx=(5, 0))
+        ctk.CTkLabel(fade_frame, text="초", font=self.main_font).pack(side="left", padx=(2, 5))
+        self.fade_curve_var = ctk.StringVar(value="linear")
+        ctk.CTkOptionMenu(fade_frame, values=list(effects.GAIN_CURVES), variable=self.fade_curve_var, width=110, font=self.main_font).pack(side="left", padx=5)
+        self.auto_trim_var = ctk.StringVar(value="off")
+        ctk.CTkCheckBox(fade_frame, text="무음 자동 제거", font=self.main_font, variable=self.auto_trim_var, onvalue="on", offvalue="off").pack(side="left", padx=5)
+
+        ctk.CTkButton(cutter_frame, text="자르기 & 저장", height=40, font=self.main_font, command=self.cut_audio).grid(row=9, column=0, columnspan=4, padx=10, pady=10, sticky="ew")
 
         merge_frame = ctk.CTkFrame(tab)
         merge_frame.grid(row=1, column=0, padx=10, pady=20, sticky="ew")
-        merge_frame.grid_columnconfigure(1, weight=1)
+        merge_frame.grid_columnconfigure((0, 1), weight=1)
         ctk.CTkLabel(merge_frame, text="MP3 붙이기", font=self.bold_font).grid(row=0, column=0, columnspan=2, pady=10)
-        self.merge_file1_path = ""
-        self.merge_file2_path = ""
-        ctk.CTkButton(merge_frame, text="첫 번째 파일", font=self.main_font, command=self.open_merge_file1).grid(row=1, column=0, padx=10, pady=5)
-        self.merge_file1_label = ctk.CTkLabel(merge_frame, text="파일 없음", font=self.main_font)
-        self.merge_file1_label.grid(row=1, column=1, padx=10, pady=5, sticky="w")
-        ctk.CTkButton(merge_frame, text="두 번째 파일", font=self.main_font, command=self.open_merge_file2).grid(row=2, column=0, padx=10, pady=5)
-        self.merge_file2_label = ctk.CTkLabel(merge_frame, text="파일 없음", font=self.main_font)
-        self.merge_file2_label.grid(row=2, column=1, padx=10, pady=5, sticky="w")
+        self.merge_paths = []
+        ctk.CTkButton(merge_frame, text="파일 추가", font=self.main_font, command=self.add_merge_files).grid(row=1, column=0, padx=10, pady=5, sticky="ew")
+        ctk.CTkButton(merge_frame, text="목록 비우기", font=self.main_font, command=self.clear_merge_files).grid(row=1, column=1, padx=10, pady=5, sticky="ew")
+        self.merge_list_label = ctk.CTkLabel(merge_frame, text="파일 없음", font=self.main_font, justify="left", anchor="w")
+        self.merge_list_label.grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky="w")
         ctk.CTkButton(merge_frame, text="붙이기 & 저장", font=self.main_font, command=self.merge_audio).grid(row=3, column=0, columnspan=2, padx=10, pady=10, sticky="ew")
 
     def open_tag_file(self):
@@ -160,44 +458,55 @@ class App(ctk.CTk):
 
     def load_tags(self):
         try:
-            audio = MP3(self.tag_file_path, ID3=ID3)
-            if audio.tags is None: audio.add_tags()
-            for entry in self.entries.values(): entry.delete(0, "end")
-            self.entries["제목"].insert(0, audio.tags.get('TIT2', [''])[0])
-            self.entries["아티스트"].insert(0, audio.tags.get('TPE1', [''])[0])
-            self.entries["앨범"].insert(0, audio.tags.get('TALB', [''])[0])
-            self.entries["장르"].insert(0, audio.tags.get('TCON', [''])[0])
-            self.entries["트랙 번호"].insert(0, audio.tags.get('TRCK', [''])[0])
-            if 'APIC:' in audio.tags:
-                img = Image.open(io.BytesIO(audio.tags['APIC:'].data))
-                self.art_image_label.configure(image=ctk.CTkImage(light_image=img, dark_image=img, size=(100, 100)), text="")
-            else:
-                self.art_image_label.configure(image=None, text="아트 없음")
+            with metrics.operation('load_tags', path=self.tag_file_path):
+                self.fill_tag_entries()
         except Exception as e:
-            messagebox.showerror("오류", f"태그 로딩 오류: {e}")
+            self.show_load_error("태그 로딩 오류", self.tag_file_path, e)
+
+    def fill_tag_entries(self):
+        info = self.index.lookup(self.tag_file_path)
+        for entry in self.entries.values(): entry.delete(0, "end")
+        self.entries["제목"].insert(0, info.title)
+        self.entries["아티스트"].insert(0, info.artist)
+        self.entries["앨범"].insert(0, info.album)
+        self.entries["장르"].insert(0, info.genre)
+        self.entries["트랙 번호"].insert(0, info.track)
+        if info.art_hash:
+            img = self.thumbnails.get(info.art_hash)
+            if img is None:
+                from mutagen.id3 import ID3
+                img = self.thumbnails.get_or_create(ID3(self.tag_file_path).getall('APIC')[0].data, info.art_hash)
+            self.art_image_label.configure(image=ctk.CTkImage(light_image=img, dark_image=img, size=(100, 100)), text="")
+        else:
+            self.art_image_label.configure(image=None, text="아트 없음")
 
     def change_album_art(self):
         path = filedialog.askopenfilename(filetypes=[("Image files", "*.jpg *.jpeg *.png")])
         if path:
             self.new_art_path = path
-            img = Image.open(self.new_art_path)
+            with open(path, 'rb') as f:
+                img = self.thumbnails.get_or_create(f.read())
             self.art_image_label.configure(image=ctk.CTkImage(light_image=img, dark_image=img, size=(100, 100)))
 
     def save_tags(self):
         if not self.tag_file_path: return messagebox.showwarning("경고", "MP3 파일을 먼저 열어주세요.")
         try:
-            audio = MP3(self.tag_file_path, ID3=ID3)
-            if audio.tags is None: audio.add_tags()
-            audio.tags['TIT2'] = TIT2(encoding=3, text=self.entries["제목"].get())
-            audio.tags['TPE1'] = TPE1(encoding=3, text=self.entries["아티스트"].get())
-            audio.tags['TALB'] = TALB(encoding=3, text=self.entries["앨범"].get())
-            audio.tags['TCON'] = TCON(encoding=3, text=self.entries["장르"].get())
-            audio.tags['TRCK'] = TRCK(encoding=3, text=self.entries["트랙 번호"].get())
-            if self.new_art_path:
-                with open(self.new_art_path, 'rb') as f:
-                    audio.tags.delall('APIC')
-                    audio.tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=f.read()))
-            audio.save()
+            with metrics.operation('save_tags', path=self.tag_file_path):
+                import album_art
+                from mutagen.mp3 import MP3
+                from mutagen.id3 import ID3, TIT2, TPE1, TALB, TCON, TRCK
+                audio = MP3(self.tag_file_path, ID3=ID3)
+                if audio.tags is None: audio.add_tags()
+                audio.tags['TIT2'] = TIT2(encoding=3, text=self.entries["제목"].get())
+                audio.tags['TPE1'] = TPE1(encoding=3, text=self.entries["아티스트"].get())
+                audio.tags['TALB'] = TALB(encoding=3, text=self.entries["앨범"].get())
+                audio.tags['TCON'] = TCON(encoding=3, text=self.entries["장르"].get())
+                audio.tags['TRCK'] = TRCK(encoding=3, text=self.entries["트랙 번호"].get())
+                if self.new_art_path:
+                    album_art.apply_art(audio.tags, *album_art.load_art_file(self.new_art_path))
+                in_place = tag_writer.save_tags(audio.tags, self.tag_file_path)
+                self.index.refresh(self.tag_file_path)
+            self.status_label.configure(text=f"태그 저장 완료 ({'제자리 갱신' if in_place else '전체 재작성'}).")
             messagebox.showinfo("성공", "태그를 저장했습니다.")
         except Exception as e:
             messagebox.showerror("오류", f"태그 저장 오류: {e}")
@@ -208,21 +517,89 @@ class App(ctk.CTk):
         self.player_file_path = path
         self.player_file_label.configure(text=os.path.basename(path))
         try:
-            self.stop_audio()
-            pygame.mixer.music.load(self.player_file_path)
-            audio_info = MP3(self.player_file_path)
-            self.song_length_ms = audio_info.info.length * 1000
-            self.progress_slider.configure(to=self.song_length_ms)
-            self.time_label.configure(text=f"00:00 / {format_time(self.song_length_ms)}")
-            self.status_label.configure(text=f"로드됨: {os.path.basename(path)}")
+            with metrics.operation('open', path=path):
+                import waveform
+                self.stop_audio()
+                self.music().load(self.player_file_path)
+                if self.playback_source:
+                    self.playback_source.close()
+                    self.playback_source = None
+                self.song_length_ms = self.index.lookup(self.player_file_path).duration * 1000
+                self.progress_slider.configure(to=self.song_length_ms)
+                self.time_label.configure(text=f"00:00 / {format_time(self.song_length_ms)}")
+                self.status_label.configure(text=f"로드됨: {os.path.basename(path)}")
+                self.frame_index = None
+                self.waveform.set_peaks(None)
+                self.begin_loads()
+                self.load_in_background(path, load_frame_index, self.on_frame_index, "프레임 색인 생성")
+                self.load_in_background(path, waveform.load_peaks, self.on_peaks, "파형 생성")
         except Exception as e:
-            messagebox.showerror("오류", f"플레이어 파일 로딩 오류: {e}")
+            self.show_load_error("플레이어 파일 로딩 오류", path, e)
+
+    def show_load_error(self, what, path, error):
+        # A file that fails to load is often damaged; say where instead of only repeating the exception.
+        message = f"{what}: {error}"
+        try:
+            import integrity
+            result = integrity.scan_file(path)
+            if result.issues:
+                lines = integrity.describe(result)
+                message += "\n\n파일 검사 결과:\n" + "\n".join(lines[:8])
+                if len(lines) > 8: message += f"\n... 외 {len(lines) - 8}개"
+                message += "\n\n'mp3_editor check --repair'로 복구할 수 있습니다."
+        except Exception:
+            pass
+        messagebox.showerror("오류", message)
+
+    def begin_loads(self):
+        """Start a new generation of background loads, cancelling those of the previous file."""
+        self.load_generation += 1
+        for job in self.load_jobs:
+            job.cancel()
+        self.load_jobs = []
+
+    def load_in_background(self, path, loader, on_ready, what):
+        # Cached data comes back almost immediately; otherwise it is generated
+        # as a job on the load pool (shown in the status bar). A result that
+        # arrives after another file was opened is dropped.
+        generation = self.load_generation
+        def done(job):
+            if generation != self.load_generation or job.state == 'cancelled':
+                return
+            if job.error is not None:
+                self.status_label.configure(text=f"{what} 실패: {job.error}")
+                return
+            on_ready(job.result)
+        self.load_jobs.append(self.loads.submit(what, loader, path, on_done=done))
+        self.update_job_status()
+
+    def on_frame_index(self, index):
+        self.frame_index = index
+        self.song_length_ms = index.duration_ms
+        self.progress_slider.configure(to=self.song_length_ms)
+        self.time_label.configure(text=f"{format_time(self.progress_slider.get())} / {format_time(self.song_length_ms)}")
+
+    def on_peaks(self, peaks):
+        self.waveform.set_peaks(peaks)
+        self.sync_markers_from_entries()
+
+    def snap_to_frame(self, ms):
+        """Round ms to the frame boundary the lossless cut will actually use."""
+        return self.frame_index.snap_ms(ms) if self.frame_index else ms
+
+    def on_marker_change(self, target, ms):
+        entry = self.start_time_entry if target == 'start' else self.end_time_entry
+        entry.delete(0, "end")
+        entry.insert(0, format_time(self.snap_to_frame(ms), precise=True))
+
+    def sync_markers_from_entries(self):
+        self.waveform.set_markers(parse_time(self.start_time_entry.get()), parse_time(self.end_time_entry.get()))
 
     def play_audio(self):
         if not self.player_file_path: return messagebox.showwarning("경고", "먼저 파일을 선택하세요.")
 
         # If music is already playing and we are not paused, do nothing.
-        if pygame.mixer.music.get_busy() and not self.paused:
+        if self.music_busy() and not self.paused:
             return
 
         # If we are resuming from a pause, self.seek_pos_ms is already set.
@@ -230,22 +607,49 @@ class App(ctk.CTk):
         if not self.paused:
             self.seek_pos_ms = self.progress_slider.get()
 
-        pygame.mixer.music.play(start=self.seek_pos_ms / 1000)
+        self.start_playback(self.seek_pos_ms)
         self.playback_active = True
         self.paused = False
         self.update_progress()
 
+    def start_playback(self, ms):
+        """Play from ms. With the frame index the player is fed from that frame's byte offset.
+
+        pygame's own MP3 seek (play(start=) / set_pos) is approximate, so it is
+        only used until the frame index has been built.
+        """
+        music = self.music()
+        music.stop()
+        if self.frame_index:
+            index = self.frame_index.frame_at_ms(ms)
+            source = FileTail(self.player_file_path, self.frame_index.offset(index))
+            music.load(source, "mp3")
+            if self.playback_source:
+                self.playback_source.close()
+            self.playback_source = source
+            music.play()
+            self.seek_pos_ms = self.frame_index.time_ms(index)
+        else:
+            music.play(start=ms / 1000)
+            self.seek_pos_ms = ms
+        # get_pos() restarts from zero with every play().
+        self.pos_base_ms = 0
+
+    def current_position(self):
+        # get_pos() counts from the last play(); pos_base_ms is its value at the last seek.
+        return self.seek_pos_ms + self.music().get_pos() - self.pos_base_ms
+
     def pause_audio(self):
-        if pygame.mixer.music.get_busy():
+        if self.music_busy():
             # Store current position before stopping
-            self.seek_pos_ms += pygame.mixer.music.get_pos()
-            pygame.mixer.music.stop()
+            self.seek_pos_ms = self.current_position()
+            self.music().stop()
             self.paused = True
             # Manually set slider to make sure UI is up to date
             self.progress_slider.set(self.seek_pos_ms)
 
     def stop_audio(self):
-        pygame.mixer.music.stop()
+        self.music().stop()
         self.playback_active = False
         self.paused = False # Make sure paused is false
         self.seek_pos_ms = 0
@@ -253,83 +657,114 @@ class App(ctk.CTk):
         self.time_label.configure(text=f"00:00 / {format_time(self.song_length_ms)}")
 
     def seek_audio(self, value):
-        if pygame.mixer.music.get_busy():
-            self.stop_audio()
-            self.progress_slider.set(float(value))
-            self.play_audio()
+        if self.music_busy() and not self.paused:
+            self.start_playback(float(value))
 
     def update_progress(self):
-        if pygame.mixer.music.get_busy() and not self.paused:
-            current_pos = self.seek_pos_ms + pygame.mixer.music.get_pos()
+        if self.music_busy() and not self.paused:
+            current_pos = self.current_position()
             if current_pos >= self.song_length_ms:
                 self.stop_audio()
             else:
                 self.time_label.configure(text=f"{format_time(current_pos)} / {format_time(self.song_length_ms)}")
                 self.progress_slider.set(current_pos)
+                self.waveform.set_playhead(current_pos)
                 self.after(250, self.update_progress)
-        elif not pygame.mixer.music.get_busy() and self.playback_active:
+        elif not self.music_busy() and self.playback_active:
              self.stop_audio()
 
     def set_time_from_player(self, target):
-        current_time_ms = self.progress_slider.get()
-        formatted_time = format_time(current_time_ms)
+        current_time_ms = self.snap_to_frame(self.progress_slider.get())
+        formatted_time = format_time(current_time_ms, precise=True)
         entry = self.start_time_entry if target == 'start' else self.end_time_entry
         entry.delete(0, "end")
         entry.insert(0, formatted_time)
+        self.sync_markers_from_entries()
 
     def cut_audio(self):
         if not self.player_file_path: return messagebox.showwarning("경고", "먼저 파일을 선택하세요.")
         start_ms = parse_time(self.start_time_entry.get())
         end_ms = parse_time(self.end_time_entry.get())
         if start_ms is None or end_ms is None or start_ms >= end_ms:
-            return messagebox.showerror("오류", "시간을 올바르게 입력하세요 (예: 1:25 또는 85).")
+            return messagebox.showerror("오류", "시간을 올바르게 입력하세요 (예: 1:25.500 또는 85.5).")
         output_path = filedialog.asksaveasfilename(defaultextension=".mp3", filetypes=[("MP3 files", "*.mp3")])
         if not output_path: return
         try:
-            self.status_label.configure(text="오디오 자르는 중...")
-            self.update_idletasks()
-            audio = AudioSegment.from_mp3(self.player_file_path)
-            cut_audio = audio[start_ms:end_ms]
-            if self.fade_in_var.get() == "on":
-                cut_audio = cut_audio.fade_in(500)
-            if self.fade_out_var.get() == "on":
-                cut_audio = cut_audio.fade_out(500)
-            cut_audio.export(output_path, format="mp3")
-            messagebox.showinfo("성공", f"파일이 저장되었습니다: {output_path}")
+            fade_ms = int(float(self.fade_length_entry.get()) * 1000)
+        except ValueError:
+            return messagebox.showerror("오류", "페이드 길이를 초 단위 숫자로 입력하세요 (예: 0.5).")
+        fade_in = fade_ms if self.fade_in_var.get() == "on" else 0
+        fade_out = fade_ms if self.fade_out_var.get() == "on" else 0
+        self.jobs.submit(f"자르기: {os.path.basename(output_path)}", run_cut, self.player_file_path, output_path,
+                         start_ms, end_ms, fade_in, fade_out, self.fade_curve_var.get(), self.auto_trim_var.get() == "on",
+                         on_done=self.on_cut_done)
+        self.update_job_status()
+
+    def on_cut_done(self, job):
+        if job.state == 'done':
+            messagebox.showinfo("성공", f"파일이 저장되었습니다: {job.result}")
             self.status_label.configure(text="자르기 완료.")
-        except Exception as e:
-            messagebox.showerror("오류", f"자르기 오류: {e}")
+        elif job.state == 'failed':
+            messagebox.showerror("오류", f"자르기 오류: {job.error}")
             self.status_label.configure(text="오류: 자르기 실패.")
+        else:
+            self.status_label.configure(text="자르기가 취소되었습니다.")
 
-    def open_merge_file1(self):
-        path = filedialog.askopenfilename(filetypes=[("MP3 files", "*.mp3")])
-        if path:
-            self.merge_file1_path = path
-            self.merge_file1_label.configure(text=os.path.basename(path))
+    def add_merge_files(self):
+        paths = filedialog.askopenfilenames(filetypes=[("MP3 files", "*.mp3")])
+        if paths:
+            self.merge_paths.extend(paths)
+            self.update_merge_list()
 
-    def open_merge_file2(self):
-        path = filedialog.askopenfilename(filetypes=[("MP3 files", "*.mp3")])
-        if path:
-            self.merge_file2_path = path
-            self.merge_file2_label.configure(text=os.path.basename(path))
+    def clear_merge_files(self):
+        self.merge_paths = []
+        self.update_merge_list()
+
+    def update_merge_list(self):
+        names = [f"{i + 1}. {os.path.basename(p)}" for i, p in enumerate(self.merge_paths)]
+        if len(names) > 6:
+            names = names[:5] + [f"... 외 {len(names) - 5}개"]
+        self.merge_list_label.configure(text="\n".join(names) or "파일 없음")
 
     def merge_audio(self):
-        if not self.merge_file1_path or not self.merge_file2_path: return messagebox.showwarning("경고", "두 파일을 모두 선택하세요.")
+        if len(self.merge_paths) < 2: return messagebox.showwarning("경고", "붙일 파일을 두 개 이상 추가하세요.")
         output_path = filedialog.asksaveasfilename(defaultextension=".mp3", filetypes=[("MP3 files", "*.mp3")])
         if not output_path: return
-        try:
-            self.status_label.configure(text="오디오 붙이는 중...")
-            self.update_idletasks()
-            audio1 = AudioSegment.from_mp3(self.merge_file1_path)
-            audio2 = AudioSegment.from_mp3(self.merge_file2_path)
-            merged_audio = audio1 + audio2
-            merged_audio.export(output_path, format="mp3")
-            messagebox.showinfo("성공", f"파일이 저장되었습니다: {output_path}")
-            self.status_label.configure(text="붙이기 완료.")
-        except Exception as e:
-            messagebox.showerror("오류", f"붙이기 오류: {e}")
+        self.jobs.submit(f"붙이기: {os.path.basename(output_path)}", run_merge, list(self.merge_paths), output_path,
+                         on_done=self.on_merge_done)
+        self.update_job_status()
+
+    def on_merge_done(self, job):
+        if job.state == 'done':
+            path, mode = job.result
+            messagebox.showinfo("성공", f"파일이 저장되었습니다: {path}")
+            self.status_label.configure(text=f"붙이기 완료 ({audio_stream.MERGE_MODE_LABELS[mode]}).")
+        elif job.state == 'failed':
+            messagebox.showerror("오류", f"붙이기 오류: {job.error}")
             self.status_label.configure(text="오류: 붙이기 실패.")
+        else:
+            self.status_label.configure(text="붙이기가 취소되었습니다.")
+
+    # --- Background Jobs ---
+    def poll_jobs(self):
+        for job in self.jobs.pop_finished() + self.loads.pop_finished():
+            if job.on_done:
+                job.on_done(job)
+        self.update_job_status()
+        self.after(200, self.poll_jobs)
+
+    def update_job_status(self):
+        # The cancel button only stops cuts and merges; background loads are
+        # cancelled by opening another file.
+        active = self.jobs.active()
+        shown = active + self.loads.active()
+        if shown:
+            self.status_label.configure(text=" · ".join(f"{job.name} {int(job.progress * 100)}%" for job in shown))
+        self.cancel_button.configure(state="normal" if active else "disabled")
 
 if __name__ == "__main__":
+    # --metrics / --profile / --trace-memory, as on the command line (or the MP3_EDITOR_* variables).
+    import argparse
+    metrics.configure_from_args(metrics.add_arguments(argparse.ArgumentParser(add_help=False)).parse_known_args()[0])
     app = App()
     app.mainloop()
\ No newline at end of file
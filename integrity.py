@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import mp3_frames
+
+SCAN_CHUNK = 1024 * 1024
+
+# Issue kinds, worst first. Anything but 'info' makes a file fail the check.
+SEVERITY = {
+    'no_audio': 'error',
+    'vbr_header_truncated': 'error',
+    'truncated_tail': 'error',
+    'sync_lost': 'error',
+    'format_change': 'error',
+    'crc_mismatch': 'error',
+    'id3_malformed': 'error',
+    'id3_truncated': 'error',
+    'id3_duplicate': 'warning',
+    'id3_in_stream': 'warning',
+    'leading_garbage': 'warning',
+    'trailing_garbage': 'warning',
+    'frame_count_mismatch': 'warning',
+    'byte_count_mismatch': 'warning',
+}
+
+Issue = namedtuple('Issue', 'kind offset detail')
+ScanResult = namedtuple('ScanResult', 'path ok frames duration_ms issues first_frame audio_start audio_end error')
+
+
+# --- Frame CRC ---
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def frame_crc(data):
+    """MPEG audio CRC-16 (polynomial 0x8005, initial 0xFFFF) over the protected bytes."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def _crc_ok(buf, pos, header):
+    # Protected bytes: header bytes 2-3 and the side information after the 16-bit CRC.
+    if header.layer != 3:
+        return True   # Layer I/II protect bit allocation data of variable length; not checked
+    side = mp3_frames.side_info_size(header)
+    stored = (buf[pos + 4] << 8) | buf[pos + 5]
+    return frame_crc(bytes(buf[pos + 2:pos + 4]) + bytes(buf[pos + 6:pos + 6 + side])) == stored
+
+
+# --- Scanning ---
+
+def _leading_tags(f, file_size, issues):
+    """Walk the ID3v2 tags at the start of the file and return where the audio may begin."""
+    pos = 0
+    count = 0
+    while True:
+        f.seek(pos)
+        head = f.read(10)
+        if head[:3] != b'ID3':
+            break
+        if len(head) < 10 or head[3] not in (2, 3, 4) or any(b & 0x80 for b in head[6:10]):
+            issues.append(Issue('id3_malformed', pos, "ID3v2 헤더가 손상되었습니다."))
+            break
+        size = mp3_frames.id3v2_size(head)
+        if pos + size > file_size:
+            issues.append(Issue('id3_truncated', pos, f"ID3v2 태그({size}바이트)가 파일 끝을 넘습니다."))
+            return pos, count
+        count += 1
+        pos += size
+    if count > 1:
+        issues.append(Issue('id3_duplicate', 0, f"ID3v2 태그가 {count}개 연달아 있습니다."))
+    return pos, count
+
+
+def scan_file(path, check_crc=True):
+    """Validate one file by walking its frame headers; nothing is decoded.
+
+    Reports sync loss, stream format changes, CRC errors on protected frames,
+    a truncated last frame, damaged/duplicated ID3 tags and disagreement with
+    the Xing header. audio_start/audio_end delimit the frames a repair keeps.
+    """
+    issues = []
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            tag_end, _ = _leading_tags(f, file_size, issues)
+            tail_start = mp3_frames.trailing_tags_start(f, file_size)
+            start, first = mp3_frames.find_frame(f, tag_end, tail_start)
+            if first is None:
+                issues.append(Issue('no_audio', tag_end, "MPEG 오디오 프레임을 찾을 수 없습니다."))
+                return ScanResult(path, False, 0, 0.0, [i._asdict() for i in issues], None, None, None, None)
+            if start > tag_end:
+                issues.append(Issue('leading_garbage', tag_end, f"첫 프레임 앞에 {start - tag_end}바이트의 알 수 없는 데이터"))
+            f.seek(start)
+            try:
+                xing = mp3_frames.read_xing(f.read(first.size), first)
+            except mp3_frames.MP3FrameError as e:
+                issues.append(Issue('vbr_header_truncated', start, str(e)))
+                return ScanResult(path, False, 0, 0.0, [i._asdict() for i in issues], start, None, None, None)
+            data_start = start + first.size if xing['tag'] else start
+            frames, audio_end, last_good = _walk(f, data_start, tail_start, first, check_crc, issues)
+    except Exception as e:
+        # One unreadable file must not abort a batch scan running on the pool.
+        return ScanResult(path, False, 0, 0.0, [i._asdict() for i in issues], None, None, None, str(e) or type(e).__name__)
+
+    if xing['frames'] is not None and xing['frames'] != frames:
+        issues.append(Issue('frame_count_mismatch', start, f"Xing 헤더 {xing['frames']}프레임, 실제 {frames}프레임"))
+    if xing['bytes'] is not None and abs(xing['bytes'] - (last_good - start)) > first.size:
+        issues.append(Issue('byte_count_mismatch', start, f"Xing 헤더 {xing['bytes']}바이트, 실제 {last_good - start}바이트"))
+    duration_ms = frames * first.samples * 1000.0 / first.sample_rate
+    ok = not any(SEVERITY.get(i.kind) == 'error' for i in issues)
+    return ScanResult(path, ok, frames, duration_ms, [i._asdict() for i in issues], start, data_start, last_good, None)
+
+
+def _walk(f, pos, end, reference, check_crc, issues):
+    """Count consecutive frames in [pos, end), recording every place the chain breaks.
+
+    Returns (frame count, end position reached, end of the last complete frame).
+    """
+    headers = {}          # raw 4 bytes -> parsed header; a stream uses only a handful
+    frames = 0
+    last_good = pos
+    buf = b''
+    buf_pos = pos
+    crc_errors = 0
+    while pos < end:
+        if pos + 6 > buf_pos + len(buf):
+            f.seek(pos)
+            buf = f.read(min(SCAN_CHUNK, end - pos))
+            buf_pos = pos
+        i = pos - buf_pos
+        key = buf[i:i + 4]
+        header = headers.get(key)
+        if header is None:
+            header = mp3_frames.parse_header(key)
+            if header is not None and len(headers) < 4096:
+                headers[key] = header
+        if header is None or not mp3_frames.same_format(header, reference):
+            if header is not None:
+                kind, detail = 'format_change', "스트림 중간에 샘플레이트/채널 형식이 바뀝니다."
+            elif key[:3] == b'ID3':
+                kind, detail = 'id3_in_stream', "오디오 중간에 ID3v2 태그가 끼어 있습니다."
+            else:
+                kind, detail = 'sync_lost', "프레임 동기화가 끊겼습니다."
+            resync, found = _resync(f, pos + 1, end, reference)
+            if found is None:
+                issues.append(Issue('trailing_garbage' if frames else kind, pos,
+                                    f"마지막 프레임 뒤에 {end - pos}바이트의 알 수 없는 데이터"))
+                return frames, end, last_good
+            issues.append(Issue(kind, pos, f"{detail} ({resync - pos}바이트 건너뜀)"))
+            pos = resync
+            buf = b''
+            continue
+        if pos + header.size > end:
+            issues.append(Issue('truncated_tail', pos, f"마지막 프레임이 잘렸습니다 ({end - pos}/{header.size}바이트)"))
+            return frames, end, last_good
+        if check_crc and header.protected:
+            if pos + 6 + mp3_frames.side_info_size(header) > buf_pos + len(buf):
+                f.seek(pos)
+                buf = f.read(min(SCAN_CHUNK, end - pos))
+                buf_pos = pos
+            if not _crc_ok(buf, pos - buf_pos, header):
+                crc_errors += 1
+                if crc_errors <= 10:
+                    issues.append(Issue('crc_mismatch', pos, f"{frames}번 프레임의 CRC가 맞지 않습니다."))
+        frames += 1
+        pos += header.size
+        last_good = pos
+    return frames, pos, last_good
+
+
+def _resync(f, pos, end, reference):
+    # find_frame looks one window ahead; keep sliding it until the end of the audio.
+    while pos < end:
+        found_pos, header = mp3_frames.find_frame(f, pos, end, reference)
+        if header is not None:
+            return found_pos, header
+        pos += mp3_frames.SYNC_WINDOW
+    return None, None
+
+
+def scan_many(paths, jobs=None, on_result=None):
+    """Scan paths on a process pool (header walking is CPU-bound Python) and return results in order."""
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 4) as pool:
+        for result in pool.map(scan_file, paths, chunksize=16):
+            if on_result:
+                on_result(result)
+            results.append(result)
+    return results
+
+
+def describe(result):
+    """One line per problem, for error dialogs and console output."""
+    if result.error:
+        return [f"읽기 오류: {result.error}"]
+    return [f"[{SEVERITY.get(i['kind'], 'warning')}] {i['kind']} @ {i['offset']}: {i['detail']}" for i in result.issues]
+
+
+# --- Repair ---
+
+def repair_file(path, result=None):
+    """Rewrite path with only its valid frames, a single ID3v2 tag and a rebuilt Xing header.
+
+    Garbage, stray tags and frames of a different format are dropped, a cut-off
+    last frame is removed, the Xing/LAME header is rebuilt from the frames that
+    remain (keeping the encoder delay and padding) and TLEN is set to the real
+    duration. The file is replaced atomically. Returns the new ScanResult.
+    """
+    result = result or scan_file(path)
+    if result.audio_start is None:
+        raise mp3_frames.MP3FrameError(f"복구할 오디오 프레임이 없습니다: {path}")
+    fd, tmp_path = tempfile.mkstemp(prefix='.repair-', suffix='.mp3', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            src.seek(0)
+            first_tag = mp3_frames.id3v2_size(src.read(10))
+            if first_tag and not any(i['kind'] in ('id3_malformed', 'id3_truncated') and i['offset'] == 0
+                                     for i in result.issues):
+                mp3_frames.copy_range(src, dst, 0, first_tag)
+            src.seek(result.first_frame)
+            head = src.read(4)
+            first = mp3_frames.parse_header(head)
+            xing = mp3_frames.read_xing(head + src.read(first.size - 4), first)
+            gapless = (xing['delay'], xing['padding']) if xing['delay'] or xing['padding'] else None
+            src.seek(0, os.SEEK_END)
+            tail_start = mp3_frames.trailing_tags_start(src, src.tell())
+            xing_pos = dst.tell()
+            dst.write(mp3_frames.build_xing_frame(first, 0, 0, [0] * 100, gapless=gapless))
+            toc = mp3_frames.TocBuilder()
+            bitrates = set()
+            frames = mp3_frames.copy_frames(src, result.audio_start, result.audio_end, first, dst, toc, bitrates)
+            nbytes = dst.tell() - xing_pos
+            src.seek(0, os.SEEK_END)
+            mp3_frames.copy_range(src, dst, max(tail_start, result.audio_end), src.tell())
+            dst.seek(xing_pos)
+            dst.write(mp3_frames.build_xing_frame(first, frames, nbytes, toc.toc(xing_pos, nbytes),
+                                                  vbr=len(bitrates) > 1, gapless=gapless))
+        shutil.copystat(path, tmp_path)
+        _fix_length_tag(tmp_path, frames * first.samples * 1000 // first.sample_rate)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return scan_file(path)
+
+
+def _fix_length_tag(path, duration_ms):
+    from mutagen.id3 import ID3, ID3NoHeaderError, TLEN
+    import tag_writer
+    try:
+        tags = ID3(path)
+    except ID3NoHeaderError:
+        return
+    current = tags.get('TLEN')
+    if current is None or str(current.text[0]) != str(duration_ms):
+        tags.setall('TLEN', [TLEN(encoding=3, text=str(duration_ms))])
+        tag_writer.save_tags(tags, path)
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    import batch_tags
+    parser = argparse.ArgumentParser(description="MP3 프레임 구조를 검사하고 손상된 파일을 복구합니다.")
+    parser.add_argument('targets', nargs='+', help="MP3 파일, 폴더 또는 glob 패턴")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help="동시에 검사할 파일 수 (프로세스)")
+    parser.add_argument('--report', metavar='JSON', help="검사 결과를 저장할 JSON 파일")
+    parser.add_argument('--repair', action='store_true', help="문제가 있는 파일을 복구 (원본을 덮어씀)")
+    parser.add_argument('--quiet', action='store_true', help="문제가 있는 파일만 출력")
+    args = parser.parse_args(argv)
+
+    paths = batch_tags.collect_files(args.targets)
+    if not paths:
+        print("오류: 검사할 MP3 파일이 없습니다.")
+        return 1
+
+    def show(result):
+        if result.issues or result.error:
+            print(f"{'실패' if not result.ok else '경고'}: {result.path}")
+            for line in describe(result):
+                print(f"  {line}")
+        elif not args.quiet:
+            print(f"정상: {result.path} ({result.frames}프레임)")
+
+    results = scan_many(paths, args.jobs, show)
+    repaired = []
+    if args.repair:
+        for i, result in enumerate(results):
+            if not result.issues or result.error or result.audio_start is None:
+                continue
+            try:
+                results[i] = repair_file(result.path, result)
+                repaired.append(result.path)
+                print(f"복구함: {result.path} (남은 문제 {len(results[i].issues)}개)")
+            except Exception as e:
+                print(f"복구 실패: {result.path} ({e})")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'files': [r._asdict() for r in results], 'repaired': repaired}, f, ensure_ascii=False, indent=1)
+    bad = sum(1 for r in results if not r.ok)
+    warned = sum(1 for r in results if r.ok and r.issues)
+    print(f"\n검사 완료: {len(results)}개 중 오류 {bad}개, 경고 {warned}개" + (f", 복구 {len(repaired)}개" if args.repair else ""))
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
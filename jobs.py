@@ -0,0 +1,86 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once the job has been cancelled."""
+
+
+class Job:
+    """A long-running operation with progress reporting and cooperative cancellation."""
+
+    def __init__(self, job_id, name, on_done=None):
+        self.id = job_id
+        self.name = name
+        self.on_done = on_done
+        self.progress = 0.0
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+
+    def report(self, fraction):
+        """Progress callback handed to the work function; raises JobCancelled when cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+        self.progress = min(max(fraction, 0.0), 1.0)
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class JobScheduler:
+    """Run jobs on a worker pool; the UI thread collects finished jobs with pop_finished()."""
+
+    def __init__(self, max_workers=2, name='mp3-job'):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.jobs = []
+        self.finished = []
+
+    def submit(self, name, fn, *args, on_done=None, **kwargs):
+        """Queue fn(*args, progress=job.report, **kwargs) and return its Job."""
+        job = Job(next(self.ids), name, on_done)
+        with self.lock:
+            self.jobs.append(job)
+        self.pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.report(0.0)
+            job.state = 'running'
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.progress = 1.0
+            job.state = 'done'
+        except JobCancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.error = e
+            job.state = 'failed'
+        with self.lock:
+            self.jobs.remove(job)
+            self.finished.append(job)
+
+    def active(self):
+        with self.lock:
+            return list(self.jobs)
+
+    def pop_finished(self):
+        with self.lock:
+            finished, self.finished = self.finished, []
+        return finished
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.pool.shutdown(wait=False)
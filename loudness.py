@@ -0,0 +1,429 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import audio_stream
+import mp3_frames
+import storage
+import tag_writer
+
+REFERENCE_LUFS = -18.0     # ReplayGain 2.0 reference level (equivalent to 89 dB SPL)
+SUB_BLOCK_MS = 100         # gating blocks are 400 ms long and start every 100 ms (75% overlap)
+SUB_BLOCKS_PER_BLOCK = 4
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+# Block loudness is kept as a histogram so that album loudness can be
+# computed from cached tracks without decoding them again.
+HIST_MIN = ABSOLUTE_GATE
+HIST_STEP = 0.1
+HIST_BINS = 800            # -70 .. +10 LUFS
+HIST_CENTERS = HIST_MIN + (np.arange(HIST_BINS) + 0.5) * HIST_STEP
+HIST_ENERGY = 10.0 ** ((HIST_CENTERS + 0.691) / 10.0)
+
+REPLAYGAIN_FIELDS = ('REPLAYGAIN_TRACK_GAIN', 'REPLAYGAIN_TRACK_PEAK', 'REPLAYGAIN_ALBUM_GAIN',
+                     'REPLAYGAIN_ALBUM_PEAK', 'REPLAYGAIN_REFERENCE_LOUDNESS')
+
+LoudnessResult = namedtuple('LoudnessResult', 'path ok loudness peak gain album_gain album_peak error')
+
+
+# --- K-Weighting ---
+
+def _biquad_response(b, a, freqs, sample_rate):
+    z = np.exp(-2j * np.pi * freqs / sample_rate)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+
+def k_weighting_power(freqs, sample_rate):
+    """|H(f)|^2 of the BS.1770 K-weighting filter (high shelf + RLB high-pass) at any sample rate."""
+    k = np.tan(np.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10.0 ** (3.999843853973347 / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = ((vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0)
+    shelf_a = (1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0)
+    k = np.tan(np.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1.0 + k / q + k * k
+    high_b = (1.0, -2.0, 1.0)
+    high_a = (1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0)
+    return _biquad_response(shelf_b, shelf_a, freqs, sample_rate) * _biquad_response(high_b, high_a, freqs, sample_rate)
+
+
+def _spectral_weights(size, sample_rate):
+    """Per-bin factors turning |rfft|^2 of a sub-block into its K-weighted mean square (Parseval)."""
+    weights = k_weighting_power(np.fft.rfftfreq(size, 1.0 / sample_rate), sample_rate) * 2.0
+    weights[0] /= 2.0
+    if size % 2 == 0:
+        weights[-1] /= 2.0
+    return (weights / (size * size)).astype(np.float32)
+
+
+# --- Analysis ---
+
+def payload_digest(path):
+    """SHA-1 of the audio frames only, so rewriting tags does not change a file's identity."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+        f.seek(info.tag_end)
+        remaining = info.audio_end - info.tag_end
+        while remaining > 0:
+            chunk = f.read(min(mp3_frames.COPY_CHUNK * 16, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def analyze(path):
+    """Decode path once and return (sample peak, block loudness histogram).
+
+    The K-weighting filter is applied in the frequency domain on each 100 ms
+    sub-block; a 400 ms gating block is the mean of four consecutive sub-blocks.
+    """
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    sample_rate = info.first.sample_rate
+    channels = 1 if info.first.channel_mode == mp3_frames.CHANNEL_MONO else 2
+    size = sample_rate * SUB_BLOCK_MS // 1000
+    weights = _spectral_weights(size, sample_rate)
+    histogram = np.zeros(HIST_BINS, dtype=np.int64)
+    peak = 0
+    carry = np.zeros((0, channels), dtype=np.float32)
+    recent = np.zeros(0, dtype=np.float64)   # the last sub-block energies, for blocks spanning chunks
+    for chunk in audio_stream.decode_pcm(path, sample_rate=sample_rate, channels=channels):
+        raw = np.frombuffer(chunk, dtype='<i2')
+        if len(raw):
+            peak = max(peak, int(np.abs(raw.astype(np.int32)).max()))
+        samples = np.concatenate([carry, raw.reshape(-1, channels).astype(np.float32) / 32768.0])
+        usable = len(samples) - len(samples) % size
+        carry = samples[usable:]
+        if not usable:
+            continue
+        spectra = np.fft.rfft(samples[:usable].reshape(-1, size, channels), axis=1)
+        power = spectra.real ** 2 + spectra.imag ** 2
+        energies = np.einsum('nkc,k->n', power, weights).astype(np.float64)
+        recent = np.concatenate([recent, energies])
+        if len(recent) >= SUB_BLOCKS_PER_BLOCK:
+            sums = np.convolve(recent, np.ones(SUB_BLOCKS_PER_BLOCK), mode='valid') / SUB_BLOCKS_PER_BLOCK
+            _add_blocks(histogram, sums)
+            recent = recent[-(SUB_BLOCKS_PER_BLOCK - 1):]
+    return peak / 32768.0, histogram
+
+
+def _add_blocks(histogram, energies):
+    with np.errstate(divide='ignore'):
+        levels = -0.691 + 10.0 * np.log10(energies)
+    levels = levels[levels >= ABSOLUTE_GATE]
+    bins = np.minimum(((levels - HIST_MIN) / HIST_STEP).astype(np.int64), HIST_BINS - 1)
+    histogram += np.bincount(bins, minlength=HIST_BINS)
+
+
+def integrated_loudness(histogram):
+    """Gated integrated loudness (LUFS) of a block histogram, or None if everything is below the gate."""
+    total = histogram.sum()
+    if not total:
+        return None
+    ungated = -0.691 + 10.0 * np.log10((histogram * HIST_ENERGY).sum() / total)
+    kept = HIST_CENTERS >= ungated + RELATIVE_GATE
+    count = histogram[kept].sum()
+    if not count:
+        return None
+    return float(-0.691 + 10.0 * np.log10((histogram[kept] * HIST_ENERGY[kept]).sum() / count))
+
+
+def _analyze_worker(path):
+    peak, histogram = analyze(path)
+    return peak, zlib.compress(histogram.astype('<u4').tobytes())
+
+
+def _unpack(blob):
+    return np.frombuffer(zlib.decompress(blob), dtype='<u4').astype(np.int64)
+
+
+# --- Cache ---
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analysis (
+    digest TEXT PRIMARY KEY,
+    peak REAL NOT NULL,
+    histogram BLOB NOT NULL
+);
+"""
+
+
+class LoudnessCache:
+    """SQLite cache of loudness analyses keyed by the audio payload hash.
+
+    A second table remembers each path's hash for its current mtime and size,
+    so unchanged files are not even re-hashed.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(storage.cache_dir(), 'loudness.sqlite')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def digest(self, path):
+        """Return the payload hash of path, computing it only if the file changed."""
+        abspath, mtime_ns, size = storage.file_key(path)
+        with self.lock:
+            row = self.conn.execute("SELECT mtime_ns, size, digest FROM files WHERE path = ?", (abspath,)).fetchone()
+        if row and row[0] == mtime_ns and row[1] == size:
+            return row[2]
+        digest = payload_digest(abspath)
+        self.remember(abspath, digest)
+        return digest
+
+    def remember(self, path, digest):
+        abspath, mtime_ns, size = storage.file_key(path)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, digest) VALUES (?, ?, ?, ?)",
+                              (abspath, mtime_ns, size, digest))
+
+    def get(self, digest):
+        """Return (peak, histogram) for a payload hash, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT peak, histogram FROM analysis WHERE digest = ?", (digest,)).fetchone()
+        return (row[0], _unpack(row[1])) if row else None
+
+    def put(self, digest, peak, blob):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO analysis (digest, peak, histogram) VALUES (?, ?, ?)",
+                              (digest, peak, blob))
+
+
+# --- Library Scan ---
+
+def album_key(path, mode):
+    """Group files into albums: by folder, by album tag, or not at all."""
+    if mode == 'none':
+        return None
+    if mode == 'dir':
+        return os.path.dirname(os.path.abspath(path))
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    try:
+        tags = ID3(path)
+    except ID3NoHeaderError:
+        return os.path.dirname(os.path.abspath(path))
+    album = tags.get('TALB')
+    artist = tags.get('TPE2') or tags.get('TPE1')
+    if not album or not album.text:
+        return os.path.dirname(os.path.abspath(path))
+    return (str(artist.text[0]) if artist and artist.text else '', str(album.text[0]))
+
+
+def measure(paths, jobs=None, cache=None, album_mode='dir', progress=None):
+    """Measure track and album loudness for paths and return LoudnessResults in input order.
+
+    Payload hashing runs on threads; decoding and analysis of files missing
+    from the cache are spread over `jobs` worker processes.
+    """
+    jobs = jobs or os.cpu_count() or 4
+    own_cache = cache is None
+    cache = cache or LoudnessCache()
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            digests = list(pool.map(_digest_or_error, [cache] * len(paths), paths))
+        analyses = {}
+        errors = {}
+        missing = {}
+        for path, digest in zip(paths, digests):
+            if isinstance(digest, Exception):
+                errors[path] = str(digest)
+                continue
+            cached = cache.get(digest)
+            if cached is not None:
+                analyses[path] = cached
+            else:
+                missing.setdefault(digest, path)
+        done = len(paths) - len(missing)
+        if missing:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = {digest: pool.submit(_analyze_worker, path) for digest, path in missing.items()}
+                for digest, future in futures.items():
+                    try:
+                        peak, blob = future.result()
+                        cache.put(digest, peak, blob)
+                    except Exception as e:
+                        errors[missing[digest]] = str(e)
+                    done += 1
+                    if progress:
+                        progress(done / len(paths))
+        for path, digest in zip(paths, digests):
+            if path not in analyses and path not in errors:
+                # Same payload as a file analysed above (a copy elsewhere in the library).
+                cached = cache.get(digest)
+                if cached is None:
+                    errors[path] = errors[missing[digest]]
+                else:
+                    analyses[path] = cached
+    finally:
+        if own_cache:
+            cache.close()
+
+    albums = {}
+    for path in paths:
+        if path in analyses:
+            key = album_key(path, album_mode)
+            if key is not None:
+                albums.setdefault(key, []).append(path)
+    album_values = {}
+    for members in albums.values():
+        histogram = sum(analyses[p][1] for p in members)
+        loudness = integrated_loudness(histogram)
+        peak = max(analyses[p][0] for p in members)
+        for p in members:
+            album_values[p] = (None if loudness is None else REFERENCE_LUFS - loudness, peak)
+
+    results = []
+    for path in paths:
+        if path in errors:
+            results.append(LoudnessResult(path, False, None, None, None, None, None, errors[path]))
+            continue
+        peak, histogram = analyses[path]
+        loudness = integrated_loudness(histogram)
+        if loudness is None:
+            results.append(LoudnessResult(path, False, None, peak, None, None, None, "무음 파일입니다."))
+            continue
+        album_gain, album_peak = album_values.get(path, (None, None))
+        results.append(LoudnessResult(path, True, loudness, peak, REFERENCE_LUFS - loudness,
+                                      album_gain, album_peak, None))
+    return results
+
+
+def _digest_or_error(cache, path):
+    try:
+        return cache.digest(path)
+    except Exception as e:
+        return e
+
+
+# --- Tag Writing ---
+
+def replaygain_values(result):
+    values = {
+        'REPLAYGAIN_TRACK_GAIN': f"{result.gain:+.2f} dB",
+        'REPLAYGAIN_TRACK_PEAK': f"{result.peak:.6f}",
+        'REPLAYGAIN_REFERENCE_LOUDNESS': f"{REFERENCE_LUFS:.1f} LUFS",
+    }
+    if result.album_gain is not None:
+        values['REPLAYGAIN_ALBUM_GAIN'] = f"{result.album_gain:+.2f} dB"
+        values['REPLAYGAIN_ALBUM_PEAK'] = f"{result.album_peak:.6f}"
+    return values
+
+
+def write_replaygain(result, padding=tag_writer.DEFAULT_PADDING):
+    """Store a result as TXXX REPLAYGAIN_* frames. Returns None if nothing changed, else save_tags()'s result."""
+    from mutagen.id3 import ID3, ID3NoHeaderError, TXXX
+    try:
+        tags = ID3(result.path)
+    except ID3NoHeaderError:
+        tags = ID3()
+    values = replaygain_values(result)
+    current = {frame.desc.upper(): [str(t) for t in frame.text] for frame in tags.getall('TXXX')
+               if frame.desc.upper() in REPLAYGAIN_FIELDS}
+    if current == {k: [v] for k, v in values.items()}:
+        return None
+    # Other taggers write the descriptions in lower case; drop those too.
+    for frame in list(tags.getall('TXXX')):
+        if frame.desc.upper() in REPLAYGAIN_FIELDS:
+            del tags[frame.HashKey]
+    for desc, text in values.items():
+        tags.add(TXXX(encoding=3, desc=desc, text=text))
+    return tag_writer.save_tags(tags, result.path, padding)
+
+
+def tag_library(results, cache, jobs=4, on_result=None):
+    """Write the ReplayGain tags of every successful result on a thread pool.
+
+    Returns a list of (result, error) in input order. The payload hash of a
+    retagged file is re-recorded under its new mtime so the next run does not
+    hash it again.
+    """
+    def write(result):
+        if not result.ok:
+            return result, result.error
+        try:
+            digest = cache.digest(result.path)
+            if write_replaygain(result) is not None:
+                cache.remember(result.path, digest)
+            return result, None
+        except Exception as e:
+            return result, f"태그 저장 실패: {e}"
+
+    outcomes = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        for outcome in pool.map(write, results):
+            if on_result:
+                on_result(*outcome)
+            outcomes.append(outcome)
+    return outcomes
+
+
+# --- Command Line ---
+
+def main(argv=None):
+    import batch_tags
+    parser = argparse.ArgumentParser(description="MP3 파일의 음량을 분석하고 ReplayGain 태그를 기록합니다.")
+    parser.add_argument('targets', nargs='+', help="MP3 파일, 폴더 또는 glob 패턴")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 4, help="동시에 분석할 파일 수 (프로세스)")
+    parser.add_argument('--album', choices=('dir', 'tag', 'none'), default='dir',
+                        help="앨범 구분 기준: 폴더, 앨범 태그 또는 사용 안 함")
+    parser.add_argument('--dry-run', action='store_true', help="태그를 쓰지 않고 분석 결과만 출력")
+    parser.add_argument('--db', help="분석 캐시 데이터베이스 경로")
+    args = parser.parse_args(argv)
+
+    paths = batch_tags.collect_files(args.targets)
+    if not paths:
+        print("오류: 처리할 MP3 파일이 없습니다.")
+        return 1
+    cache = LoudnessCache(args.db)
+    try:
+        results = measure(paths, args.jobs, cache, args.album)
+        if args.dry_run:
+            outcomes = [(r, r.error) for r in results]
+            for outcome in outcomes:
+                print_result(*outcome)
+        else:
+            outcomes = tag_library(results, cache, args.jobs, on_result=print_result)
+    finally:
+        cache.close()
+    failed = sum(1 for _, error in outcomes if error)
+    print(f"\n완료: {len(outcomes) - failed}개 성공, {failed}개 실패")
+    return 1 if failed else 0
+
+
+def print_result(result, error):
+    if error:
+        print(f"실패: {result.path} ({error})")
+        return
+    line = f"{result.path}: {result.loudness:.2f} LUFS, 트랙 {result.gain:+.2f} dB, 피크 {result.peak:.4f}"
+    if result.album_gain is not None:
+        line += f", 앨범 {result.album_gain:+.2f} dB"
+    print(line)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,211 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from mutagen.mp3 import MP3
+from mutagen.id3 import ID3
+
+import metrics
+import storage
+
+COLUMNS = ('path', 'mtime_ns', 'size', 'title', 'artist', 'album', 'genre', 'track',
+           'duration', 'bitrate', 'sample_rate', 'art_hash')
+
+TrackInfo = namedtuple('TrackInfo', COLUMNS)
+ScanSummary = namedtuple('ScanSummary', 'added updated unchanged failed removed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    title TEXT, artist TEXT, album TEXT, genre TEXT, track TEXT,
+    duration REAL, bitrate INTEGER, sample_rate INTEGER, art_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS tracks_artist ON tracks (artist COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_album ON tracks (album COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS tracks_genre ON tracks (genre COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS failures (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    error TEXT
+);
+"""
+
+
+def _text(tags, frame_id):
+    frame = tags.get(frame_id) if tags is not None else None
+    return str(frame.text[0]) if frame is not None and frame.text else ''
+
+
+def read_track(path):
+    """Parse one file with mutagen into a TrackInfo."""
+    abspath, mtime_ns, size = storage.file_key(path)
+    with metrics.stage('tag_parse'):
+        audio = MP3(abspath, ID3=ID3)
+    tags = audio.tags
+    art = tags.getall('APIC') if tags is not None else []
+    art_hash = hashlib.sha1(art[0].data).hexdigest() if art else None
+    return TrackInfo(abspath, mtime_ns, size, _text(tags, 'TIT2'), _text(tags, 'TPE1'), _text(tags, 'TALB'),
+                     _text(tags, 'TCON'), _text(tags, 'TRCK'), audio.info.length, audio.info.bitrate,
+                     audio.info.sample_rate, art_hash)
+
+
+class MetadataIndex:
+    """On-disk SQLite index of parsed MP3 metadata, keyed by path + mtime + size."""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(storage.cache_dir(), 'library.sqlite')
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _row(self, abspath):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM tracks WHERE path = ?", (abspath,)).fetchone()
+        return TrackInfo(*row) if row else None
+
+    def _store(self, infos, failures=()):
+        """Save parsed tracks and (path, mtime_ns, size, error) parse failures; each replaces the other."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO tracks ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                infos)
+            self.conn.executemany("DELETE FROM failures WHERE path = ?", [(info.path,) for info in infos])
+            self.conn.executemany("INSERT OR REPLACE INTO failures (path, mtime_ns, size, error) VALUES (?, ?, ?, ?)",
+                                  failures)
+            self.conn.executemany("DELETE FROM tracks WHERE path = ?", [(f[0],) for f in failures])
+
+    def lookup(self, path):
+        """Return cached metadata for path, re-parsing only if the file changed."""
+        abspath, mtime_ns, size = storage.file_key(path)
+        cached = self._row(abspath)
+        if cached and cached.mtime_ns == mtime_ns and cached.size == size:
+            return cached
+        return self.refresh(abspath)
+
+    def refresh(self, path):
+        """Re-parse path and update its entry."""
+        info = read_track(path)
+        self._store([info])
+        return info
+
+    def scan(self, root, jobs=8, progress=None):
+        """Bring the index up to date for every MP3 under root.
+
+        Only new or changed files are parsed, on a thread pool; entries for
+        files that disappeared are removed. Files mutagen cannot parse are
+        remembered with their error, so an unchanged bad file is not parsed
+        again on the next scan. Returns a ScanSummary; `failed` counts every
+        file under root that is currently unreadable.
+        """
+        root = os.path.abspath(root)
+        on_disk = {}
+        for dirpath, _, names in os.walk(root):
+            for name in names:
+                if name.lower().endswith('.mp3'):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    on_disk[path] = (st.st_mtime_ns, st.st_size)
+        prefix = os.path.join(root, '')
+        where = "WHERE substr(path, 1, ?) = ?"
+        with self.lock:
+            known = {path: (mtime_ns, size) for path, mtime_ns, size in self.conn.execute(
+                f"SELECT path, mtime_ns, size FROM tracks {where}", (len(prefix), prefix))}
+            bad = {path: (mtime_ns, size) for path, mtime_ns, size in self.conn.execute(
+                f"SELECT path, mtime_ns, size FROM failures {where}", (len(prefix), prefix))}
+        changed = [path for path, key in on_disk.items() if known.get(path) != key and bad.get(path) != key]
+        removed = [path for path in set(known) | set(bad) if path not in on_disk]
+
+        parsed = []
+        failures = []
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            for i, (path, result) in enumerate(zip(changed, pool.map(_read_or_error, changed))):
+                if isinstance(result, TrackInfo):
+                    parsed.append(result)
+                else:
+                    failures.append((path, *on_disk[path], result))
+                if progress:
+                    progress((i + 1) / len(changed))
+        self._store(parsed, failures)
+        if removed:
+            with self.lock, self.conn:
+                self.conn.executemany("DELETE FROM tracks WHERE path = ?", [(p,) for p in removed])
+                self.conn.executemany("DELETE FROM failures WHERE path = ?", [(p,) for p in removed])
+        added = sum(1 for info in parsed if info.path not in known)
+        still_bad = sum(1 for path, key in bad.items() if on_disk.get(path) == key)
+        return ScanSummary(added, len(parsed) - added, len(on_disk) - len(changed) - still_bad,
+                           len(failures) + still_bad, len(removed))
+
+    def failures(self, root=None):
+        """(path, error) of the files that could not be parsed, optionally only under root."""
+        prefix = os.path.join(os.path.abspath(root), '') if root else ''
+        with self.lock:
+            return self.conn.execute("SELECT path, error FROM failures WHERE substr(path, 1, ?) = ? ORDER BY path",
+                                     (len(prefix), prefix)).fetchall()
+
+    def query(self, artist=None, album=None, genre=None):
+        """Return TrackInfos matching every given field (case-insensitive)."""
+        clauses, params = [], []
+        for column, value in (('artist', artist), ('album', album), ('genre', genre)):
+            if value is not None:
+                clauses.append(f"{column} = ? COLLATE NOCASE")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM tracks{where} ORDER BY artist, album, CAST(track AS INTEGER), path",
+                params).fetchall()
+        return [TrackInfo(*row) for row in rows]
+
+
+def _read_or_error(path):
+    try:
+        return read_track(path)
+    except Exception as e:
+        return str(e) or type(e).__name__
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MP3 메타데이터 색인을 갱신하고 조회합니다.")
+    parser.add_argument('--db', help="색인 데이터베이스 경로")
+    sub = parser.add_subparsers(dest='command', required=True)
+    scan = sub.add_parser('scan', help="폴더를 스캔하여 색인 갱신")
+    scan.add_argument('root')
+    scan.add_argument('--jobs', type=int, default=8)
+    query = sub.add_parser('query', help="아티스트/앨범/장르로 검색")
+    query.add_argument('--artist')
+    query.add_argument('--album')
+    query.add_argument('--genre')
+    args = parser.parse_args(argv)
+
+    index = MetadataIndex(args.db)
+    try:
+        if args.command == 'scan':
+            summary = index.scan(args.root, args.jobs)
+            for path, error in index.failures(args.root):
+                print(f"읽기 실패: {path} ({error})")
+            print(f"스캔 완료: {summary.added}개 추가, {summary.updated}개 갱신, {summary.unchanged}개 변경 없음, "
+                  f"{summary.failed}개 실패, {summary.removed}개 삭제")
+        else:
+            for t in index.query(args.artist, args.album, args.genre):
+                print(f"{t.artist} - {t.album} - {t.track} {t.title} ({int(t.duration // 60)}:{int(t.duration % 60):02d}) {t.path}")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
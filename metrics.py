@@ -0,0 +1,246 @@
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# Off unless MP3_EDITOR_METRICS (a file, or '-' for stderr) is set or the
+# command line passes --metrics / --profile / --trace-memory.
+_config = {
+    'path': os.environ.get('MP3_EDITOR_METRICS') or None,
+    'profile_dir': os.environ.get('MP3_EDITOR_PROFILE') or None,
+    'trace_memory': bool(os.environ.get('MP3_EDITOR_TRACE_MEMORY')),
+}
+_local = threading.local()
+_write_lock = threading.Lock()
+# cProfile hooks the whole interpreter, so only one operation is profiled at a time.
+_profile_lock = threading.Lock()
+_sequence = 0
+
+
+def configure(path=None, profile_dir=None, trace_memory=False):
+    """Turn metrics on from code (the command line flags end up here)."""
+    if path:
+        _config['path'] = path
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        _config['profile_dir'] = profile_dir
+    if trace_memory:
+        _config['trace_memory'] = True
+    if _config['trace_memory']:
+        if not enabled():
+            _config['path'] = '-'   # measuring memory with nowhere to report it would be pointless
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+def enabled():
+    return bool(_config['path'] or _config['profile_dir'])
+
+
+def current():
+    """The operation running on this thread, or None."""
+    return getattr(_local, 'op', None)
+
+
+def count(name, amount=1):
+    """Add to a counter of the current operation (bytes_read, pcm_encoded, ...)."""
+    op = getattr(_local, 'op', None)
+    if op is not None:
+        op.counters[name] = op.counters.get(name, 0) + amount
+
+
+def ffmpeg_time(op, seconds):
+    """Record one FFmpeg subprocess lifetime against op (captured when it was started)."""
+    if op is not None:
+        op.counters['ffmpeg_s'] = op.counters.get('ffmpeg_s', 0.0) + seconds
+        op.counters['ffmpeg_calls'] = op.counters.get('ffmpeg_calls', 0) + 1
+
+
+# --- Context Managers ---
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL = _Null()
+
+
+class _Stage:
+    def __init__(self, op, name):
+        self.op = op
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        entry = self.op.stages.setdefault(self.name, [0.0, 0])
+        entry[0] += time.perf_counter() - self.started
+        entry[1] += 1
+        return False
+
+    def set(self, **fields):
+        self.op.fields.update(fields)
+
+
+def stage(name):
+    """Time a block as a stage of the current operation: `with metrics.stage('encode'):`."""
+    op = getattr(_local, 'op', None)
+    return _NULL if op is None else _Stage(op, name)
+
+
+class Operation:
+    """Collects everything measured between entering and leaving one operation."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.stages = {}
+        self.counters = {}
+        self.profiler = None
+
+    def set(self, **fields):
+        """Attach extra fields to the event (output path, mode taken, ...)."""
+        self.fields.update(fields)
+
+    def __enter__(self):
+        self.parent = getattr(_local, 'op', None)
+        _local.op = self
+        self.tracing = _config['trace_memory'] and self.parent is None
+        if self.tracing:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self.children = _child_usage()
+        if _config['profile_dir'] and _profile_lock.acquire(blocking=False):
+            import cProfile
+            self.profiler = cProfile.Profile()
+            try:
+                self.profiler.enable()
+            except ValueError:   # another profiler (e.g. an outer debugger) is active
+                self.profiler = None
+                _profile_lock.release()
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.started
+        cpu = time.thread_time() - self.cpu_started
+        _local.op = self.parent
+        event = {
+            'event': 'operation',
+            'name': self.name,
+            'ok': exc_type is None,
+            'time': round(time.time(), 3),
+            'pid': os.getpid(),
+            'thread': threading.current_thread().name,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'stages': {name: {'s': round(s, 6), 'calls': n} for name, (s, n) in self.stages.items()},
+        }
+        event.update({k: round(v, 6) if isinstance(v, float) else v for k, v in self.counters.items()})
+        children = _child_usage()
+        if children is not None and self.children is not None:
+            event['child_cpu_s'] = round(children[0] - self.children[0], 6)
+            # High-water marks since the process started, not of this operation;
+            # peak_traced (--trace-memory) is the per-operation figure.
+            event['process_child_peak_rss'] = children[1]
+        if resource is not None:
+            event['process_peak_rss'] = _rss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+        if self.tracing:
+            import tracemalloc
+            event['peak_traced'] = tracemalloc.get_traced_memory()[1]
+        if self.profiler is not None:
+            self.profiler.disable()
+            event['profile'] = self._dump_profile()
+            _profile_lock.release()
+        if exc_type is not None:
+            event['error'] = str(exc) or exc_type.__name__
+        event.update(self.fields)
+        if self.parent is not None:
+            # A nested operation is folded into the outer one as a stage.
+            entry = self.parent.stages.setdefault(self.name, [0.0, 0])
+            entry[0] += wall
+            entry[1] += 1
+            for key, value in self.counters.items():
+                self.parent.counters[key] = self.parent.counters.get(key, 0) + value
+        else:
+            emit(event)
+        return False
+
+    def _dump_profile(self):
+        global _sequence
+        with _write_lock:
+            _sequence += 1
+            number = _sequence
+        path = os.path.join(_config['profile_dir'], f"{self.name}-{os.getpid()}-{number:04d}.prof")
+        self.profiler.dump_stats(path)
+        return path
+
+
+def operation(name, **fields):
+    """Measure one operation and emit its event when it ends (also on error)."""
+    return Operation(name, fields) if enabled() else _NULL
+
+
+# --- Output ---
+
+def emit(event):
+    """Append one JSON line to the metrics output."""
+    path = _config['path']
+    if not path:
+        return
+    line = json.dumps(event, ensure_ascii=False, default=str) + '\n'
+    with _write_lock:
+        if path == '-':
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        else:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def _rss_bytes(maxrss):
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def _child_usage():
+    """(CPU seconds, peak RSS) of finished child processes, i.e. the FFmpeg runs."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, _rss_bytes(usage.ru_maxrss)
+
+
+# --- Command Line ---
+
+def add_arguments(parser):
+    group = parser.add_argument_group("성능 측정")
+    group.add_argument('--metrics', metavar='FILE', help="작업별 측정값을 JSON lines로 기록 ('-'는 표준 오류)")
+    group.add_argument('--profile', metavar='DIR', help="작업마다 cProfile 결과(.prof)를 저장할 폴더 (--jobs 1 권장)")
+    group.add_argument('--trace-memory', action='store_true', help="tracemalloc으로 Python 메모리 최대치 측정 (느려짐, --metrics가 없으면 표준 오류로 기록)")
+    return parser
+
+
+def configure_from_args(args):
+    configure(getattr(args, 'metrics', None), getattr(args, 'profile', None), getattr(args, 'trace_memory', False))
+
+
+if _config['trace_memory']:
+    configure()
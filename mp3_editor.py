@@ -1,8 +1,5 @@
 import sys
 import os
-from mutagen.mp3 import MP3
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TCON, TRCK, APIC
-from pydub import AudioSegment
 
 # --- Helper Functions ---
 
@@ -11,13 +8,13 @@ def get_tag_frame(audio, tag_name):
     return audio.get(tag_name, type('', (object,), {'text': ['']})())
 
 def parse_time(time_str):
-    """Parse time string (MM:SS or SSS) into milliseconds."""
+    """Parse time string (MM:SS[.mmm] or SSS[.mmm]) into milliseconds."""
     try:
         if ':' in time_str:
-            mins, secs = map(int, time_str.split(':'))
-            return (mins * 60 + secs) * 1000
+            mins, secs = time_str.split(':')
+            return int(round((int(mins) * 60 + float(secs)) * 1000))
         else:
-            return int(time_str) * 1000
+            return int(round(float(time_str) * 1000))
     except ValueError:
         return None
 
@@ -25,13 +22,19 @@ def parse_time(time_str):
 
 def tag_editor_mode():
     """Handles all logic for editing MP3 metadata tags."""
+    from mutagen.mp3 import MP3
+    from mutagen.id3 import ID3, TIT2, TPE1, TALB, TCON, TRCK
+    import album_art
+    import metrics
+    import tag_writer
     file_path = input("편집할 MP3 파일의 경로를 입력하세요: ")
     if not os.path.exists(file_path):
         print(f"오류: 파일을 찾을 수 없습니다 - {file_path}")
         return
 
     try:
-        audio = MP3(file_path, ID3=ID3)
+        with metrics.operation('load_tags', path=file_path):
+            audio = MP3(file_path, ID3=ID3)
     except Exception as e:
         print(f"오류: MP3 파일을 열 수 없습니다. ({e})")
         return
@@ -71,18 +74,20 @@ def tag_editor_mode():
     new_art_path = input("새 앨범 아트 이미지 경로 (없으면 Enter): ")
     if new_art_path and os.path.exists(new_art_path):
         try:
-            with open(new_art_path, 'rb') as art_file:
-                audio.tags.delall('APIC')
-                audio.tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=art_file.read()))
-            print("앨범 아트가 성공적으로 변경되었습니다.")
+            data, mime = album_art.load_art_file(new_art_path)
+            if album_art.apply_art(audio.tags, data, mime):
+                print(f"앨범 아트가 성공적으로 변경되었습니다. ({mime}, {len(data) // 1024} KB)")
+            else:
+                print("같은 앨범 아트가 이미 들어 있어 변경하지 않았습니다.")
         except Exception as e:
             print(f"오류: 앨범 아트 처리 중 문제 발생. ({e})")
     elif new_art_path:
         print("경고: 앨범 아트 파일을 찾을 수 없습니다.")
 
     try:
-        audio.save()
-        print("\n태그 저장이 완료되었습니다.")
+        with metrics.operation('save_tags', path=file_path):
+            in_place = tag_writer.save_tags(audio.tags, file_path)
+        print(f"\n태그 저장이 완료되었습니다. ({'제자리 갱신' if in_place else '전체 재작성'})")
     except Exception as e:
         print(f"오류: 파일 저장 중 문제 발생. ({e})")
 
@@ -93,24 +98,38 @@ def audio_editor_mode():
     print("--- 오디오 편집 모드 ---")
     print("1: MP3 파일 자르기")
     print("2: MP3 파일 붙이기")
-    choice = input("원하는 작업을 선택하세요 (1 또는 2): ")
+    print("3: MP3 파일 여러 트랙으로 나누기")
+    choice = input("원하는 작업을 선택하세요 (1, 2 또는 3): ")
 
     if choice == '1':
         cut_mp3()
     elif choice == '2':
         merge_mp3()
+    elif choice == '3':
+        split_mp3()
     else:
         print("잘못된 선택입니다.")
 
 def cut_mp3():
-    """Cuts a section of an MP3 file and saves it as a new file."""
+    """Cuts a section of an MP3 file losslessly and saves it as a new file."""
+    import metrics
+    import mp3_frames
     file_path = input("자를 MP3 파일 경로: ")
-    start_time_str = input("시작 시간 (예: 1:25 또는 85): ")
+    start_time_str = input("시작 시간 (예: 1:25, 1:25.350 또는 85): ")
     end_time_str = input("종료 시간 (예: 2:30 또는 150): ")
     output_path = input("저장할 파일 이름 (예: output.mp3): ")
+    fade_in_str = input("페이드 인 길이 (초, 없으면 Enter): ")
+    fade_out_str = input("페이드 아웃 길이 (초, 없으면 Enter): ")
+    auto_trim = input("앞뒤 무음을 자동으로 제거할까요? (y/N): ").strip().lower() == 'y'
 
     start_ms = parse_time(start_time_str)
     end_ms = parse_time(end_time_str)
+    try:
+        fade_in_ms = int(float(fade_in_str or 0) * 1000)
+        fade_out_ms = int(float(fade_out_str or 0) * 1000)
+    except ValueError:
+        print("오류: 페이드 길이는 초 단위 숫자로 입력하세요.")
+        return
 
     if not os.path.exists(file_path):
         print("오류: 원본 파일을 찾을 수 없습니다.")
@@ -120,36 +139,94 @@ def cut_mp3():
         return
 
     try:
-        print("파일을 로드하는 중...")
-        audio = AudioSegment.from_mp3(file_path)
-        print("오디오를 자르는 중...")
-        cut_audio = audio[start_ms:end_ms]
-        print(f"'{output_path}' 파일로 저장하는 중...")
-        cut_audio.export(output_path, format="mp3")
+        with metrics.operation('cut', path=file_path, output=output_path, fades=bool(fade_in_ms or fade_out_ms)):
+            if auto_trim:
+                import silence
+                with metrics.stage('silence'):
+                    start_ms, end_ms = silence.suggest_trim(file_path, start_ms, end_ms)
+                print(f"무음을 제외한 구간: {start_ms / 1000:.3f}초 ~ {end_ms / 1000:.3f}초")
+            if fade_in_ms or fade_out_ms:
+                import effects
+                print(f"'{output_path}' 파일로 저장하는 중 (페이드 구간만 다시 인코딩)...")
+                actual_start, actual_end = effects.cut_with_fades(file_path, output_path, start_ms, end_ms,
+                                                                  fade_in_ms, fade_out_ms)
+            else:
+                print(f"'{output_path}' 파일로 프레임을 복사하는 중...")
+                actual_start, actual_end = mp3_frames.cut_frames(file_path, output_path, start_ms, end_ms)
+        print(f"프레임 경계 기준 구간: {actual_start / 1000:.3f}초 ~ {actual_end / 1000:.3f}초")
         print("파일 자르기가 완료되었습니다!")
     except Exception as e:
         print(f"오류 발생: {e}")
 
 def merge_mp3():
-    """Merges two MP3 files into a new file."""
-    file1_path = input("첫 번째 MP3 파일 경로: ")
-    file2_path = input("두 번째 MP3 파일 경로 (첫 번째 파일에 이어 붙일 파일): ")
+    """Merges any number of MP3 files into a new file."""
+    import audio_stream
+    import metrics
+    paths = []
+    while True:
+        path = input(f"{len(paths) + 1}번째 MP3 파일 경로 (입력을 마치려면 Enter): ")
+        if not path:
+            break
+        if not os.path.exists(path):
+            print(f"오류: 파일을 찾을 수 없습니다 - {path}")
+            continue
+        paths.append(path)
+    if len(paths) < 2:
+        print("오류: 붙일 파일을 두 개 이상 입력하세요.")
+        return
     output_path = input("저장할 파일 이름 (예: merged.mp3): ")
+    gapless = input("이음새 간격 없이 붙일까요? (LAME 정보가 있는 파일, FFmpeg 필요) [y/N]: ").strip().lower() == 'y'
 
-    if not os.path.exists(file1_path) or not os.path.exists(file2_path):
-        print("오류: 하나 또는 두 개의 원본 파일을 찾을 수 없습니다.")
+    try:
+        print(f"{len(paths)}개 파일을 '{output_path}' 파일로 합치는 중...")
+        with metrics.operation('merge', output=output_path, inputs=len(paths)) as op:
+            mode = audio_stream.merge_files(paths, output_path, gapless=gapless)
+            op.set(mode=mode)
+        if mode == "gapless":
+            print("파일 붙이기가 완료되었습니다! (무손실, 이음새 간격 없음)")
+        elif mode == "lossless":
+            print("파일 붙이기가 완료되었습니다! (무손실)")
+        else:
+            print("파일 형식이 달라 다시 인코딩했습니다. 파일 붙이기가 완료되었습니다!")
+    except Exception as e:
+        print(f"오류 발생: {e}")
+
+def split_mp3():
+    """Splits an MP3 file into several tracks in a single pass over the source."""
+    import metrics
+    import splitter
+    file_path = input("나눌 MP3 파일 경로: ")
+    if not os.path.exists(file_path):
+        print("오류: 원본 파일을 찾을 수 없습니다.")
         return
+    print("1: 구간 목록 입력 (예: 0:00-3:20,3:20-7:05)")
+    print("2: CUE 시트 사용")
+    print("3: N분 간격으로 나누기")
+    print("4: 무음 구간 기준으로 나누기")
+    rule = input("나누는 방법을 선택하세요 (1-4): ")
 
     try:
-        print("첫 번째 파일을 로드하는 중...")
-        audio1 = AudioSegment.from_mp3(file1_path)
-        print("두 번째 파일을 로드하는 중...")
-        audio2 = AudioSegment.from_mp3(file2_path)
-        print("파일을 합치는 중...")
-        merged_audio = audio1 + audio2
-        print(f"'{output_path}' 파일로 저장하는 중...")
-        merged_audio.export(output_path, format="mp3")
-        print("파일 붙이기가 완료되었습니다!")
+        if rule == '1':
+            segments = splitter.parse_ranges(input("구간 목록: "))
+        elif rule == '2':
+            segments = splitter.parse_cue(input("CUE 시트 경로: "), splitter.duration_ms(file_path))
+        elif rule == '3':
+            segments = splitter.ranges_every(splitter.duration_ms(file_path), float(input("간격 (분): ")))
+        elif rule == '4':
+            print("무음 구간을 찾는 중...")
+            segments = splitter.ranges_from_silence(file_path)
+        else:
+            print("잘못된 선택입니다.")
+            return
+        if input("각 트랙 앞뒤의 무음을 제거할까요? (y/N): ").strip().lower() == 'y':
+            segments = splitter.trim_segments(file_path, segments)
+        out_dir = input("저장할 폴더 (기본: 현재 폴더): ") or '.'
+        print(f"{len(segments)}개 트랙으로 나누는 중...")
+        with metrics.operation('split', path=file_path, tracks=len(segments)):
+            tracks = splitter.split_file(file_path, segments, out_dir)
+        for path, start, end in tracks:
+            print(f"  {path}: {start / 1000:.3f}초 ~ {end / 1000:.3f}초")
+        print("파일 나누기가 완료되었습니다!")
     except Exception as e:
         print(f"오류 발생: {e}")
 
@@ -157,6 +234,11 @@ def merge_mp3():
 
 def main():
     """Main function to run the application."""
+    if len(sys.argv) > 1:
+        # Any argument selects the scriptable command line instead of the prompts.
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+
     print("===== MP3 편집기 =====")
     print("1: 태그 편집 모드")
     print("2: 오디오 편집 모드")
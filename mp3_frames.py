@@ -0,0 +1,819 @@
+import bisect
+import hashlib
+import os
+import struct
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+
+import metrics
+import storage
+
+# --- MPEG Header Tables ---
+
+# Bitrates in kbps, indexed by (is_mpeg1, layer) and the 4-bit bitrate index.
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+# Sample rates indexed by the 2-bit version id (3: MPEG1, 2: MPEG2, 0: MPEG2.5).
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+CHANNEL_MONO = 3
+COPY_CHUNK = 64 * 1024
+SYNC_WINDOW = 64 * 1024
+
+FrameHeader = namedtuple(
+    'FrameHeader',
+    'version_id layer bitrate sample_rate padding protected channel_mode size samples raw')
+
+StreamInfo = namedtuple(
+    'StreamInfo',
+    'file_size tag_end data_start audio_end first xing_tag frame_count byte_count toc '
+    'encoder_delay encoder_padding')
+
+
+class MP3FrameError(Exception):
+    """Raised when an MPEG audio stream cannot be parsed."""
+
+
+# --- Header Parsing ---
+
+def parse_header(data, pos=0):
+    """Parse a 4-byte MPEG audio frame header, returning None if it is not valid."""
+    if len(data) < pos + 4 or data[pos] != 0xFF:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if (b1 & 0xE0) != 0xE0:
+        return None
+    version_id = (b1 >> 3) & 3
+    layer_id = (b1 >> 1) & 3
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 3
+    if version_id == 1 or layer_id == 0 or bitrate_index in (0, 15) or rate_index == 3 or (b3 & 3) == 2:
+        return None
+    layer = 4 - layer_id
+    mpeg1 = version_id == 3
+    bitrate = BITRATES[(mpeg1, layer)][bitrate_index] * 1000
+    sample_rate = SAMPLE_RATES[version_id][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        size = (12 * bitrate // sample_rate + padding) * 4
+        samples = 384
+    elif layer == 3 and not mpeg1:
+        size = 72 * bitrate // sample_rate + padding
+        samples = 576
+    else:
+        size = 144 * bitrate // sample_rate + padding
+        samples = 1152
+    return FrameHeader(version_id, layer, bitrate, sample_rate, padding, not (b1 & 1),
+                       b3 >> 6, size, samples, bytes(data[pos:pos + 4]))
+
+
+def side_info_size(header):
+    """Return the Layer III side-information size that follows the header (and CRC)."""
+    if header.layer != 3:
+        return 0
+    mono = header.channel_mode == CHANNEL_MONO
+    if header.version_id == 3:
+        return 17 if mono else 32
+    return 9 if mono else 17
+
+
+def same_format(a, b):
+    """True if two headers can live in the same stream without re-encoding."""
+    return (a.version_id == b.version_id and a.layer == b.layer and a.sample_rate == b.sample_rate
+            and (a.channel_mode == CHANNEL_MONO) == (b.channel_mode == CHANNEL_MONO))
+
+
+def id3v2_size(data):
+    """Return the full size of an ID3v2 tag starting at data[0], or 0 if there is none."""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+# --- Stream Discovery ---
+
+def trailing_tags_start(f, file_size):
+    """Return the offset where trailing ID3v1/APEv2 tags begin."""
+    end = file_size
+    for _ in range(2):
+        if end >= 128:
+            f.seek(end - 128)
+            if f.read(3) == b'TAG':
+                end -= 128
+                continue
+        if end >= 32:
+            f.seek(end - 32)
+            footer = f.read(32)
+            if footer[:8] == b'APETAGEX':
+                size, flags = struct.unpack('<II', footer[12:20])
+                end -= size + (32 if flags & 0x80000000 else 0)
+                continue
+        break
+    return max(end, 0)
+
+
+def find_frame(f, pos, end, reference=None, window=SYNC_WINDOW):
+    """Find the first frame at or after pos that is followed by another valid frame."""
+    f.seek(pos)
+    data = f.read(min(window, end - pos) + 4)
+    i = data.find(b'\xff')
+    while i != -1 and i + 4 <= len(data):
+        header = parse_header(data, i)
+        if header and (reference is None or same_format(header, reference)):
+            following = pos + i + header.size
+            if following >= end:
+                return pos + i, header
+            f.seek(following)
+            nxt = parse_header(f.read(4))
+            if nxt and same_format(header, nxt):
+                return pos + i, header
+        i = data.find(b'\xff', i + 1)
+    return None, None
+
+
+def read_xing(frame, header):
+    """Parse a Xing/Info (and LAME) or VBRI header out of the first frame.
+
+    Raises MP3FrameError when the frame ends before the fields its flags announce.
+    """
+    offset = 4 + (2 if header.protected else 0) + side_info_size(header)
+    tag = frame[offset:offset + 4]
+    result = {'tag': None, 'frames': None, 'bytes': None, 'toc': None, 'delay': 0, 'padding': 0}
+
+    def need(end):
+        if len(frame) < end:
+            raise MP3FrameError(f"VBR 헤더가 잘렸습니다 ({len(frame)}/{end}바이트).")
+
+    if tag in (b'Xing', b'Info'):
+        result['tag'] = tag
+        need(offset + 8)
+        flags = struct.unpack('>I', frame[offset + 4:offset + 8])[0]
+        p = offset + 8
+        if flags & 1:
+            need(p + 4)
+            result['frames'] = struct.unpack('>I', frame[p:p + 4])[0]
+            p += 4
+        if flags & 2:
+            need(p + 4)
+            result['bytes'] = struct.unpack('>I', frame[p:p + 4])[0]
+            p += 4
+        if flags & 4:
+            need(p + 100)
+            result['toc'] = list(frame[p:p + 100])
+            p += 100
+        if flags & 8:
+            p += 4
+        if len(frame) >= p + 24 and frame[p:p + 4] in (b'LAME', b'Lavc', b'Lavf'):
+            d0, d1, d2 = frame[p + 21:p + 24]
+            result['delay'] = (d0 << 4) | (d1 >> 4)
+            result['padding'] = ((d1 & 0x0F) << 8) | d2
+    elif frame[36:40] == b'VBRI':
+        result['tag'] = b'VBRI'
+        need(54)
+        result['delay'] = struct.unpack('>H', frame[42:44])[0]
+        result['bytes'], result['frames'] = struct.unpack('>II', frame[46:54])
+    return result
+
+
+def read_stream_info(f):
+    """Locate the audio frames of an open MP3 file and read its VBR header."""
+    f.seek(0, os.SEEK_END)
+    file_size = f.tell()
+    tag_end = 0
+    while True:
+        f.seek(tag_end)
+        size = id3v2_size(f.read(10))
+        if not size:
+            break
+        tag_end += size
+    audio_end = trailing_tags_start(f, file_size)
+    start, first = find_frame(f, tag_end, audio_end)
+    if first is None:
+        raise MP3FrameError("MPEG 오디오 프레임을 찾을 수 없습니다.")
+    f.seek(start)
+    xing = read_xing(f.read(first.size), first)
+    data_start = start + first.size if xing['tag'] else start
+    return StreamInfo(file_size, start, data_start, audio_end, first, xing['tag'],
+                      xing['frames'], xing['bytes'], xing['toc'], xing['delay'], xing['padding'])
+
+
+def is_vbr(info):
+    """True if frame offsets cannot be computed from the first frame's bitrate."""
+    return info.xing_tag in (b'Xing', b'VBRI')
+
+
+def frame_count(info):
+    """Number of audio frames, using the VBR header when present."""
+    if info.frame_count:
+        return info.frame_count
+    return int(round((info.audio_end - info.data_start) / _average_frame_size(info.first)))
+
+
+def average_bitrate(info):
+    """Bits per second of the whole stream; for VBR this is not the first frame's rate."""
+    seconds = frame_count(info) * info.first.samples / info.first.sample_rate
+    if not is_vbr(info) or seconds <= 0:
+        return info.first.bitrate
+    return int((info.audio_end - info.data_start) * 8 / seconds)
+
+
+def _average_frame_size(header):
+    if header.layer == 1:
+        return 48.0 * header.bitrate / header.sample_rate
+    return header.samples / 8.0 * header.bitrate / header.sample_rate
+
+
+def frame_at_ms(info, ms):
+    """Index of the frame boundary nearest to ms (ties go to the later frame)."""
+    return int(ms * info.first.sample_rate / (1000.0 * info.first.samples) + 0.5)
+
+
+def frame_to_ms(info, index):
+    return index * info.first.samples * 1000.0 / info.first.sample_rate
+
+
+def iter_frames(f, pos, end, reference):
+    """Yield (offset, header) for consecutive frames, resyncing over garbage."""
+    buf = b''
+    buf_pos = pos
+    while pos < end:
+        if pos + 4 > buf_pos + len(buf):
+            f.seek(pos)
+            buf = f.read(COPY_CHUNK)
+            buf_pos = pos
+        header = parse_header(buf, pos - buf_pos)
+        if header is None or not same_format(header, reference):
+            pos, header = find_frame(f, pos + 1, end, reference)
+            if header is None:
+                return
+            buf = b''
+        yield pos, header
+        pos += header.size
+
+
+def locate_frame(f, info, index, exact=True):
+    """Return the byte offset of frame `index` (counted from the first audio frame).
+
+    In a VBR file the exact offset needs the frame index. With exact=False
+    an already cached index is still used, but otherwise the offset is
+    estimated from the Xing TOC and resynced to the nearest frame, which
+    avoids walking every header of a long file.
+    """
+    if index <= 0:
+        return info.data_start
+    if is_vbr(info):
+        if exact:
+            return load_frame_index(f.name, f, info).offset(index)
+        cached = cached_frame_index(f.name)
+        if cached is not None:
+            return cached.offset(index)
+        estimate = _toc_offset(info, index)
+        window = SYNC_WINDOW
+    else:
+        estimate = info.data_start + int(round(index * _average_frame_size(info.first)))
+        window = info.first.size * 2
+    if estimate >= info.audio_end:
+        return info.audio_end
+    back = max(info.data_start, estimate - info.first.size // 2)
+    offset, _ = find_frame(f, back, info.audio_end, info.first, window=window)
+    return info.audio_end if offset is None else offset
+
+
+def _toc_offset(info, index):
+    """Estimated byte offset of frame `index` in a VBR file, interpolated from its TOC."""
+    total = frame_count(info)
+    if index >= total:
+        return info.audio_end
+    percent = 100.0 * index / total
+    if not info.toc:
+        return info.data_start + int(percent / 100.0 * (info.audio_end - info.data_start))
+    # TOC entries are 1/256ths of the stream bytes, counted from the Xing frame.
+    nbytes = info.byte_count or info.audio_end - info.tag_end
+    i = int(percent)
+    lo = info.toc[i]
+    hi = info.toc[i + 1] if i < 99 else 256
+    return max(info.data_start, info.tag_end + int((lo + (hi - lo) * (percent - i)) / 256.0 * nbytes))
+
+
+def frame_offsets(f, info, first, count):
+    """Byte offsets of frames first .. first + count (the last one may be audio_end)."""
+    offsets = []
+    for offset, _ in iter_frames(f, locate_frame(f, info, first), info.audio_end, info.first):
+        offsets.append(offset)
+        if len(offsets) > count:
+            return offsets
+    offsets.append(info.audio_end)
+    return offsets
+
+
+def main_data_begin(frame, header):
+    """Layer III back-pointer into the bit reservoir; 0 means the frame is self-contained."""
+    if header.layer != 3:
+        return 0
+    p = 4 + (2 if header.protected else 0)
+    if header.version_id == 3:
+        return (frame[p] << 1) | (frame[p + 1] >> 7)
+    return frame[p]
+
+
+# --- Seek Index ---
+
+class FrameIndex:
+    """Byte offset and starting sample of every frame, for O(log n) time/byte lookups."""
+
+    def __init__(self, offsets, positions, sample_rate, end):
+        self.offsets = offsets        # array('Q'): byte offset of each frame
+        self.positions = positions    # array('Q'): first sample of each frame, plus the total
+        self.sample_rate = sample_rate
+        self.end = end
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def duration_ms(self):
+        return self.positions[-1] * 1000.0 / self.sample_rate
+
+    def frame_at_ms(self, ms):
+        """Index of the frame boundary nearest to ms (ties go to the later frame)."""
+        target = ms * self.sample_rate / 1000.0
+        i = bisect.bisect_left(self.positions, target)
+        if i > 0 and (i == len(self.positions) or target - self.positions[i - 1] < self.positions[i] - target):
+            i -= 1
+        return min(i, len(self.offsets))
+
+    def time_ms(self, index):
+        return self.positions[min(index, len(self.offsets))] * 1000.0 / self.sample_rate
+
+    def offset(self, index):
+        return self.offsets[index] if index < len(self.offsets) else self.end
+
+    def snap_ms(self, ms):
+        """Round ms to the nearest frame boundary, exactly as the lossless cut does."""
+        return self.time_ms(self.frame_at_ms(ms))
+
+
+def build_frame_index(f, info):
+    """Walk every frame header once (no decoding) and record offsets and positions."""
+    offsets = array('Q')
+    positions = array('Q', [0])
+    for offset, header in iter_frames(f, info.data_start, info.audio_end, info.first):
+        offsets.append(offset)
+        positions.append(positions[-1] + header.samples)
+    return FrameIndex(offsets, positions, info.first.sample_rate, info.audio_end)
+
+
+_INDEX_MAGIC = b'MP3IDX1\0'
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+INDEX_CACHE_SIZE = 8
+INDEX_DISK_BUDGET = 64 * 1024 * 1024   # bytes of .idx files kept in the seek cache
+
+
+def _index_path(key):
+    return os.path.join(storage.cache_dir('seek'), hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.idx')
+
+
+def _read_index(path):
+    with open(path, 'rb') as f:
+        if f.read(8) != _INDEX_MAGIC:
+            return None
+        count, sample_rate, end = struct.unpack('<QQQ', f.read(24))
+        offsets = array('Q')
+        positions = array('Q')
+        offsets.fromfile(f, count)
+        positions.fromfile(f, count + 1)
+    return FrameIndex(offsets, positions, sample_rate, end)
+
+
+def _write_index(path, index):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_INDEX_MAGIC)
+        f.write(struct.pack('<QQQ', len(index.offsets), index.sample_rate, index.end))
+        index.offsets.tofile(f)
+        index.positions.tofile(f)
+    os.replace(tmp, path)
+    _prune_indexes(os.path.dirname(path), keep=path)
+
+
+def _prune_indexes(directory, keep, budget=None):
+    """Delete the least recently used .idx files until the seek cache fits its budget."""
+    budget = INDEX_DISK_BUDGET if budget is None else budget
+    files = []
+    for name in os.listdir(directory):
+        if name.endswith('.idx'):
+            try:
+                st = os.stat(os.path.join(directory, name))
+            except OSError:
+                continue
+            files.append((st.st_mtime_ns, st.st_size, os.path.join(directory, name)))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= budget:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def cached_frame_index(path, key=None):
+    """Return the frame index for path if it is in memory or on disk, else None."""
+    key = key or storage.file_key(path)
+    with _index_lock:
+        if key in _index_cache:
+            _index_cache.move_to_end(key)
+            return _index_cache[key]
+    cache_path = _index_path(key)
+    try:
+        index = _read_index(cache_path)
+        os.utime(cache_path)
+    except (OSError, EOFError, struct.error):
+        return None
+    if index is not None:
+        _remember_index(key, index)
+    return index
+
+
+def _remember_index(key, index):
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+
+def load_frame_index(path, f=None, info=None):
+    """Return the frame index for path from memory, the on-disk cache, or a fresh header walk."""
+    key = storage.file_key(path)
+    index = cached_frame_index(path, key)
+    if index is not None:
+        return index
+    if f is None:
+        with open(path, 'rb') as src:
+            index = build_frame_index(src, read_stream_info(src))
+    else:
+        index = build_frame_index(f, info or read_stream_info(f))
+    _write_index(_index_path(key), index)
+    _remember_index(key, index)
+    return index
+
+
+# --- Xing Header Writing ---
+
+class TocBuilder:
+    """Collect frame offsets in bounded memory and turn them into a 100-entry Xing TOC."""
+
+    def __init__(self, limit=4096):
+        self.limit = limit
+        self.stride = 1
+        self.count = 0
+        self.points = []
+
+    def add(self, offset):
+        if self.count % self.stride == 0:
+            self.points.append((self.count, offset))
+            if len(self.points) > self.limit:
+                self.points = self.points[::2]
+                self.stride *= 2
+        self.count += 1
+
+    def toc(self, base, total_bytes):
+        if not self.points or total_bytes <= 0:
+            return [int(i * 256 / 100) for i in range(100)]
+        toc = []
+        j = 0
+        for percent in range(100):
+            target = percent * self.count / 100.0
+            while j + 1 < len(self.points) and self.points[j + 1][0] <= target:
+                j += 1
+            offset = self.points[j][1] - base
+            toc.append(min(255, int(offset * 256 / total_bytes)))
+        return toc
+
+
+LAME_TAG_SIZE = 36
+LAME_VERSION = b'LAME3.100'
+
+
+def _crc16(data, crc=0):
+    """CRC-16 (polynomial 0x8005, reflected) as used by the LAME tag."""
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def build_xing_frame(header, frames, nbytes, toc=None, vbr=True, gapless=None):
+    """Build an empty frame carrying a Xing/Info header for the given stream totals.
+
+    gapless is an optional (encoder_delay, padding) pair; when given, a LAME
+    extension tag carrying them is added so players can trim the codec's
+    start-up and end padding samples.
+    """
+    tag = b'Xing' if vbr else b'Info'
+    raw = bytearray(header.raw)
+    raw[1] |= 1      # no CRC
+    raw[2] &= ~0x02  # no padding
+    needed = 4 + side_info_size(header) + 120 + (4 + LAME_TAG_SIZE if gapless else 0)
+    index = raw[2] >> 4
+    frame = parse_header(raw)
+    while frame.size < needed and index < 14:
+        index += 1
+        raw[2] = (raw[2] & 0x0F) | (index << 4)
+        frame = parse_header(raw)
+    offset = 4 + side_info_size(frame)
+    flags = 0x03 | (0x04 if toc is not None else 0) | (0x08 if gapless else 0)
+    body = tag + struct.pack('>III', flags, frames, nbytes)
+    if toc is not None:
+        body += bytes(toc)
+    if gapless:
+        delay, padding = (min(max(v, 0), 0xFFF) for v in gapless)
+        body += struct.pack('>I', 0)   # quality
+        lame = bytearray(LAME_TAG_SIZE)
+        lame[:9] = LAME_VERSION
+        lame[9] = 0x04 if vbr else 0x01   # tag revision 0, VBR method (vbr-new or CBR)
+        lame[20] = 0 if vbr else min(header.bitrate // 1000, 255)
+        lame[21:24] = bytes(((delay >> 4) & 0xFF, ((delay & 0x0F) << 4) | (padding >> 8), padding & 0xFF))
+        struct.pack_into('>I', lame, 28, nbytes)
+        body += bytes(lame)
+    data = bytearray(frame.size)
+    data[:4] = raw
+    data[offset:offset + len(body)] = body
+    if gapless:
+        # The tag CRC covers the frame up to the CRC field itself (190 bytes for
+        # MPEG-1 stereo). The music CRC is left at zero; players do not check it.
+        crc_pos = offset + len(body) - 2
+        struct.pack_into('>H', data, crc_pos, _crc16(data[:crc_pos]))
+    return bytes(data)
+
+
+# --- Lossless Cut ---
+
+def copy_range(src, dst, start, end, progress=None):
+    """Copy src[start:end] into dst in fixed-size chunks."""
+    src.seek(start)
+    remaining = end - start
+    total = max(remaining, 1)
+    while remaining > 0:
+        chunk = src.read(min(COPY_CHUNK, remaining))
+        if not chunk:
+            break
+        dst.write(chunk)
+        remaining -= len(chunk)
+        if progress:
+            progress(1.0 - remaining / total)
+    metrics.count('bytes_read', end - start - remaining)
+    metrics.count('bytes_written', end - start - remaining)
+
+
+def cut_frames(src_path, dst_path, start_ms, end_ms, progress=None):
+    """Copy the frames between start_ms and end_ms into a new file without re-encoding.
+
+    ID3v2 and trailing ID3v1/APE tags are kept, and a fresh Xing/Info header is
+    written so players report the duration of the cut rather than the source.
+    A VBR source without a cached frame index is entered through its Xing
+    TOC, so the start is only as precise as the TOC (1/256 of the stream)
+    while the length is exact; load_frame_index() first for an exact start.
+    Returns the frame-aligned (start_ms, end_ms) that was actually written.
+    """
+    with open(src_path, 'rb') as src:
+        info = read_stream_info(src)
+        total = frame_count(info)
+        first_index = min(frame_at_ms(info, start_ms), total)
+        last_index = min(frame_at_ms(info, end_ms), total)
+        if last_index <= first_index:
+            raise MP3FrameError("자를 구간에 오디오 프레임이 없습니다.")
+        start = locate_frame(src, info, first_index, exact=False)
+        frames = last_index - first_index
+        try:
+            with open(dst_path, 'wb') as dst:
+                copy_range(src, dst, 0, info.tag_end)
+                xing_pos = dst.tell()
+                if is_vbr(info):
+                    dst.write(build_xing_frame(info.first, 0, 0, [0] * 100))
+                    toc = TocBuilder()
+                    frames = copy_frames(src, start, info.audio_end, info.first, dst, toc, set(),
+                                         progress, limit=frames)
+                    nbytes = dst.tell() - xing_pos
+                    copy_range(src, dst, info.audio_end, info.file_size)
+                    dst.seek(xing_pos)
+                    dst.write(build_xing_frame(info.first, frames, nbytes, toc.toc(xing_pos, nbytes)))
+                else:
+                    end = locate_frame(src, info, last_index)
+                    xing_size = len(build_xing_frame(info.first, 0, 0, [0] * 100))
+                    dst.write(build_xing_frame(info.first, frames, end - start + xing_size, vbr=False))
+                    copy_range(src, dst, start, end, progress)
+                    copy_range(src, dst, info.audio_end, info.file_size)
+        except BaseException:
+            if os.path.exists(dst_path):
+                os.remove(dst_path)
+            raise
+    return frame_to_ms(info, first_index), frame_to_ms(info, first_index + frames)
+
+
+# --- Lossless Merge ---
+
+def copy_frames(src, start, end, reference, dst, toc, bitrates, progress=None, limit=None):
+    """Stream the frames in src[start:end] into dst, dropping garbage between frames.
+
+    Every written frame's output offset goes to `toc` and its bitrate to the
+    `bitrates` set. At most `limit` frames are copied when it is given.
+    Returns the number of frames copied.
+    """
+    count = 0
+    buf = b''
+    buf_pos = start
+    pos = start
+    total = max(end - start, 1)
+    while pos < end and (limit is None or count < limit):
+        header = parse_header(buf, pos - buf_pos) if pos + 4 <= buf_pos + len(buf) else None
+        if header is None:
+            src.seek(pos)
+            buf = src.read(COPY_CHUNK)
+            buf_pos = pos
+            header = parse_header(buf)
+            if header is None or not same_format(header, reference):
+                pos, header = find_frame(src, pos + 1, end, reference)
+                if header is None:
+                    break
+                src.seek(pos)
+                buf = src.read(COPY_CHUNK)
+                buf_pos = pos
+        frame_end = min(pos + header.size, end)
+        if frame_end > buf_pos + len(buf):
+            src.seek(pos)
+            buf = src.read(max(COPY_CHUNK, header.size))
+            buf_pos = pos
+        toc.add(dst.tell())
+        bitrates.add(header.bitrate)
+        dst.write(buf[pos - buf_pos:frame_end - buf_pos])
+        count += 1
+        pos += header.size
+        if progress and count % 256 == 0:
+            progress(count / limit if limit else (pos - start) / total)
+    metrics.count('bytes_read', min(pos, end) - start)
+    metrics.count('bytes_written', min(pos, end) - start)
+    return count
+
+
+def merge_frames(paths, dst_path, progress=None):
+    """Concatenate MP3 files at the frame level without decoding them.
+
+    All inputs must share MPEG version, layer, sample rate and channel count
+    (see can_merge_losslessly). Memory use is bounded by the copy buffer and
+    the decimated TOC, regardless of the number or length of the inputs. The
+    ID3v2 tag and the trailing ID3v1/APEv2 tags of the first file are kept
+    and a Xing header covering the whole result is written in front of the
+    audio. Returns the total frame count.
+    """
+    infos = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            infos.append(read_stream_info(f))
+    reference = infos[0].first
+    for path, info in zip(paths, infos):
+        if not same_format(reference, info.first):
+            raise MP3FrameError(f"형식이 다른 파일은 무손실로 붙일 수 없습니다: {path}")
+    toc = TocBuilder()
+    bitrates = set()
+    frames = 0
+    try:
+        with open(dst_path, 'wb') as dst:
+            with open(paths[0], 'rb') as src:
+                copy_range(src, dst, 0, infos[0].tag_end)
+            xing_pos = dst.tell()
+            placeholder = build_xing_frame(reference, 0, 0, [0] * 100)
+            dst.write(placeholder)
+            for i, (path, info) in enumerate(zip(paths, infos)):
+                step = (lambda done, i=i: progress((i + done) / len(paths))) if progress else None
+                with open(path, 'rb') as src:
+                    frames += copy_frames(src, info.data_start, info.audio_end, info.first, dst, toc, bitrates, step)
+            audio_end = dst.tell()
+            with open(paths[0], 'rb') as src:
+                copy_range(src, dst, infos[0].audio_end, infos[0].file_size)
+            nbytes = audio_end - xing_pos
+            xing = build_xing_frame(reference, frames, nbytes, toc.toc(xing_pos, nbytes),
+                                    vbr=len(bitrates) > 1)
+            dst.seek(xing_pos)
+            dst.write(xing)
+    except BaseException:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        raise
+    if progress:
+        progress(1.0)
+    return frames
+
+
+def can_merge_losslessly(paths):
+    """True if every file shares the first file's stream format."""
+    reference = None
+    for path in paths:
+        with open(path, 'rb') as f:
+            header = read_stream_info(f).first
+        if reference is None:
+            reference = header
+        elif not same_format(reference, header):
+            return False
+    return True
+
+
+# --- Single-Pass Split ---
+
+def split_frames(src_path, segments, progress=None):
+    """Write several frame ranges of one source to separate files in a single read.
+
+    segments is a list of (start_ms, end_ms, dst_path, tag_bytes); tag_bytes
+    (a rendered ID3v2 tag, may be empty) is written in front of each output
+    together with its own Xing header. The source is read once, sequentially,
+    and every chunk is handed to the outputs whose byte range it overlaps.
+    Returns the frame-aligned (start_ms, end_ms) of each segment.
+    """
+    with open(src_path, 'rb') as src:
+        info = read_stream_info(src)
+        total = frame_count(info)
+        index = load_frame_index(src_path, src, info) if is_vbr(info) else None
+        xing_size = len(build_xing_frame(info.first, 0, 0, [0] * 100))
+        plans = []
+        for start_ms, end_ms, dst_path, tag_bytes in segments:
+            first = min(frame_at_ms(info, start_ms), total)
+            last = min(frame_at_ms(info, end_ms), total)
+            if last <= first:
+                raise MP3FrameError(f"구간에 오디오 프레임이 없습니다: {dst_path}")
+            start, end = locate_frame(src, info, first), locate_frame(src, info, last)
+            nbytes = end - start + xing_size
+            toc = None
+            if index is not None:
+                builder = TocBuilder()
+                for i in range(first, last):
+                    builder.add(index.offset(i))
+                toc = builder.toc(start - xing_size, nbytes)
+            plans.append({'start': start, 'end': end, 'path': dst_path, 'first': first, 'last': last,
+                          'head': tag_bytes + build_xing_frame(info.first, last - first, nbytes, toc, vbr=is_vbr(info))})
+
+        pending = sorted(plans, key=lambda p: p['start'])
+        begin = pending[0]['start']
+        stop = max(p['end'] for p in plans)
+        pos = begin
+        active = []
+        written = []
+        read = 0
+        try:
+            src.seek(pos)
+            while pos < stop:
+                chunk = src.read(min(COPY_CHUNK, stop - pos))
+                if not chunk:
+                    break
+                read += len(chunk)
+                chunk_end = pos + len(chunk)
+                while pending and pending[0]['start'] < chunk_end:
+                    plan = pending.pop(0)
+                    plan['out'] = open(plan['path'], 'wb')
+                    written.append(plan['path'])
+                    plan['out'].write(plan['head'])
+                    active.append(plan)
+                for plan in list(active):
+                    lo, hi = max(plan['start'], pos), min(plan['end'], chunk_end)
+                    if lo < hi:
+                        plan['out'].write(chunk[lo - pos:hi - pos])
+                    if plan['end'] <= chunk_end:
+                        plan['out'].close()
+                        active.remove(plan)
+                pos = chunk_end
+                if not active and pending and pending[0]['start'] > pos:
+                    # Skip the gap between two segments instead of reading it.
+                    pos = pending[0]['start']
+                    src.seek(pos)
+                if progress:
+                    progress((pos - begin) / max(stop - begin, 1))
+        except BaseException:
+            for plan in active:
+                plan['out'].close()
+            for path in written:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        for plan in active:
+            plan['out'].close()
+    metrics.count('bytes_read', read)
+    metrics.count('bytes_written', sum(p['end'] - p['start'] + len(p['head']) for p in plans))
+    return [(frame_to_ms(info, p['first']), frame_to_ms(info, p['last'])) for p in plans]
@@ -0,0 +1,301 @@
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import audio_stream
+import mp3_frames
+import storage
+
+# Spill file layout: header, then interleaved s16le samples.
+_MAGIC = b'PCM1'
+_HEADER = struct.Struct('<4sIHxxQ')    # magic, sample rate, channels, frame count
+DEFAULT_BUDGET = 1024 * 1024 * 1024    # bytes of decoded audio kept on disk
+
+
+class DecodedAudio:
+    """A decoded file, memory-mapped from its spill file as an (n, channels) int16 array."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, self.sample_rate, self.channels, frames = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"PCM 캐시 파일이 손상되었습니다: {path}")
+        self.path = path
+        self.samples = (np.memmap(path, dtype='<i2', mode='r', offset=_HEADER.size, shape=(frames, self.channels))
+                        if frames else np.zeros((0, self.channels), dtype='<i2'))
+
+    @property
+    def nbytes(self):
+        return self.samples.nbytes
+
+    @property
+    def duration_ms(self):
+        return len(self.samples) * 1000.0 / self.sample_rate
+
+    def slice_ms(self, start_ms=None, duration_ms=None):
+        start = int((start_ms or 0) * self.sample_rate / 1000)
+        end = len(self.samples) if duration_ms is None else start + int(duration_ms * self.sample_rate / 1000)
+        return self.samples[start:end]
+
+    def chunks(self, start_ms=None, duration_ms=None, chunk_size=audio_stream.PCM_CHUNK):
+        """Yield s16le byte chunks like audio_stream.decode_pcm, straight from the mapping."""
+        view = self.slice_ms(start_ms, duration_ms)
+        step = max(chunk_size // (2 * self.channels), 1)
+        for i in range(0, len(view), step):
+            yield memoryview(np.ascontiguousarray(view[i:i + step])).cast('B')
+
+
+class PCMCache:
+    """LRU cache of decoded audio, spilled to raw PCM files and memory-mapped.
+
+    Entries are keyed by path, mtime, size and output format, so an edited
+    file is decoded again. When the spill files exceed `budget` bytes the
+    least recently used ones are deleted. Spill files survive restarts.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, directory=None, decoder=audio_stream.decode_pcm):
+        self.budget = budget
+        self.directory = directory or storage.cache_dir('pcm')
+        self.decoder = decoder
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()   # key -> spill file size, least recently used first
+        self.mapped = {}               # key -> DecodedAudio currently open
+        self.decoding = {}             # key -> [lock held while decoding it, callers using the lock]
+        self.hits = self.misses = self.evictions = 0
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pcm'):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime_ns, name[:-4], st.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+
+    def _key(self, path, sample_rate, channels):
+        raw = repr((storage.file_key(path), sample_rate, channels)).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def _spill_path(self, key):
+        return os.path.join(self.directory, key + '.pcm')
+
+    def _format(self, path, sample_rate, channels):
+        if sample_rate is None or channels is None:
+            with open(path, 'rb') as f:
+                first = mp3_frames.read_stream_info(f).first
+            sample_rate = sample_rate or first.sample_rate
+            channels = channels or (1 if first.channel_mode == mp3_frames.CHANNEL_MONO else 2)
+        return sample_rate, channels
+
+    def peek(self, path, sample_rate=None, channels=None):
+        """Return DecodedAudio for path if it is already cached, else None (counted as a miss)."""
+        sample_rate, channels = self._format(path, sample_rate, channels)
+        return self._lookup(self._key(path, sample_rate, channels))
+
+    def get(self, path, sample_rate=None, channels=None, progress=None):
+        """Return DecodedAudio for path, decoding it with FFmpeg only on a miss.
+
+        sample_rate and channels default to the file's own format.
+        """
+        sample_rate, channels = self._format(path, sample_rate, channels)
+        key = self._key(path, sample_rate, channels)
+        entry = self._acquire(key)
+        try:
+            with entry[0]:
+                audio = self._lookup(key)
+                if audio is None:
+                    for _ in self._spill(key, path, sample_rate, channels, progress=progress):
+                        pass
+                    audio = self.mapped[key]
+                return audio
+        finally:
+            self._release(key, entry)
+
+    def stream(self, path, sample_rate=None, channels=None, chunk_size=audio_stream.PCM_CHUNK):
+        """Yield s16le chunks of path: from the spill file on a hit, or as they are decoded on a miss.
+
+        On a miss every chunk is written to the spill file before it is
+        handed on, so the caller sees progress from the start. Closing the
+        generator early (a cancelled job) stops FFmpeg and drops the
+        partial spill file.
+        """
+        sample_rate, channels = self._format(path, sample_rate, channels)
+        key = self._key(path, sample_rate, channels)
+        entry = self._acquire(key)
+        try:
+            with entry[0]:
+                audio = self._lookup(key)
+                if audio is None:
+                    yield from self._spill(key, path, sample_rate, channels, chunk_size)
+                    return
+        finally:
+            self._release(key, entry)
+        yield from audio.chunks(chunk_size=chunk_size)
+
+    def _acquire(self, key):
+        # Callers asking for the same file share one lock and wait for one
+        # decode. The lock is created and counted under the cache lock, and
+        # only dropped when its last user is done, so a late caller can never
+        # get a fresh lock and decode the same file alongside a waiting one.
+        with self.lock:
+            entry = self.decoding.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        return entry
+
+    def _release(self, key, entry):
+        with self.lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.decoding[key]
+
+    def _lookup(self, key):
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            audio = self.mapped.get(key)
+        if audio is None:
+            try:
+                audio = DecodedAudio(self._spill_path(key))
+            except (OSError, ValueError):
+                with self.lock:
+                    self.entries.pop(key, None)
+                    self.misses += 1
+                return None
+            with self.lock:
+                self.mapped[key] = audio
+        try:
+            os.utime(audio.path)
+        except OSError:
+            pass
+        with self.lock:
+            self.hits += 1
+        return audio
+
+    def _spill(self, key, path, sample_rate, channels, chunk_size=audio_stream.PCM_CHUNK, progress=None):
+        """Decode path into its spill file, yielding each chunk once it is written."""
+        spill = self._spill_path(key)
+        tmp = spill + '.tmp'
+        with open(path, 'rb') as f:
+            info = mp3_frames.read_stream_info(f)
+        expected = max(mp3_frames.frame_count(info) * info.first.samples * sample_rate // info.first.sample_rate, 1)
+        written = 0
+        try:
+            with open(tmp, 'wb') as out:
+                out.write(_HEADER.pack(_MAGIC, sample_rate, channels, 0))
+                for chunk in self.decoder(path, sample_rate=sample_rate, channels=channels, chunk_size=chunk_size):
+                    out.write(chunk)
+                    written += len(chunk)
+                    if progress:
+                        progress(min(written / (expected * 2 * channels), 1.0))
+                    yield chunk
+                out.seek(0)
+                out.write(_HEADER.pack(_MAGIC, sample_rate, channels, written // (2 * channels)))
+            os.replace(tmp, spill)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        audio = DecodedAudio(spill)
+        with self.lock:
+            self.entries[key] = os.path.getsize(spill)
+            self.mapped[key] = audio
+            self._evict(keep=key)
+
+    def _evict(self, keep):
+        total = sum(self.entries.values())
+        for key in list(self.entries):
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            total -= self.entries.pop(key)
+            self.mapped.pop(key, None)
+            self.evictions += 1
+            try:
+                os.remove(self._spill_path(key))
+            except OSError:
+                pass   # still mapped elsewhere (Windows); the next session's scan finds it again
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.entries):
+                self.mapped.pop(key, None)
+                try:
+                    os.remove(self._spill_path(key))
+                except OSError:
+                    pass
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'bytes': sum(self.entries.values()),
+                'budget': self.budget,
+            }
+
+
+# --- Shared Instance ---
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def _env_budget():
+    megabytes = os.environ.get('MP3_EDITOR_PCM_CACHE_MB')
+    return int(megabytes) * 1024 * 1024 if megabytes else None
+
+
+def enable(budget=None):
+    """Turn on the process-wide cache used by decode_pcm().
+
+    Interactive sessions enable it; one-shot command line runs leave it off
+    unless MP3_EDITOR_PCM_CACHE_MB is set, so batch jobs do not fill the disk
+    with audio they read once. Without a budget argument the variable (or
+    DEFAULT_BUDGET) sets the size.
+    """
+    global _shared
+    budget = budget or _env_budget()
+    with _shared_lock:
+        if _shared is None:
+            _shared = PCMCache(budget or DEFAULT_BUDGET)
+        elif budget:
+            _shared.budget = budget
+        return _shared
+
+
+def shared_cache():
+    if _shared is None and _env_budget():
+        enable()
+    return _shared
+
+
+def decode_pcm(path, sample_rate=None, channels=None, start_ms=None, duration_ms=None,
+               chunk_size=audio_stream.PCM_CHUNK):
+    """audio_stream.decode_pcm, served from the shared cache when it is enabled.
+
+    A whole-file request fills the cache; a partial one (auto-trim looking at
+    the ends of a long file) uses it when present but never decodes the whole
+    file just to read a small range.
+    """
+    cache = shared_cache()
+    if cache is not None:
+        if start_ms is None and duration_ms is None:
+            return cache.stream(path, sample_rate, channels, chunk_size)
+        audio = cache.peek(path, sample_rate, channels)
+        if audio is not None:
+            return audio.chunks(start_ms, duration_ms, chunk_size)
+    return audio_stream.decode_pcm(path, sample_rate, channels, start_ms, duration_ms, chunk_size)
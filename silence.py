@@ -0,0 +1,145 @@
+import numpy as np
+
+import mp3_frames
+import pcm_cache
+
+BLOCK_MS = 10                # analysis resolution
+DEFAULT_THRESHOLD_DB = -50.0
+DEFAULT_MIN_SILENCE_MS = 700
+TRIM_WINDOW_MS = 60 * 1000   # default for how far into each end auto-trim looks before scanning everything
+TRIM_PAD_MS = 50             # silence kept in front of and after the sound so onsets aren't clipped
+SILENCE_FLOOR_DB = -120.0    # level reported for digital silence
+
+
+def _stream_info(path):
+    with open(path, 'rb') as f:
+        return mp3_frames.read_stream_info(f)
+
+
+def duration_ms(path):
+    info = _stream_info(path)
+    return mp3_frames.frame_to_ms(info, mp3_frames.frame_count(info))
+
+
+# --- Block Levels ---
+
+def block_levels(path, block_ms=BLOCK_MS, start_ms=0, duration_ms=None, progress=None):
+    """Yield arrays of per-block RMS levels in dBFS for a range of path.
+
+    The file is decoded to mono with FFmpeg and processed chunk by chunk, so
+    memory stays constant however long the file is.
+    """
+    info = _stream_info(path)
+    sample_rate = info.first.sample_rate
+    block = max(int(sample_rate * block_ms / 1000), 1)
+    span_ms = duration_ms
+    if span_ms is None:
+        span_ms = mp3_frames.frame_to_ms(info, mp3_frames.frame_count(info)) - start_ms
+    expected = span_ms * sample_rate / 1000
+    carry = np.zeros(0, dtype=np.float32)
+    done = 0
+    for chunk in pcm_cache.decode_pcm(path, sample_rate=sample_rate, channels=1,
+                                         start_ms=start_ms or None, duration_ms=duration_ms):
+        samples = np.concatenate([carry, np.frombuffer(chunk, dtype='<i2').astype(np.float32) / 32768.0])
+        usable = len(samples) - len(samples) % block
+        carry = samples[usable:]
+        done += usable
+        if usable:
+            yield _to_db(samples[:usable].reshape(-1, block))
+        if progress:
+            progress(min(done / max(expected, 1), 1.0))
+    if len(carry):
+        yield _to_db(carry.reshape(1, -1))
+
+
+def _to_db(blocks):
+    power = np.einsum('ij,ij->i', blocks, blocks) / blocks.shape[1]
+    with np.errstate(divide='ignore'):
+        levels = 10.0 * np.log10(power)
+    return np.maximum(levels, SILENCE_FLOOR_DB)
+
+
+# --- Silent Intervals ---
+
+def find_silence(path, threshold_db=DEFAULT_THRESHOLD_DB, min_silence_ms=DEFAULT_MIN_SILENCE_MS,
+                 start_ms=0, end_ms=None, block_ms=BLOCK_MS, progress=None):
+    """Return the (start_ms, end_ms) intervals quieter than threshold_db for at least min_silence_ms."""
+    duration = None if end_ms is None else max(end_ms - start_ms, 0)
+    intervals = []
+    run_start = None   # block index where the current quiet run began
+    position = 0       # block index of the first block in the current array
+    was_quiet = False
+    for levels in block_levels(path, block_ms, start_ms, duration, progress):
+        quiet = levels < threshold_db
+        # Only the transitions are visited in Python; everything else stays vectorized.
+        flips = np.flatnonzero(np.diff(np.concatenate([[was_quiet], quiet]).astype(np.int8)))
+        for index in flips:
+            if quiet[index]:
+                run_start = position + index
+            else:
+                intervals.append((run_start, position + index))
+        was_quiet = bool(quiet[-1])
+        position += len(levels)
+    if was_quiet:
+        intervals.append((run_start, position))
+    min_blocks = min_silence_ms / block_ms
+    return [(start_ms + a * block_ms, start_ms + b * block_ms) for a, b in intervals if b - a >= min_blocks]
+
+
+def _sound_bounds(path, threshold_db, start_ms, end_ms, block_ms):
+    """Block offsets of the first and last loud block in [start_ms, end_ms), or None if all quiet."""
+    first = last = None
+    position = 0
+    for levels in block_levels(path, block_ms, start_ms, end_ms - start_ms):
+        loud = np.flatnonzero(levels >= threshold_db)
+        if len(loud):
+            if first is None:
+                first = position + loud[0]
+            last = position + loud[-1]
+        position += len(levels)
+    return None if first is None else (first, last + 1)
+
+
+def suggest_trim(path, start_ms=0, end_ms=None, threshold_db=DEFAULT_THRESHOLD_DB,
+                 pad_ms=TRIM_PAD_MS, block_ms=BLOCK_MS, window_ms=TRIM_WINDOW_MS):
+    """Return (start_ms, end_ms) with the leading and trailing silence of the range removed.
+
+    Only window_ms at each end is decoded; the whole range is scanned only
+    when a window turns out to be entirely silent, so a window longer than
+    the longest expected lead-in saves work. Returns the range unchanged if
+    it contains no sound at all.
+    """
+    if end_ms is None:
+        end_ms = duration_ms(path)
+    if end_ms - start_ms <= 2 * window_ms:
+        bounds = _sound_bounds(path, threshold_db, start_ms, end_ms, block_ms)
+        if bounds is None:
+            return start_ms, end_ms
+        head, tail = start_ms + bounds[0] * block_ms, start_ms + bounds[1] * block_ms
+    else:
+        head_bounds = _sound_bounds(path, threshold_db, start_ms, start_ms + window_ms, block_ms)
+        tail_start = end_ms - window_ms
+        tail_bounds = _sound_bounds(path, threshold_db, tail_start, end_ms, block_ms)
+        if head_bounds is None or tail_bounds is None:
+            bounds = _sound_bounds(path, threshold_db, start_ms, end_ms, block_ms)
+            if bounds is None:
+                return start_ms, end_ms
+            head, tail = start_ms + bounds[0] * block_ms, start_ms + bounds[1] * block_ms
+        else:
+            head, tail = start_ms + head_bounds[0] * block_ms, tail_start + tail_bounds[1] * block_ms
+    return max(start_ms, head - pad_ms), min(end_ms, tail + pad_ms)
+
+
+def sound_ranges(path, threshold_db=DEFAULT_THRESHOLD_DB, min_silence_ms=DEFAULT_MIN_SILENCE_MS,
+                 min_sound_ms=0, progress=None):
+    """Split the whole file at its silences: the (start_ms, end_ms) runs of sound between them."""
+    total = duration_ms(path)
+    ranges = []
+    position = 0
+    for quiet_start, quiet_end in find_silence(path, threshold_db, min_silence_ms, progress=progress):
+        if quiet_start > position:
+            ranges.append((position, quiet_start))
+        position = quiet_end
+    if position < total:
+        ranges.append((position, total))
+    return [(max(a - TRIM_PAD_MS, 0), min(b + TRIM_PAD_MS, total)) for a, b in ranges if b - a >= min_sound_ms]
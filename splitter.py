@@ -0,0 +1,247 @@
+import argparse
+import os
+import re
+from collections import namedtuple
+
+import mp3_frames
+import tag_writer
+
+# CUE sheets count time in CD frames: 75 per second.
+CUE_FPS = 75
+
+DEFAULT_NAME = "{tracknumber:02d} {title}"
+
+# One output track: times in milliseconds, title/performer may be empty.
+Segment = namedtuple('Segment', 'start_ms end_ms title performer')
+
+
+# --- Range Sources ---
+
+def _parse_clock(text):
+    """'1:02:03.5', '3:20' or '200' -> milliseconds."""
+    parts = text.strip().split(':')
+    try:
+        seconds = 0.0
+        for part in parts:
+            seconds = seconds * 60 + float(part)
+    except ValueError:
+        raise ValueError(f"시간 형식이 잘못되었습니다: {text}")
+    return int(round(seconds * 1000))
+
+
+def parse_ranges(text):
+    """'0:00-3:20, 3:20-7:05' -> [Segment]. A missing end means 'until the next start'."""
+    segments = []
+    for i, item in enumerate(p for p in text.split(',') if p.strip()):
+        start, sep, end = item.partition('-')
+        start_ms = _parse_clock(start)
+        end_ms = _parse_clock(end) if sep and end.strip() else None
+        segments.append(Segment(start_ms, end_ms, f"Track {i + 1}", ''))
+    return _close_open_ends(segments, None)
+
+
+def ranges_every(duration_ms, minutes):
+    """Consecutive segments of `minutes` length covering the whole file."""
+    step = int(minutes * 60 * 1000)
+    if step <= 0:
+        raise ValueError("분할 간격은 0보다 커야 합니다.")
+    return [Segment(start, min(start + step, duration_ms), f"Part {i + 1}", '')
+            for i, start in enumerate(range(0, int(duration_ms), step))]
+
+
+def ranges_from_silence(path, threshold_db=None, min_silence_ms=None, min_track_ms=0, progress=None):
+    """One segment per run of sound between silences of at least min_silence_ms."""
+    import silence
+    threshold_db = silence.DEFAULT_THRESHOLD_DB if threshold_db is None else threshold_db
+    min_silence_ms = silence.DEFAULT_MIN_SILENCE_MS if min_silence_ms is None else min_silence_ms
+    ranges = silence.sound_ranges(path, threshold_db, min_silence_ms, min_track_ms, progress)
+    return [Segment(start, end, f"Track {i + 1}", '') for i, (start, end) in enumerate(ranges)]
+
+
+def trim_segments(path, segments, threshold_db=None):
+    """Remove the leading and trailing silence of every segment."""
+    import silence
+    threshold_db = silence.DEFAULT_THRESHOLD_DB if threshold_db is None else threshold_db
+    trimmed = []
+    for segment in segments:
+        start, end = silence.suggest_trim(path, segment.start_ms, segment.end_ms, threshold_db)
+        trimmed.append(segment._replace(start_ms=start, end_ms=end))
+    return trimmed
+
+
+def _read_text(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    for encoding in ('utf-8-sig', 'cp949'):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('latin-1')
+
+
+_CUE_COMMAND = re.compile(r'^\s*(\w+)\s+(.*?)\s*$')
+
+
+def _unquote(value):
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def parse_cue(path, duration_ms=None):
+    """Read the TRACK/TITLE/PERFORMER/INDEX 01 entries of a CUE sheet into Segments.
+
+    Each track ends where the next one starts; the last one runs to duration_ms.
+    """
+    album_performer = ''
+    tracks = []
+    for line in _read_text(path).splitlines():
+        match = _CUE_COMMAND.match(line)
+        if not match:
+            continue
+        command, value = match.group(1).upper(), match.group(2)
+        if command == 'TRACK':
+            tracks.append({'title': '', 'performer': '', 'start': None})
+        elif command in ('TITLE', 'PERFORMER') and tracks:
+            tracks[-1][command.lower()] = _unquote(value)
+        elif command == 'PERFORMER':
+            album_performer = _unquote(value)
+        elif command == 'INDEX' and tracks:
+            number, _, stamp = value.partition(' ')
+            if number.strip() == '01':
+                mm, ss, ff = (int(x) for x in stamp.strip().split(':'))
+                tracks[-1]['start'] = (mm * 60 + ss) * 1000 + ff * 1000 // CUE_FPS
+    segments = [Segment(t['start'], None, t['title'] or f"Track {i + 1}", t['performer'] or album_performer)
+                for i, t in enumerate(tracks) if t['start'] is not None]
+    if not segments:
+        raise ValueError(f"CUE 시트에 트랙이 없습니다: {path}")
+    return _close_open_ends(segments, duration_ms)
+
+
+def _close_open_ends(segments, duration_ms):
+    closed = []
+    for i, segment in enumerate(segments):
+        end_ms = segment.end_ms
+        if end_ms is None:
+            end_ms = segments[i + 1].start_ms if i + 1 < len(segments) else duration_ms
+        if end_ms is None:
+            raise ValueError("마지막 구간의 종료 시간을 알 수 없습니다.")
+        if end_ms <= segment.start_ms:
+            raise ValueError(f"{i + 1}번째 구간이 비어 있습니다: {segment.start_ms / 1000:.3f}초 ~ {end_ms / 1000:.3f}초")
+        closed.append(segment._replace(end_ms=end_ms))
+    return closed
+
+
+# --- Splitting ---
+
+_UNSAFE = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def safe_filename(name):
+    return _UNSAFE.sub('_', name).strip(' .') or 'track'
+
+
+def _source_tags(path):
+    from mutagen.id3 import ID3, ID3NoHeaderError
+    try:
+        return ID3(path)
+    except ID3NoHeaderError:
+        return ID3()
+
+
+def segment_tag(base, segment, number, total):
+    """A copy of the source tag with the title, track number and performer of one segment."""
+    from mutagen.id3 import ID3, TIT2, TPE1, TRCK
+    tags = ID3()
+    for frame in base.values():
+        tags.add(frame)
+    tags.delall('TLEN')
+    tags.setall('TIT2', [TIT2(encoding=3, text=segment.title)])
+    tags.setall('TRCK', [TRCK(encoding=3, text=f"{number}/{total}")])
+    if segment.performer:
+        tags.setall('TPE1', [TPE1(encoding=3, text=segment.performer)])
+    return tags
+
+
+def split_file(src_path, segments, out_dir, name_template=DEFAULT_NAME, progress=None):
+    """Write every segment of src_path to out_dir in one pass over the source.
+
+    Each output gets the source's tag with its own title and track number.
+    Returns a list of (path, start_ms, end_ms) with frame-aligned times.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    base = _source_tags(src_path)
+    total = len(segments)
+    jobs = []
+    used = set()
+    for number, segment in enumerate(segments, 1):
+        name = safe_filename(name_template.format(tracknumber=number, tracktotal=total,
+                                                  title=segment.title, performer=segment.performer))
+        path = os.path.join(out_dir, name + '.mp3')
+        suffix = 2
+        while path in used:
+            path = os.path.join(out_dir, f"{name} ({suffix}).mp3")
+            suffix += 1
+        used.add(path)
+        tag_bytes = tag_writer.render_tag(segment_tag(base, segment, number, total))
+        jobs.append((segment.start_ms, segment.end_ms, path, tag_bytes))
+    actual = mp3_frames.split_frames(src_path, jobs, progress)
+    return [(path, start, end) for (_, _, path, _), (start, end) in zip(jobs, actual)]
+
+
+def duration_ms(path):
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+        return mp3_frames.frame_to_ms(info, mp3_frames.frame_count(info))
+
+
+# --- Command Line ---
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="MP3 파일을 여러 트랙으로 한 번에 나눕니다.")
+    parser.add_argument('source', help="나눌 MP3 파일")
+    rule = parser.add_mutually_exclusive_group(required=True)
+    rule.add_argument('--ranges', help="구간 목록 (예: 0:00-3:20,3:20-7:05)")
+    rule.add_argument('--cue', metavar='CUE', help="CUE 시트 파일")
+    rule.add_argument('--every', type=float, metavar='MINUTES', help="N분 간격으로 나누기")
+    rule.add_argument('--silence', action='store_true', help="무음 구간을 기준으로 나누기")
+    parser.add_argument('--threshold', type=float, default=None, metavar='DB',
+                        help="무음으로 볼 음량 (dBFS, 기본 -50)")
+    parser.add_argument('--min-silence', type=int, default=None, metavar='MS',
+                        help="트랙 경계로 볼 최소 무음 길이 (밀리초, 기본 700)")
+    parser.add_argument('--min-track', type=int, default=0, metavar='MS',
+                        help="--silence 사용 시 이보다 짧은 트랙은 버림 (밀리초)")
+    parser.add_argument('--auto-trim', action='store_true', help="각 트랙 앞뒤의 무음 제거")
+    parser.add_argument('-o', '--out-dir', default='.', help="결과 파일을 저장할 폴더")
+    parser.add_argument('--name', default=DEFAULT_NAME,
+                        help="파일 이름 형식 ({tracknumber}, {tracktotal}, {title}, {performer})")
+    return parser
+
+
+def segments_from_args(args):
+    if args.ranges:
+        return parse_ranges(args.ranges)
+    if args.cue:
+        return parse_cue(args.cue, duration_ms(args.source))
+    if args.silence:
+        return ranges_from_silence(args.source, args.threshold, args.min_silence, args.min_track)
+    return ranges_every(duration_ms(args.source), args.every)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        segments = segments_from_args(args)
+        if args.auto_trim:
+            segments = trim_segments(args.source, segments, args.threshold)
+        results = split_file(args.source, segments, args.out_dir, args.name)
+    except (OSError, ValueError, mp3_frames.MP3FrameError) as e:
+        print(f"오류: {e}")
+        return 1
+    for path, start, end in results:
+        print(f"{path}: {start / 1000:.3f}초 ~ {end / 1000:.3f}초")
+    print(f"\n완료: {len(results)}개 트랙")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
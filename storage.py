@@ -0,0 +1,19 @@
+import os
+
+
+def cache_dir(*parts):
+    """Return (and create) a directory under the application's cache root.
+
+    The root defaults to ~/.cache/mp3_editer and can be moved with the
+    MP3_EDITOR_CACHE environment variable.
+    """
+    root = os.environ.get('MP3_EDITOR_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'mp3_editer')
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_key(path):
+    """Identity of a file's current contents: (absolute path, mtime in ns, size)."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
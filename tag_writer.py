@@ -0,0 +1,67 @@
+import io
+import os
+import shutil
+import tempfile
+
+import metrics
+
+# Padding reserved whenever a tag has to be (re)written from scratch, so that
+# later edits, including a new cover, can be patched in place.
+DEFAULT_PADDING = 64 * 1024
+
+
+class _NeedsRewrite(Exception):
+    """The new tag does not fit in the space the old tag occupies."""
+
+
+def _fit_existing(info):
+    # mutagen calls this before touching the file; info.padding is the space
+    # left over if the tag keeps its current size, negative if it won't fit.
+    if info.padding < 0:
+        raise _NeedsRewrite()
+    return info.padding
+
+
+def save_tags(tags, path, padding=DEFAULT_PADDING, atomic=False):
+    """Save an ID3 tag, patching only the tag region when it fits the existing one.
+
+    When the tag has outgrown its region (or the file has no tag yet), or
+    atomic is set, the file is rewritten through a temporary copy with
+    `padding` bytes reserved. An in-place patch never touches the audio, but
+    a crash during it can leave the tag itself half written.
+    Returns True for an in-place save and False for a full rewrite.
+    """
+    with metrics.stage('tag_save'):
+        if not atomic:
+            try:
+                tags.save(path, padding=_fit_existing)
+                return True
+            except _NeedsRewrite:
+                pass
+        rewrite_atomically(tags, path, padding)
+        metrics.count('tag_rewrites')
+        metrics.count('bytes_written', os.path.getsize(path))
+        return False
+
+
+def rewrite_atomically(tags, path, padding=DEFAULT_PADDING):
+    """Save tags through a temporary copy so a crash never leaves a half-written file."""
+    fd, tmp_path = tempfile.mkstemp(prefix='.tagtmp-', suffix='.mp3', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        shutil.copy2(path, tmp_path)
+        tags.save(tmp_path, padding=lambda info: padding)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_tag(tags, padding=DEFAULT_PADDING):
+    """Return an ID3v2 tag as bytes, for writing in front of a freshly built file."""
+    if not tags:
+        return b''
+    buffer = io.BytesIO()
+    tags.save(buffer, v1=0, padding=lambda info: padding)
+    return buffer.getvalue()
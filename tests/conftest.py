@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def cache_root(tmp_path, monkeypatch):
+    """Keep frame indexes and other caches out of the real ~/.cache."""
+    root = tmp_path / 'cache'
+    monkeypatch.setenv('MP3_EDITOR_CACHE', str(root))
+    return root
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from mutagen.id3 import ID3, TIT2, TRCK
+
+import batch_tags
+
+AUDIO = (b'\xff\xfb\x94\x00' + bytes(380)) * 20
+
+
+def make_mp3(path, title=None, track=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(AUDIO)
+    if title or track:
+        tags = ID3()
+        if title:
+            tags.add(TIT2(encoding=3, text=title))
+        if track:
+            tags.add(TRCK(encoding=3, text=track))
+        tags.save(str(path))
+    return str(path)
+
+
+# --- File Collection ---
+
+def test_collect_files_walks_directories_and_globs(tmp_path):
+    a = make_mp3(tmp_path / 'lib' / 'a.mp3')
+    b = make_mp3(tmp_path / 'lib' / 'sub' / 'B.MP3')
+    c = make_mp3(tmp_path / 'other' / 'c.mp3')
+    (tmp_path / 'lib' / 'notes.txt').write_text('x')
+    (tmp_path / 'other' / 'dir.mp3').mkdir()
+    found = batch_tags.collect_files([str(tmp_path / 'lib'), str(tmp_path / 'other' / '*.mp3'), a])
+    assert found == sorted([a, b, c])
+    assert batch_tags.collect_files([str(tmp_path / 'missing' / '*.mp3')]) == []
+
+
+# --- Mapping ---
+
+def test_parse_mapping():
+    mapping = batch_tags.parse_mapping(['Title={tracknumber:02d} {title}', 'album=Live'], ['genre'])
+    assert mapping == [('title', '{tracknumber:02d} {title}'), ('album', 'Live'), ('genre', None)]
+
+
+@pytest.mark.parametrize('set_args, clear_args, message', [
+    (['title'], [], 'title'),
+    (['nope=x'], [], 'nope'),
+    ([], ['nope'], 'nope'),
+    (['title={nope}'], [], '{nope}'),
+    (['title={title'], [], 'title'),
+])
+def test_parse_mapping_rejects(set_args, clear_args, message):
+    with pytest.raises(ValueError, match=message.replace('{', r'\{')):
+        batch_tags.parse_mapping(set_args, clear_args)
+
+
+def test_template_context_and_rendering(tmp_path):
+    path = make_mp3(tmp_path / 'Album' / 'song.mp3', title='Song', track='3/12')
+    tags = ID3(path)
+    context = batch_tags.template_context(path, tags, 2, 5)
+    assert (context['tracknumber'], context['tracktotal'], context['filename'], context['dirname']) == (3, 12, 'song', 'Album')
+    assert (context['artist'], context['index'], context['count']) == ('', 2, 5)
+    mapping = batch_tags.parse_mapping(['title={tracknumber:02d}/{tracktotal} {title}', 'album={dirname}'], ['tracknumber'])
+    changes = batch_tags.apply_mapping(tags, mapping, context)
+    assert changes == {'title': '03/12 Song', 'album': 'Album', 'tracknumber': None}
+    assert str(tags['TIT2']) == '03/12 Song' and 'TRCK' not in tags
+    assert batch_tags.apply_mapping(tags, mapping, context) == {}
+
+
+def test_bad_format_reports_the_field(tmp_path):
+    path = make_mp3(tmp_path / 'a.mp3', title='Song')
+    tags = ID3(path)
+    context = batch_tags.template_context(path, tags, 1, 1)
+    with pytest.raises(ValueError, match='title'):
+        batch_tags.apply_mapping(tags, [('title', '{title:02d}')], context)
+    with pytest.raises(ValueError, match=r'album.*\{nope\}'):
+        batch_tags.apply_mapping(tags, [('album', '{nope}')], context)
+
+
+# --- Writing ---
+
+def test_run_batch_reports_each_file_in_order(tmp_path):
+    paths = [make_mp3(tmp_path / f'{i}.mp3', title=f't{i}') for i in range(5)]
+    broken = str(tmp_path / 'broken.mp3')
+    with open(broken, 'wb') as f:
+        f.write(b'ID3\x04\x00\x00\x7f\x7f\x7f\x7f')
+    mapping = batch_tags.parse_mapping(['title={index}/{count} {title}'])
+    results = batch_tags.run_batch(paths + [broken], mapping, jobs=3)
+    assert [r.path for r in results] == paths + [broken]
+    assert [r.ok for r in results] == [True] * 5 + [False] and results[-1].error
+    assert [str(ID3(p)['TIT2']) for p in paths] == [f'{i + 1}/6 t{i}' for i in range(5)]
+
+
+def test_dry_run_and_atomic(tmp_path):
+    path = make_mp3(tmp_path / 'a.mp3', title='old')
+    mapping = batch_tags.parse_mapping(['title=new'])
+    before = os.stat(path).st_mtime_ns, open(path, 'rb').read()
+    result = batch_tags.tag_file(path, mapping, dry_run=True)
+    assert result.changes == {'title': 'new'} and result.in_place is None
+    assert (os.stat(path).st_mtime_ns, open(path, 'rb').read()) == before
+    inode = os.stat(path).st_ino
+    result = batch_tags.tag_file(path, mapping, atomic=True)
+    assert result.ok and result.in_place is False and os.stat(path).st_ino != inode
+    assert str(ID3(path)['TIT2']) == 'new'
@@ -0,0 +1,145 @@
+import math
+import struct
+
+import numpy as np
+import pytest
+
+import audio_stream
+import effects
+import mp3_frames
+
+HEADER_128 = b'\xff\xfb\x94\x00'   # MPEG-1 Layer III, 48 kHz, 128 kbps, 384 bytes
+SPF = 1152
+
+
+def stream_info(path):
+    with open(path, 'rb') as f:
+        return mp3_frames.read_stream_info(f)
+
+
+# --- Fades ---
+
+@pytest.mark.parametrize('curve', sorted(effects.GAIN_CURVES))
+def test_gain_curves_run_from_zero_to_one(curve):
+    shape = effects.GAIN_CURVES[curve]
+    x = np.linspace(0.0, 1.0, 101)
+    y = shape(x)
+    assert y[0] == pytest.approx(0.0) and y[-1] == pytest.approx(1.0)
+    assert np.all(np.diff(y) >= 0)
+
+
+def test_gain_curve_shapes():
+    x = np.linspace(0.0, 1.0, 11)
+    curves = effects.GAIN_CURVES
+    assert np.allclose(curves['equal-power'](x) ** 2 + curves['equal-power'](1 - x) ** 2, 1.0)
+    assert np.allclose(curves['s-curve'](x) + curves['s-curve'](1 - x), 1.0)
+    assert np.all(curves['exponential'](x) <= x) and np.all(curves['logarithmic'](x) >= x)
+
+
+def test_fade_gain_endpoints():
+    gain = effects.fade_gain(cut_start=1000, cut_length=1000, fade_in=100, fade_out=200)
+    g = gain(np.array([999, 1000, 1050, 1100, 1500, 1900, 1999, 2000], dtype=np.float64))
+    assert g.tolist() == pytest.approx([0.0, 0.0, 0.5, 1.0, 1.0, 0.5, 0.005, 0.0])
+
+
+def test_fade_gain_without_fades_only_masks_the_cut():
+    gain = effects.fade_gain(0, 10, 0, 0, 'equal-power')
+    assert gain(np.arange(-2, 12, dtype=np.float64)).tolist() == [0] * 2 + [1] * 10 + [0] * 2
+
+
+# --- Aligned Encoding ---
+
+class FakeEncoder:
+    """Replaces FFmpeg: one frame per SPF input samples, each carrying its first sample value."""
+
+    def __init__(self, delay=None, drop=0):
+        self.delay = delay
+        self.drop = drop
+        self.inputs = []
+
+    def __call__(self, pcm, dst_path, sample_rate, channels, bitrate, extra_args=()):
+        samples = np.frombuffer(pcm, dtype='<i2').reshape(-1, channels)
+        self.inputs.append((len(samples), extra_args))
+        count = math.ceil(len(samples) / SPF) - self.drop
+        frames = [HEADER_128 + struct.pack('<i', int(samples[k * SPF, 0])) + bytes(376) for k in range(count)]
+        head = b''
+        if self.delay is not None:
+            header = mp3_frames.parse_header(HEADER_128)
+            head = mp3_frames.build_xing_frame(header, count, count * 384, vbr=False, gapless=(self.delay, 0))
+        with open(dst_path, 'wb') as f:
+            f.write(head + b''.join(frames))
+
+
+def first_samples(frames):
+    return [struct.unpack('<i', frame[4:8])[0] for frame in frames]
+
+
+@pytest.fixture
+def source_info(tmp_path):
+    path = tmp_path / 'src.mp3'
+    path.write_bytes((HEADER_128 + bytes(380)) * 4)
+    return stream_info(str(path))
+
+
+@pytest.mark.parametrize('delay', [None, 1105])
+def test_encode_aligned_skips_warmup_and_codec_delay(monkeypatch, source_info, delay):
+    encoder = FakeEncoder(delay)
+    monkeypatch.setattr(audio_stream, 'encode_file', encoder)
+    pcm = np.repeat(np.arange(20 * SPF, dtype=np.int32) % 30000, 2).reshape(-1, 2).astype(np.int16)
+    lead = 6 * SPF
+    frames = effects.encode_aligned(pcm, lead, 3, source_info, 128000)
+    shift = (delay or effects.ENCODER_DELAY) + effects.DECODER_DELAY
+    warmup = math.ceil(shift / SPF) + 1
+    assert len(frames) == 3
+    # Frame i of the result was encoded from the input that decodes to target sample lead + i * SPF.
+    assert first_samples(frames) == [lead + i * SPF + shift for i in range(3)]
+    assert encoder.inputs[-1][0] == (3 + 1 + warmup) * SPF - shift
+    assert encoder.inputs[-1][1] == ('-reservoir', '0')
+    assert len(encoder.inputs) == (2 if delay else 1)   # a different reported delay re-encodes once
+
+
+def test_encode_aligned_pads_before_the_stream_start(monkeypatch, source_info):
+    monkeypatch.setattr(audio_stream, 'encode_file', FakeEncoder())
+    pcm = (np.arange(6 * SPF * 2, dtype=np.int32).reshape(-1, 2) % 30000 + 1).astype(np.int16)
+    frames = effects.encode_aligned(pcm, 0, 2, source_info, 128000)
+    shift = effects.ENCODER_DELAY + effects.DECODER_DELAY
+    assert first_samples(frames) == [pcm[i * SPF + shift, 0] for i in range(2)]
+
+
+def test_encode_aligned_short_output_raises(monkeypatch, source_info):
+    monkeypatch.setattr(audio_stream, 'encode_file', FakeEncoder(drop=3))
+    pcm = np.zeros((10 * SPF, 2), dtype=np.int16)
+    with pytest.raises(audio_stream.FFmpegError):
+        effects.encode_aligned(pcm, 2 * SPF, 3, source_info, 128000)
+
+
+# --- Gapless Joins ---
+
+@pytest.mark.parametrize('real, kept, length', [
+    (3 * SPF, 2000, 3 * SPF),                # already whole frames
+    (3 * SPF + 200, 1800, 3 * SPF),          # small remainder: A's last samples are dropped
+    (3 * SPF + 1000, 2152, 4 * SPF),         # large remainder: silence fills the frame
+])
+def test_fit_to_frames_trims_or_pads(real, kept, length):
+    pcm_a = np.arange(2000 * 2, dtype=np.int16).reshape(2000, 2) + 1
+    fitted, new_real = effects._fit_to_frames(pcm_a, real, SPF)
+    assert new_real == length and len(fitted) == kept
+    shared = min(len(fitted), len(pcm_a))
+    assert np.array_equal(fitted[:shared], pcm_a[:shared])
+    assert not fitted[shared:].any()
+
+
+def test_merge_without_gapless_is_lossless(tmp_path, monkeypatch):
+    header = mp3_frames.parse_header(HEADER_128)
+    frame = HEADER_128 + bytes(380)
+    xing = mp3_frames.build_xing_frame(header, 5, 5 * 384, vbr=False, gapless=(576, 100))
+    paths = []
+    for name in ('a.mp3', 'b.mp3'):
+        path = tmp_path / name
+        path.write_bytes(xing + frame * 5)
+        paths.append(str(path))
+    assert effects.has_gapless_info(paths[0])
+    monkeypatch.setattr(audio_stream, 'ffmpeg_available', lambda: False)
+    dst = str(tmp_path / 'merged.mp3')
+    assert audio_stream.merge_files(paths, dst) == "lossless"
+    assert audio_stream.merge_files(paths, dst, gapless=True) == "lossless"
@@ -0,0 +1,130 @@
+import io
+import struct
+
+import pytest
+
+import integrity
+import mp3_frames
+
+HEADER = b'\xff\xfb\x94\x00'             # MPEG-1 Layer III, 48 kHz, 128 kbps, 384 bytes
+PROTECTED = b'\xff\xfa\x94\x00'          # the same with a CRC after the header
+ID3_TAG = b'ID3\x03\x00\x00\x00\x00\x00\x16' + b'\x00' * 22
+ID3V1_TAG = b'TAG' + b'v1 title'.ljust(125, b'\x00')
+
+
+def make_frame(i, protected=False):
+    side = bytes((i + k) % 200 + 1 for k in range(32))
+    body = bytes((i * 7 + k) % 200 + 1 for k in range(384 - 4 - 32 - (2 if protected else 0)))
+    if not protected:
+        return HEADER + side + body
+    return PROTECTED + struct.pack('>H', integrity.frame_crc(PROTECTED[2:4] + side)) + side + body
+
+
+def xing(frames, count=None):
+    header = mp3_frames.parse_header(HEADER)
+    size = len(mp3_frames.build_xing_frame(header, 0, 0))
+    return mp3_frames.build_xing_frame(header, len(frames) if count is None else count,
+                                       size + sum(map(len, frames)), vbr=False)
+
+
+def write(path, *parts):
+    path.write_bytes(b''.join(parts))
+    return str(path)
+
+
+def kinds(result):
+    return [issue['kind'] for issue in result.issues]
+
+
+# --- Scanning ---
+
+def test_frame_crc_check_value():
+    assert integrity.frame_crc(b'123456789') == 0xAEE7
+
+
+def test_clean_file(tmp_path):
+    frames = [make_frame(i) for i in range(20)]
+    result = integrity.scan_file(write(tmp_path / 'a.mp3', ID3_TAG, xing(frames), *frames, ID3V1_TAG))
+    assert result.ok and result.issues == [] and result.error is None
+    assert result.frames == 20 and result.duration_ms == 20 * 24.0
+    assert (result.first_frame, result.audio_start) == (len(ID3_TAG), len(ID3_TAG) + 384)
+    assert result.audio_end == result.audio_start + 20 * 384
+
+
+def test_crc_mismatch(tmp_path):
+    frames = [make_frame(i, protected=True) for i in range(10)]
+    broken = bytearray(frames[4])
+    broken[10] ^= 0x01          # flip a side-information bit covered by the CRC
+    frames[4] = bytes(broken)
+    result = integrity.scan_file(write(tmp_path / 'a.mp3', *frames))
+    assert not result.ok and kinds(result) == ['crc_mismatch']
+    assert result.issues[0]['offset'] == 4 * 384 and result.frames == 10
+    assert integrity.scan_file(str(tmp_path / 'a.mp3'), check_crc=False).ok
+
+
+def test_truncated_last_frame(tmp_path):
+    frames = [make_frame(i) for i in range(10)]
+    result = integrity.scan_file(write(tmp_path / 'a.mp3', *frames, frames[0][:100]))
+    assert not result.ok and kinds(result) == ['truncated_tail']
+    assert result.frames == 10 and result.audio_end == 10 * 384
+
+
+def test_garbage_between_frames(tmp_path):
+    frames = [make_frame(i) for i in range(10)]
+    junk = b'\x00junk\x01' * 10
+    result = integrity.scan_file(write(tmp_path / 'a.mp3', *frames[:3], junk, *frames[3:]))
+    assert not result.ok and kinds(result) == ['sync_lost']
+    assert result.issues[0]['offset'] == 3 * 384 and result.frames == 10
+
+
+def test_wrong_xing_frame_count_is_a_warning(tmp_path):
+    frames = [make_frame(i) for i in range(10)]
+    result = integrity.scan_file(write(tmp_path / 'a.mp3', xing(frames, count=12), *frames))
+    assert result.ok and kinds(result) == ['frame_count_mismatch']
+
+
+def test_unreadable_file_is_reported_not_raised(tmp_path):
+    result = integrity.scan_file(str(tmp_path / 'missing.mp3'))
+    assert not result.ok and result.error
+
+
+def test_resync_slides_past_the_sync_window():
+    frames = [make_frame(i) for i in range(3)]
+    gap = mp3_frames.SYNC_WINDOW * 2 + 17
+    data = bytes(gap) + b''.join(frames)
+    reference = mp3_frames.parse_header(HEADER)
+    pos, header = integrity._resync(io.BytesIO(data), 0, len(data), reference)
+    assert pos == gap and header == reference
+    assert integrity._resync(io.BytesIO(bytes(gap)), 0, gap, reference) == (None, None)
+
+
+# --- Repair ---
+
+def test_repair_keeps_only_valid_frames(tmp_path):
+    from mutagen.id3 import ID3, TIT2
+    frames = [make_frame(i) for i in range(12)]
+    path = write(tmp_path / 'a.mp3', ID3_TAG, xing(frames, count=99), *frames[:5], b'\x00garbage' * 8,
+                 *frames[5:], frames[0][:50], ID3V1_TAG)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='title'))
+    tags.save(path)
+    before = integrity.scan_file(path)
+    assert set(kinds(before)) == {'sync_lost', 'truncated_tail', 'frame_count_mismatch'}
+
+    after = integrity.repair_file(path, before)
+    assert after.ok and after.issues == [] and after.frames == 12
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+        f.seek(info.data_start)
+        assert f.read(12 * 384) == b''.join(frames)
+        assert info.frame_count == 12
+        f.seek(-128, 2)
+        assert f.read(3) == b'TAG'      # the ID3v1 tag (which mutagen updated) is still last
+    tags = ID3(path)
+    assert str(tags['TIT2']) == 'title' and str(tags['TLEN']) == str(12 * 24)
+
+
+def test_repair_without_audio_raises(tmp_path):
+    path = write(tmp_path / 'a.mp3', bytes(2000))
+    with pytest.raises(mp3_frames.MP3FrameError):
+        integrity.repair_file(path)
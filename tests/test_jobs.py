@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from jobs import Job, JobCancelled, JobScheduler
+
+
+@pytest.fixture
+def scheduler():
+    jobs = JobScheduler(max_workers=2, name='test-job')
+    yield jobs
+    jobs.shutdown()
+
+
+def wait_finished(scheduler, count, timeout=5.0):
+    """Collect pop_finished() results until count jobs have come back."""
+    finished = []
+    deadline = time.monotonic() + timeout
+    while len(finished) < count:
+        assert time.monotonic() < deadline, 'jobs did not finish'
+        finished += scheduler.pop_finished()
+        time.sleep(0.005)
+    return finished
+
+
+# --- Job ---
+
+def test_report_clamps_progress():
+    job = Job(1, 'x')
+    job.report(0.5)
+    assert job.progress == 0.5
+    job.report(1.5)
+    assert job.progress == 1.0
+    job.report(-1)
+    assert job.progress == 0.0
+
+
+def test_report_raises_once_cancelled():
+    job = Job(1, 'x')
+    job.report(0.25)
+    job.cancel()
+    assert job.cancelled
+    with pytest.raises(JobCancelled):
+        job.report(0.5)
+    assert job.progress == 0.25
+
+
+# --- Scheduler ---
+
+def test_done_and_failed_jobs(scheduler):
+    def fail(progress):
+        raise ValueError('boom')
+
+    ok = scheduler.submit('ok', lambda a, b, progress: a + b, 2, b=3)
+    bad = scheduler.submit('bad', fail)
+    finished = wait_finished(scheduler, 2)
+    assert {job.id for job in finished} == {ok.id, bad.id}
+    assert (ok.state, ok.result, ok.progress) == ('done', 5, 1.0)
+    assert bad.state == 'failed'
+    assert isinstance(bad.error, ValueError)
+    assert scheduler.active() == []
+    assert scheduler.pop_finished() == []
+
+
+def test_pop_finished_in_completion_order(scheduler):
+    gates = [threading.Event() for _ in range(3)]
+
+    def wait(i, progress):
+        assert gates[i].wait(5)
+        return i
+
+    jobs = [scheduler.submit(f'job{i}', wait, i) for i in range(2)]
+    gates[1].set()
+    first = wait_finished(scheduler, 1)
+    third = scheduler.submit('job2', wait, 2)
+    gates[2].set()
+    second = wait_finished(scheduler, 1)
+    gates[0].set()
+    last = wait_finished(scheduler, 1)
+    assert first + second + last == [jobs[1], third, jobs[0]]
+    assert [job.result for job in first + second + last] == [1, 2, 0]
+
+
+def test_cancel_all_stops_running_jobs(scheduler):
+    started = threading.Barrier(3)
+
+    def spin(progress):
+        started.wait(5)
+        while True:
+            progress(0.5)
+            time.sleep(0.001)
+
+    jobs = [scheduler.submit(f'spin{i}', spin) for i in range(2)]
+    started.wait(5)
+    assert len(scheduler.active()) == 2
+    scheduler.cancel_all()
+    finished = wait_finished(scheduler, 2)
+    assert sorted(job.id for job in finished) == [job.id for job in jobs]
+    assert all(job.state == 'cancelled' and job.result is None for job in jobs)
+    assert scheduler.active() == []
+
+
+def test_job_cancelled_before_it_starts(scheduler):
+    gate = threading.Event()
+    blockers = [scheduler.submit(f'block{i}', lambda progress: gate.wait(5)) for i in range(2)]
+    queued = scheduler.submit('queued', lambda progress: 'ran')
+    assert queued.state == 'queued'
+    queued.cancel()
+    gate.set()
+    finished = wait_finished(scheduler, 3)
+    assert queued in finished
+    assert queued.state == 'cancelled' and queued.result is None
+    assert all(job.state == 'done' for job in blockers)
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from mutagen.id3 import ID3, TIT2, TPE1
+
+import metadata_index
+
+AUDIO = (b'\xff\xfb\x94\x00' + bytes(380)) * 50
+
+
+def make_mp3(path, title, artist='Artist', mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(AUDIO)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text=title))
+    tags.add(TPE1(encoding=3, text=artist))
+    tags.save(str(path))
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = metadata_index.MetadataIndex(str(tmp_path / 'library.sqlite'))
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Record every file the index actually parses."""
+    seen = []
+    read_track = metadata_index.read_track
+
+    def counting(path):
+        seen.append(os.path.basename(path))
+        return read_track(path)
+    monkeypatch.setattr(metadata_index, 'read_track', counting)
+    return seen
+
+
+def test_scan_skips_unchanged_files(tmp_path, index, parses):
+    root = tmp_path / 'lib'
+    make_mp3(root / 'a.mp3', 'A')
+    make_mp3(root / 'sub' / 'b.mp3', 'B')
+    assert index.scan(str(root)) == metadata_index.ScanSummary(2, 0, 0, 0, 0)
+    assert sorted(parses) == ['a.mp3', 'b.mp3']
+    parses.clear()
+    assert index.scan(str(root)) == metadata_index.ScanSummary(0, 0, 2, 0, 0)
+    assert parses == []
+    assert [t.title for t in index.query(artist='artist')] == ['A', 'B']
+
+
+def test_scan_rereads_changed_and_drops_deleted_files(tmp_path, index, parses):
+    root = tmp_path / 'lib'
+    a = make_mp3(root / 'a.mp3', 'A', mtime=10**18)
+    b = make_mp3(root / 'b.mp3', 'B')
+    index.scan(str(root))
+    parses.clear()
+    make_mp3(root / 'a.mp3', 'A2', mtime=10**18 + 1)
+    os.remove(b)
+    assert index.scan(str(root)) == metadata_index.ScanSummary(0, 1, 0, 0, 1)
+    assert parses == ['a.mp3']
+    assert [(t.path, t.title) for t in index.query()] == [(a, 'A2')]
+
+
+def test_failures_are_remembered_until_the_file_changes(tmp_path, index, parses):
+    root = tmp_path / 'lib'
+    make_mp3(root / 'good.mp3', 'Good')
+    bad = root / 'bad.mp3'
+    bad.write_bytes(b'not an mp3' * 10)
+    assert index.scan(str(root)) == metadata_index.ScanSummary(1, 0, 0, 1, 0)
+    [(path, error)] = index.failures(str(root))
+    assert path == str(bad) and error
+    parses.clear()
+    assert index.scan(str(root)) == metadata_index.ScanSummary(0, 0, 1, 1, 0)
+    assert parses == []
+    make_mp3(bad, 'Fixed', mtime=os.stat(bad).st_mtime_ns + 10**9)
+    assert index.scan(str(root)) == metadata_index.ScanSummary(1, 0, 1, 0, 0)
+    assert index.failures() == [] and {t.title for t in index.query()} == {'Good', 'Fixed'}
+    os.remove(bad)
+    assert index.scan(str(root)).removed == 1
+
+
+def test_failures_are_limited_to_root(tmp_path, index):
+    (tmp_path / 'one').mkdir()
+    (tmp_path / 'one' / 'x.mp3').write_bytes(b'junk')
+    (tmp_path / 'one-two').mkdir()
+    (tmp_path / 'one-two' / 'y.mp3').write_bytes(b'junk')
+    index.scan(str(tmp_path / 'one'))
+    index.scan(str(tmp_path / 'one-two'))
+    assert [os.path.basename(p) for p, _ in index.failures(str(tmp_path / 'one'))] == ['x.mp3']
+    assert len(index.failures()) == 2
+
+
+def test_lookup_reparses_only_changed_files(tmp_path, index, parses):
+    path = make_mp3(tmp_path / 'a.mp3', 'A', mtime=10**18)
+    assert index.lookup(path).title == 'A'
+    assert index.lookup(path).title == 'A'
+    assert parses == ['a.mp3']
+    make_mp3(tmp_path / 'a.mp3', 'B', mtime=10**18 + 1)
+    assert index.lookup(path).title == 'B' and parses == ['a.mp3', 'a.mp3']
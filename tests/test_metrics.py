@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setattr(metrics, '_config', {'path': None, 'profile_dir': None, 'trace_memory': False})
+    yield metrics._config
+    import tracemalloc
+    tracemalloc.stop()
+
+
+def test_disabled_hooks_are_no_ops(config):
+    assert not metrics.enabled()
+    with metrics.operation('cut') as op, metrics.stage('copy'):
+        metrics.count('bytes_read', 10)
+    assert op is metrics._NULL
+
+
+def test_operation_event(config, tmp_path):
+    out = tmp_path / 'metrics.jsonl'
+    metrics.configure(str(out))
+    with metrics.operation('cut', path='a.mp3'):
+        with metrics.stage('copy'):
+            metrics.count('bytes_read', 10)
+        with metrics.operation('tags'):
+            metrics.count('bytes_read', 5)
+    event = json.loads(out.read_text())
+    assert (event['name'], event['ok'], event['path'], event['bytes_read']) == ('cut', True, 'a.mp3', 15)
+    assert set(event['stages']) == {'copy', 'tags'}
+    assert 'peak_rss' not in event and 'process_peak_rss' in event
+
+
+def test_trace_memory_alone_reports_to_stderr(config, capsys):
+    metrics.configure(trace_memory=True)
+    with metrics.operation('merge'):
+        bytearray(100000)
+    event = json.loads(capsys.readouterr().err)
+    assert event['name'] == 'merge' and event['peak_traced'] >= 100000
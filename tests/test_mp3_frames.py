@@ -0,0 +1,321 @@
+import io
+import os
+import struct
+
+import pytest
+
+import mp3_frames
+
+# MPEG-1 Layer III, 48 kHz, stereo, no CRC: frames have no padding, so byte
+# offsets are exact multiples of the frame size.
+HEADER_128 = b'\xff\xfb\x94\x00'   # 128 kbps, 384 bytes
+HEADER_160 = b'\xff\xfb\xa4\x00'   # 160 kbps, 480 bytes
+ID3_TAG = b'ID3\x03\x00\x00\x00\x00\x00\x16' + b'\x00' * 22
+ID3V1_TAG = b'TAG' + b'v1 title'.ljust(125, b'\x00')
+
+
+def make_frame(i, header=HEADER_128):
+    """A frame with empty side info (main_data_begin 0) and a body unique to i, free of 0xFF."""
+    size = mp3_frames.parse_header(header).size
+    side = mp3_frames.side_info_size(mp3_frames.parse_header(header))
+    body = bytes((i * 7 + k) % 200 + 1 for k in range(size - 4 - side))
+    return header + bytes(side) + body
+
+
+def make_frames(n, vbr=False):
+    return [make_frame(i, HEADER_160 if vbr and i % 3 == 1 else HEADER_128) for i in range(n)]
+
+
+def xing_for(frames, vbr=True):
+    """The Xing frame a VBR encoder would put in front of frames (files without one are taken as CBR)."""
+    header = mp3_frames.parse_header(HEADER_128)
+    size = len(mp3_frames.build_xing_frame(header, 0, 0))
+    return mp3_frames.build_xing_frame(header, len(frames), size + sum(map(len, frames)), vbr=vbr)
+
+
+def write(path, *parts):
+    path.write_bytes(b''.join(parts))
+    return str(path)
+
+
+def stream_info(path):
+    with open(path, 'rb') as f:
+        return mp3_frames.read_stream_info(f)
+
+
+def audio_frames(path):
+    """The raw bytes of every audio frame after the Xing frame."""
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+        out = []
+        for offset, header in mp3_frames.iter_frames(f, info.data_start, info.audio_end, info.first):
+            f.seek(offset)
+            out.append(f.read(header.size))
+    return out
+
+
+# --- Header Parsing ---
+
+def test_parse_header_fields():
+    header = mp3_frames.parse_header(HEADER_128)
+    assert (header.version_id, header.layer, header.bitrate, header.sample_rate) == (3, 3, 128000, 48000)
+    assert (header.size, header.samples, header.protected, header.padding) == (384, 1152, False, 0)
+
+
+def test_parse_header_padding_and_mpeg2():
+    assert mp3_frames.parse_header(b'\xff\xfb\x92\x00').size == 418        # 128 kbps, 44.1 kHz, padded
+    mpeg2 = mp3_frames.parse_header(b'\xff\xf3\x84\x00')                   # MPEG-2, 64 kbps, 24 kHz
+    assert (mpeg2.samples, mpeg2.sample_rate, mpeg2.size) == (576, 24000, 192)
+
+
+@pytest.mark.parametrize('data', [
+    b'\xff\xfb\x04\x00',   # free format (bitrate index 0) is not supported
+    b'\xff\xfb\xf4\x00',   # bitrate index 15
+    b'\xff\xfb\x9c\x00',   # reserved sample rate
+    b'\xff\xeb\x94\x00',   # reserved MPEG version
+    b'\xff\xf9\x94\x00',   # reserved layer
+    b'\xfe\xfb\x94\x00',   # no sync
+    b'\xff\xfb\x94',       # truncated
+    b'',
+])
+def test_parse_header_rejects(data):
+    assert mp3_frames.parse_header(data) is None
+
+
+def test_free_format_stream_is_not_audio(tmp_path):
+    frame = b'\xff\xfb\x04\x00' + bytes(380)
+    path = write(tmp_path / 'free.mp3', frame * 20)
+    with pytest.raises(mp3_frames.MP3FrameError):
+        stream_info(path)
+
+
+# --- Stream Discovery ---
+
+def test_iter_frames_resyncs_over_garbage():
+    frames = make_frames(6)
+    junk = b'\x00junk\x01' * 5
+    data = frames[0] + frames[1] + junk + frames[2] + frames[3] + b'\xff\x00\xff' + frames[4] + frames[5]
+    expected, pos = [], 0
+    for i, frame in enumerate(frames):
+        if i == 2:
+            pos += len(junk)
+        if i == 4:
+            pos += 3
+        expected.append(pos)
+        pos += len(frame)
+    reference = mp3_frames.parse_header(HEADER_128)
+    assert [o for o, _ in mp3_frames.iter_frames(io.BytesIO(data), 0, len(data), reference)] == expected
+
+
+def test_iter_frames_stops_inside_truncated_frame():
+    frames = make_frames(5)
+    data = b''.join(frames)[:-100]
+    reference = mp3_frames.parse_header(HEADER_128)
+    offsets = [o for o, _ in mp3_frames.iter_frames(io.BytesIO(data), 0, len(data), reference)]
+    assert offsets == [i * 384 for i in range(5)]
+    assert all(o < len(data) for o in offsets)
+
+
+def test_iter_frames_skips_other_formats():
+    frames = make_frames(4)
+    other = b'\xff\xf3\x84\x00' + bytes(188)   # MPEG-2 frame in an MPEG-1 stream
+    data = frames[0] + frames[1] + other + frames[2] + frames[3]
+    reference = mp3_frames.parse_header(HEADER_128)
+    offsets = [o for o, _ in mp3_frames.iter_frames(io.BytesIO(data), 0, len(data), reference)]
+    assert offsets == [0, 384, 768 + len(other), 1152 + len(other)]
+
+
+def test_read_stream_info_tags_and_garbage(tmp_path):
+    frames = make_frames(20)
+    path = write(tmp_path / 'a.mp3', ID3_TAG, b'\x00' * 10, *frames, ID3V1_TAG)
+    info = stream_info(path)
+    assert info.tag_end == len(ID3_TAG) + 10
+    assert info.data_start == info.tag_end
+    assert info.audio_end == info.file_size - 128
+    assert info.xing_tag is None
+    assert mp3_frames.frame_count(info) == 20
+
+
+def test_read_stream_info_random_data(tmp_path):
+    path = write(tmp_path / 'noise.mp3', bytes(range(0, 254)) * 40)
+    with pytest.raises(mp3_frames.MP3FrameError):
+        stream_info(path)
+
+
+# --- Xing / LAME Header ---
+
+def test_crc16_check_value():
+    assert mp3_frames._crc16(b'123456789') == 0xBB3D
+
+
+@pytest.mark.parametrize('vbr', [True, False])
+def test_xing_round_trip(vbr):
+    header = mp3_frames.parse_header(HEADER_128)
+    toc = [min(255, i * 3) for i in range(100)]
+    frame = mp3_frames.build_xing_frame(header, 1234, 567890, toc, vbr=vbr, gapless=(576, 1105))
+    parsed = mp3_frames.parse_header(frame)
+    assert parsed is not None and mp3_frames.same_format(parsed, header) and len(frame) == parsed.size
+    xing = mp3_frames.read_xing(frame, parsed)
+    assert xing == {'tag': b'Xing' if vbr else b'Info', 'frames': 1234, 'bytes': 567890, 'toc': toc,
+                    'delay': 576, 'padding': 1105}
+    # The LAME tag CRC covers everything before it.
+    crc_pos = frame.index(mp3_frames.LAME_VERSION) + mp3_frames.LAME_TAG_SIZE - 2
+    assert struct.unpack('>H', frame[crc_pos:crc_pos + 2])[0] == mp3_frames._crc16(frame[:crc_pos])
+
+
+def test_xing_without_gapless_or_toc():
+    header = mp3_frames.parse_header(HEADER_128)
+    frame = mp3_frames.build_xing_frame(header, 10, 4000)
+    xing = mp3_frames.read_xing(frame, mp3_frames.parse_header(frame))
+    assert (xing['frames'], xing['bytes'], xing['toc'], xing['delay'], xing['padding']) == (10, 4000, None, 0, 0)
+
+
+def test_truncated_xing_raises():
+    header = mp3_frames.parse_header(HEADER_128)
+    frame = mp3_frames.build_xing_frame(header, 10, 4000, [0] * 100)
+    with pytest.raises(mp3_frames.MP3FrameError):
+        mp3_frames.read_xing(frame[:60], header)
+
+
+# --- Seeking ---
+
+def skewed_vbr(tmp_path, n=600):
+    """A VBR file whose second half has the larger frames, with a TOC that tracks it."""
+    frames = [make_frame(i, HEADER_128 if i < n // 2 else HEADER_160) for i in range(n)]
+    header = mp3_frames.parse_header(HEADER_128)
+    size = len(mp3_frames.build_xing_frame(header, 0, 0, [0] * 100))
+    toc, pos = mp3_frames.TocBuilder(), size
+    for frame in frames:
+        toc.add(pos)
+        pos += len(frame)
+    xing = mp3_frames.build_xing_frame(header, n, pos, toc.toc(0, pos))
+    return write(tmp_path / 'vbr.mp3', ID3_TAG, xing, *frames), frames
+
+
+def test_vbr_cut_seeks_through_toc(tmp_path, cache_root):
+    src, frames = skewed_vbr(tmp_path)
+    info = stream_info(src)
+    dst = str(tmp_path / 'cut.mp3')
+    start, end = mp3_frames.cut_frames(src, dst, mp3_frames.frame_to_ms(info, 400), mp3_frames.frame_to_ms(info, 450))
+    assert end - start == mp3_frames.frame_to_ms(info, 50)
+    assert not (cache_root / 'seek').exists() or not list((cache_root / 'seek').iterdir())
+    cut = audio_frames(dst)
+    first = frames.index(cut[0])
+    assert abs(first - 400) <= 3 and cut == frames[first:first + 50]
+    assert stream_info(dst).frame_count == 50
+
+
+def test_vbr_cut_uses_cached_index(tmp_path):
+    src, frames = skewed_vbr(tmp_path)
+    info = stream_info(src)
+    mp3_frames.load_frame_index(src)
+    dst = str(tmp_path / 'cut.mp3')
+    mp3_frames.cut_frames(src, dst, mp3_frames.frame_to_ms(info, 400), mp3_frames.frame_to_ms(info, 450))
+    assert audio_frames(dst) == frames[400:450]
+
+
+def test_frame_index_matches_frames(tmp_path):
+    src, frames = skewed_vbr(tmp_path, 100)
+    index = mp3_frames.load_frame_index(src)
+    assert len(index) == 100 and index.offset(100) == index.end
+    assert index.offset(60) - index.offset(50) == 10 * 480
+    assert index.time_ms(50) == mp3_frames.frame_to_ms(stream_info(src), 50)
+
+
+def test_average_bitrate_of_vbr_stream(tmp_path):
+    src, frames = skewed_vbr(tmp_path, 100)
+    info = stream_info(src)
+    assert info.first.bitrate == 128000
+    assert mp3_frames.average_bitrate(info) == 144000   # half 128 kbps, half 160 kbps frames
+    cbr = stream_info(write(tmp_path / 'cbr.mp3', *make_frames(10)))
+    assert mp3_frames.average_bitrate(cbr) == 128000
+
+
+def test_prune_indexes_drops_least_recently_used(tmp_path):
+    for age, name in enumerate(['old', 'mid', 'new']):
+        path = tmp_path / f'{name}.idx'
+        path.write_bytes(bytes(100))
+        os.utime(path, ns=(age * 10**9, age * 10**9))
+    mp3_frames._prune_indexes(str(tmp_path), keep=str(tmp_path / 'new.idx'), budget=250)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['mid.idx', 'new.idx']
+
+
+# --- Cut / Merge / Split ---
+
+@pytest.mark.parametrize('vbr', [False, True])
+def test_cut_frames_is_byte_exact(tmp_path, vbr):
+    frames = make_frames(120, vbr)
+    src = write(tmp_path / 'src.mp3', ID3_TAG, xing_for(frames) if vbr else b'', *frames, ID3V1_TAG)
+    dst = str(tmp_path / 'cut.mp3')
+    info = stream_info(src)
+    start, end = mp3_frames.cut_frames(src, dst, mp3_frames.frame_to_ms(info, 10), mp3_frames.frame_to_ms(info, 75))
+    assert (start, end) == (mp3_frames.frame_to_ms(info, 10), mp3_frames.frame_to_ms(info, 75))
+    data = open(dst, 'rb').read()
+    assert data.startswith(ID3_TAG) and data.endswith(ID3V1_TAG)
+    assert audio_frames(dst) == frames[10:75]
+    out = stream_info(dst)
+    assert out.frame_count == 65
+    assert out.byte_count == out.audio_end - out.tag_end
+    assert (out.xing_tag == b'Xing') == vbr
+
+
+def test_cut_frames_empty_range(tmp_path):
+    src = write(tmp_path / 'src.mp3', *make_frames(10))
+    with pytest.raises(mp3_frames.MP3FrameError):
+        mp3_frames.cut_frames(src, str(tmp_path / 'cut.mp3'), 100, 100)
+
+
+def test_merge_frames_is_byte_exact(tmp_path):
+    a, b = make_frames(30), make_frames(45, vbr=True)
+    first = write(tmp_path / 'a.mp3', ID3_TAG, *a)
+    second = write(tmp_path / 'b.mp3', b'\x00' * 7, xing_for(b), *b)
+    dst = str(tmp_path / 'merged.mp3')
+    assert mp3_frames.merge_frames([first, second], dst) == 75
+    assert open(dst, 'rb').read().startswith(ID3_TAG)
+    assert audio_frames(dst) == a + b
+    out = stream_info(dst)
+    assert (out.frame_count, out.xing_tag) == (75, b'Xing')
+
+
+def test_merge_frames_keeps_first_trailing_tag(tmp_path):
+    a, b = make_frames(10), make_frames(10)
+    first = write(tmp_path / 'a.mp3', ID3_TAG, *a, ID3V1_TAG)
+    second = write(tmp_path / 'b.mp3', *b, b'TAG' + bytes(125))
+    dst = str(tmp_path / 'merged.mp3')
+    mp3_frames.merge_frames([first, second], dst)
+    data = open(dst, 'rb').read()
+    assert data.endswith(ID3V1_TAG) and data.count(b'TAG') == 1
+    assert audio_frames(dst) == a + b
+    assert stream_info(dst).byte_count == stream_info(dst).audio_end - stream_info(dst).tag_end
+
+
+def test_merge_frames_rejects_other_formats(tmp_path):
+    first = write(tmp_path / 'a.mp3', *make_frames(5))
+    second = write(tmp_path / 'b.mp3', (b'\xff\xf3\x84\x00' + bytes(188)) * 5)
+    assert not mp3_frames.can_merge_losslessly([first, second])
+    with pytest.raises(mp3_frames.MP3FrameError):
+        mp3_frames.merge_frames([first, second], str(tmp_path / 'merged.mp3'))
+
+
+@pytest.mark.parametrize('vbr', [False, True])
+def test_split_frames_is_byte_exact(tmp_path, vbr):
+    frames = make_frames(100, vbr)
+    src = write(tmp_path / 'src.mp3', ID3_TAG, xing_for(frames) if vbr else b'', *frames)
+    info = stream_info(src)
+    ms = lambda i: mp3_frames.frame_to_ms(info, i)
+    ranges = [(60, 90), (0, 20), (20, 45)]   # out of order, with a gap
+    segments = [(ms(a), ms(b), str(tmp_path / f'{a}.mp3'), b'TAGBYTES' if a == 0 else b'') for a, b in ranges]
+    result = mp3_frames.split_frames(src, segments)
+    assert result == [(ms(a), ms(b)) for a, b in ranges]
+    for (a, b), (_, _, path, tag) in zip(ranges, segments):
+        assert open(path, 'rb').read().startswith(tag)
+        assert audio_frames(path) == frames[a:b]
+        assert stream_info(path).frame_count == b - a
+
+
+def test_split_frames_removes_outputs_on_error(tmp_path):
+    src = write(tmp_path / 'src.mp3', *make_frames(20))
+    good, bad = str(tmp_path / 'good.mp3'), str(tmp_path / 'bad.mp3')
+    with pytest.raises(mp3_frames.MP3FrameError):
+        mp3_frames.split_frames(src, [(0, 100, good, b''), (300, 300, bad, b'')])
+    assert not (tmp_path / 'good.mp3').exists() and not (tmp_path / 'bad.mp3').exists()
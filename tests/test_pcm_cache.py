@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import pcm_cache
+
+MP3_FRAME = b'\xff\xfb\x94\x00' + bytes(380)   # 48 kHz stereo, 1152 samples per frame
+FRAMES = 10
+PCM_BYTES = FRAMES * 1152 * 2 * 2
+
+
+class FakeDecoder:
+    """Stands in for FFmpeg: yields a known ramp of s16le samples and counts its runs."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.closed = 0
+
+    def __call__(self, path, sample_rate=None, channels=None, chunk_size=4096):
+        self.calls += 1
+        data = pcm_for(path)
+        try:
+            for i in range(0, len(data), chunk_size):
+                time.sleep(self.delay)
+                yield data[i:i + chunk_size]
+        except GeneratorExit:
+            self.closed += 1
+            raise
+
+
+def pcm_for(path):
+    seed = sum(map(ord, str(path)))
+    return ((np.arange(PCM_BYTES // 2) + seed) % 20000).astype('<i2').tobytes()
+
+
+@pytest.fixture
+def mp3(tmp_path):
+    def make(name):
+        path = tmp_path / name
+        path.write_bytes(MP3_FRAME * FRAMES)
+        return str(path)
+    return make
+
+
+def make_cache(tmp_path, decoder, budget=pcm_cache.DEFAULT_BUDGET):
+    directory = tmp_path / 'spill'
+    directory.mkdir(exist_ok=True)
+    return pcm_cache.PCMCache(budget, str(directory), decoder=decoder)
+
+
+def test_stream_spills_then_serves_from_cache(tmp_path, mp3):
+    decoder = FakeDecoder()
+    cache = make_cache(tmp_path, decoder)
+    path = mp3('a.mp3')
+    assert b''.join(cache.stream(path)) == pcm_for(path)
+    assert b''.join(bytes(c) for c in cache.stream(path)) == pcm_for(path)
+    assert decoder.calls == 1
+    audio = cache.get(path)
+    assert audio.samples.shape == (FRAMES * 1152, 2) and audio.sample_rate == 48000
+    stats = cache.stats()
+    assert (stats['misses'], stats['hits'], stats['entries']) == (1, 2, 1)
+    assert stats['hit_rate'] == pytest.approx(2 / 3)
+    assert stats['bytes'] == PCM_BYTES + pcm_cache._HEADER.size
+
+
+def test_closing_stream_discards_partial_spill(tmp_path, mp3):
+    decoder = FakeDecoder()
+    cache = make_cache(tmp_path, decoder)
+    chunks = cache.stream(mp3('a.mp3'), chunk_size=1024)
+    next(chunks)
+    chunks.close()
+    assert decoder.closed == 1
+    assert list((tmp_path / 'spill').iterdir()) == []
+    assert cache.stats()['entries'] == 0 and not cache.decoding
+
+
+def test_get_reports_progress(tmp_path, mp3):
+    cache = make_cache(tmp_path, FakeDecoder())
+    seen = []
+    cache.get(mp3('a.mp3'), progress=seen.append)
+    assert seen and seen == sorted(seen) and seen[-1] == pytest.approx(1.0)
+
+
+def test_evicts_least_recently_used_by_size(tmp_path, mp3):
+    entry = PCM_BYTES + pcm_cache._HEADER.size
+    cache = make_cache(tmp_path, FakeDecoder(), budget=2 * entry)
+    a, b, c = mp3('a.mp3'), mp3('b.mp3'), mp3('c.mp3')
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)          # b is now the least recently used
+    cache.get(c)
+    assert cache.peek(a) is not None and cache.peek(c) is not None
+    assert cache.peek(b) is None
+    stats = cache.stats()
+    assert (stats['evictions'], stats['entries'], stats['bytes']) == (1, 2, 2 * entry)
+
+
+def test_concurrent_callers_share_one_decode(tmp_path, mp3):
+    decoder = FakeDecoder(delay=0.002)
+    cache = make_cache(tmp_path, decoder)
+    path = mp3('a.mp3')
+    start = threading.Barrier(8)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.get(path).samples[:4].tolist())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert decoder.calls == 1 and len(results) == 8
+    assert all(r == results[0] for r in results)
+    assert not cache.decoding
+    assert (cache.stats()['misses'], cache.stats()['hits']) == (1, 7)
+
+
+def test_enable_reads_budget_from_environment(monkeypatch):
+    monkeypatch.setattr(pcm_cache, '_shared', None)
+    monkeypatch.setenv('MP3_EDITOR_PCM_CACHE_MB', '3')
+    assert pcm_cache.enable().budget == 3 * 1024 * 1024
+    assert pcm_cache.enable(5).budget == 5
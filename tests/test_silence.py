@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+import silence
+
+LOUD, QUIET = -20.0, -80.0
+BLOCK = silence.BLOCK_MS
+
+
+def levels_of(*runs):
+    """Block levels from (level, blocks) runs."""
+    return np.concatenate([np.full(count, level) for level, count in runs])
+
+
+@pytest.fixture
+def fake_levels(monkeypatch):
+    """Serve synthetic block levels instead of decoding audio, in small uneven chunks."""
+    calls = []
+
+    def install(levels, chunk=7):
+        def block_levels(path, block_ms=BLOCK, start_ms=0, duration_ms=None, progress=None):
+            calls.append((start_ms, duration_ms))
+            first = start_ms // block_ms
+            last = len(levels) if duration_ms is None else first + math.ceil(duration_ms / block_ms)
+            data = levels[first:last]
+            for i in range(0, len(data), chunk):
+                yield data[i:i + chunk]
+        monkeypatch.setattr(silence, 'block_levels', block_levels)
+        monkeypatch.setattr(silence, 'duration_ms', lambda path: len(levels) * BLOCK)
+        return calls
+    return install
+
+
+# --- Silent Intervals ---
+
+def test_find_silence_keeps_only_long_quiet_runs(fake_levels):
+    fake_levels(levels_of((LOUD, 50), (QUIET, 80), (LOUD, 30), (QUIET, 20), (LOUD, 40), (QUIET, 100)))
+    assert silence.find_silence('x', min_silence_ms=700) == [(500, 1300), (2200, 3200)]
+    assert silence.find_silence('x', min_silence_ms=200) == [(500, 1300), (1600, 1800), (2200, 3200)]
+
+
+def test_find_silence_from_an_offset(fake_levels):
+    calls = fake_levels(levels_of((QUIET, 90), (LOUD, 10), (QUIET, 100)))
+    assert silence.find_silence('x', min_silence_ms=500, start_ms=300, end_ms=1500) == [(300, 900), (1000, 1500)]
+    assert calls == [(300, 1200)]
+
+
+def test_find_silence_threshold_is_exclusive(fake_levels):
+    fake_levels(levels_of((LOUD, 10), (-50.0, 100), (LOUD, 10)))
+    assert silence.find_silence('x', threshold_db=-50.0, min_silence_ms=100) == []
+    assert silence.find_silence('x', threshold_db=-49.9, min_silence_ms=100) == [(100, 1100)]
+
+
+def test_to_db_floors_digital_silence():
+    blocks = np.array([[0.0, 0.0], [0.5, -0.5]], dtype=np.float32)
+    assert silence._to_db(blocks).tolist() == pytest.approx([silence.SILENCE_FLOOR_DB, 20 * math.log10(0.5)])
+
+
+# --- Auto-Trim ---
+
+def test_suggest_trim_short_range(fake_levels):
+    fake_levels(levels_of((QUIET, 30), (LOUD, 50), (QUIET, 20)))
+    assert silence.suggest_trim('x') == (300 - 50, 800 + 50)
+    assert silence.suggest_trim('x', pad_ms=0) == (300, 800)
+    assert silence.suggest_trim('x', 0, 500, pad_ms=0) == (300, 500)
+
+
+def test_suggest_trim_reads_only_the_windows(fake_levels):
+    calls = fake_levels(levels_of((QUIET, 20), (LOUD, 1000), (QUIET, 40)))
+    assert silence.suggest_trim('x', pad_ms=0, window_ms=1000) == (200, 10200)
+    assert calls == [(0, 1000), (9600, 1000)]
+
+
+def test_suggest_trim_scans_everything_when_a_window_is_silent(fake_levels):
+    calls = fake_levels(levels_of((QUIET, 300), (LOUD, 500), (QUIET, 30)))
+    assert silence.suggest_trim('x', pad_ms=0, window_ms=1000) == (3000, 8000)
+    assert calls[-1] == (0, 8300)
+
+
+def test_suggest_trim_all_quiet_is_unchanged(fake_levels):
+    fake_levels(levels_of((QUIET, 100)))
+    assert silence.suggest_trim('x', 100, 900) == (100, 900)
+
+
+# --- Splitting At Silence ---
+
+def test_sound_ranges(fake_levels):
+    fake_levels(levels_of((LOUD, 100), (QUIET, 80), (LOUD, 5), (QUIET, 80), (LOUD, 200), (QUIET, 100)))
+    assert silence.sound_ranges('x', min_silence_ms=700) == [(0, 1050), (1750, 1900), (2600, 4700)]
+    assert silence.sound_ranges('x', min_silence_ms=700, min_sound_ms=100) == [(0, 1050), (2600, 4700)]
@@ -0,0 +1,93 @@
+import pytest
+
+import splitter
+from splitter import Segment
+
+CUE = '''\ufeffPERFORMER "Album Artist"
+TITLE "Live"
+FILE "live.mp3" MP3
+  TRACK 01 AUDIO
+    TITLE "Intro"
+    INDEX 00 00:00:00
+    INDEX 01 00:00:00
+  TRACK 02 AUDIO
+    TITLE "Song"
+    PERFORMER "Guest"
+    INDEX 00 03:10:00
+    INDEX 01 03:12:37
+  TRACK 03 AUDIO
+    INDEX 01 61:05:74
+'''
+
+
+def write_cue(tmp_path, text=CUE, encoding='utf-8'):
+    path = tmp_path / 'live.cue'
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+# --- Ranges ---
+
+@pytest.mark.parametrize('text, ms', [('200', 200000), ('3:20', 200000), ('1:02:03.5', 3723500), (' 0:00.25 ', 250)])
+def test_parse_clock(text, ms):
+    assert splitter._parse_clock(text) == ms
+
+
+def test_parse_ranges_closes_open_ends_with_the_next_start():
+    assert splitter.parse_ranges('0:00-3:20, 3:30, 5:00-7:05') == [
+        Segment(0, 200000, 'Track 1', ''),
+        Segment(210000, 300000, 'Track 2', ''),
+        Segment(300000, 425000, 'Track 3', ''),
+    ]
+
+
+def test_parse_ranges_keeps_overlapping_and_reordered_ranges():
+    # split_frames can write overlapping and out-of-order ranges, so they are kept as given.
+    assert [(s.start_ms, s.end_ms) for s in splitter.parse_ranges('1:00-3:00, 2:00-4:00, 0:00-0:30')] == [
+        (60000, 180000), (120000, 240000), (0, 30000)]
+
+
+@pytest.mark.parametrize('text', [
+    '0:00-1:00, 2:00-',       # the last open range has nothing to end it
+    '3:00-, 1:00-2:00',       # an open range followed by an earlier start
+    '2:00-1:00',              # end before start
+    '1:00-x',
+])
+def test_parse_ranges_rejects(text):
+    with pytest.raises(ValueError):
+        splitter.parse_ranges(text)
+
+
+def test_ranges_every_ends_with_a_short_part():
+    assert splitter.ranges_every(150000, 1) == [
+        Segment(0, 60000, 'Part 1', ''), Segment(60000, 120000, 'Part 2', ''), Segment(120000, 150000, 'Part 3', '')]
+    with pytest.raises(ValueError):
+        splitter.ranges_every(150000, 0)
+
+
+# --- CUE Sheets ---
+
+def test_parse_cue(tmp_path):
+    segments = splitter.parse_cue(write_cue(tmp_path), duration_ms=4000000)
+    assert segments == [
+        Segment(0, 192493, 'Intro', 'Album Artist'),                 # INDEX 01 03:12:37 is 192 s + 37/75 s
+        Segment(192493, 3665986, 'Song', 'Guest'),
+        Segment(3665986, 4000000, 'Track 3', 'Album Artist'),      # 61:05:74 -> 3665 s + 74/75 s
+    ]
+
+
+def test_parse_cue_open_ended_last_track_needs_duration(tmp_path):
+    with pytest.raises(ValueError):
+        splitter.parse_cue(write_cue(tmp_path))
+
+
+def test_parse_cue_cp949_and_empty(tmp_path):
+    text = 'TRACK 01 AUDIO\nTITLE "첫 곡"\nINDEX 01 00:01:00\n'
+    assert splitter.parse_cue(write_cue(tmp_path, text, 'cp949'), 5000)[0].title == '첫 곡'
+    with pytest.raises(ValueError):
+        splitter.parse_cue(write_cue(tmp_path, 'REM nothing here\n'), 5000)
+
+
+def test_safe_filename():
+    assert splitter.safe_filename('a/b:c?') == 'a_b_c_'
+    assert splitter.safe_filename(' .. ') == 'track'
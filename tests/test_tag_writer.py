@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from mutagen.id3 import APIC, ID3, TIT2
+
+import tag_writer
+
+AUDIO = (b'\xff\xfb\x94\x00' + bytes(380)) * 50
+
+
+def make_file(tmp_path, padding=None, title='old'):
+    path = str(tmp_path / 'a.mp3')
+    with open(path, 'wb') as f:
+        f.write(AUDIO)
+    if padding is not None:
+        tags = ID3()
+        tags.add(TIT2(encoding=3, text=title))
+        tags.save(path, padding=lambda info: padding)
+    return path
+
+
+def audio_of(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return data[ID3(path).size:] if data.startswith(b'ID3') else data
+
+
+def test_small_edit_is_saved_in_place(tmp_path):
+    path = make_file(tmp_path, padding=4096)
+    size, inode = os.path.getsize(path), os.stat(path).st_ino
+    tags = ID3(path)
+    tags.setall('TIT2', [TIT2(encoding=3, text='a somewhat longer new title')])
+    assert tag_writer.save_tags(tags, path) is True
+    assert os.path.getsize(path) == size and os.stat(path).st_ino == inode
+    assert str(ID3(path)['TIT2']) == 'a somewhat longer new title'
+    assert audio_of(path) == AUDIO
+
+
+def test_outgrown_tag_is_rewritten_with_default_padding(tmp_path):
+    path = make_file(tmp_path, padding=0)
+    tags = ID3(path)
+    tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=b'\xff\xd8' + bytes(20000)))
+    assert tag_writer.save_tags(tags, path) is False
+    saved = ID3(path)
+    assert saved.size >= 20000 + tag_writer.DEFAULT_PADDING
+    assert audio_of(path) == AUDIO
+    assert [name for name in os.listdir(tmp_path) if name.startswith('.tagtmp-')] == []
+    # The reserved padding takes the next edit in place.
+    saved.setall('TIT2', [TIT2(encoding=3, text='new')])
+    assert tag_writer.save_tags(saved, path) is True
+
+
+def test_file_without_tag_is_rewritten(tmp_path):
+    path = make_file(tmp_path)
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='first'))
+    assert tag_writer.save_tags(tags, path, padding=1000) is False
+    assert str(ID3(path)['TIT2']) == 'first' and audio_of(path) == AUDIO
+
+
+def test_failed_rewrite_leaves_original(tmp_path, monkeypatch):
+    path = make_file(tmp_path, padding=0)
+    with open(path, 'rb') as f:
+        before = f.read()
+    tags = ID3(path)
+    tags.add(APIC(encoding=3, mime='image/jpeg', type=3, desc='Cover', data=bytes(5000)))
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(tags, 'save', fail)
+    with pytest.raises(OSError):
+        tag_writer.rewrite_atomically(tags, path)
+    with open(path, 'rb') as f:
+        assert f.read() == before
+    assert sorted(os.listdir(tmp_path)) == ['a.mp3']
+
+
+def test_render_tag():
+    assert tag_writer.render_tag(ID3()) == b''
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text='x'))
+    data = tag_writer.render_tag(tags, padding=100)
+    assert data.startswith(b'ID3') and data.endswith(bytes(100))
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+import mp3_frames
+import pcm_cache
+import storage
+
+BASE_BLOCK = 256     # samples per min/max pair at level 0
+LEVEL_FACTOR = 4     # each level summarizes LEVEL_FACTOR pairs of the one below
+MIN_LEVEL_PEAKS = 512
+
+
+class Peaks:
+    """Memory-mapped multi-resolution min/max peak data for one audio file."""
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.sample_rate = meta['sample_rate']
+        self.total_samples = meta['total_samples']
+        self.levels = [np.load(os.path.join(directory, f"level{i}.npy"), mmap_mode='r')
+                       for i in range(meta['levels'])]
+
+    @property
+    def duration_ms(self):
+        return self.total_samples * 1000.0 / self.sample_rate
+
+    def samples_per_peak(self, level):
+        return BASE_BLOCK * LEVEL_FACTOR ** level
+
+    def columns(self, start_ms, end_ms, width):
+        """Return (mins, maxs) as floats in [-1, 1] for `width` pixel columns of [start_ms, end_ms)."""
+        samples_per_pixel = max((end_ms - start_ms) * self.sample_rate / 1000.0 / max(width, 1), 1)
+        level = 0
+        while level + 1 < len(self.levels) and self.samples_per_peak(level + 1) <= samples_per_pixel:
+            level += 1
+        data = self.levels[level]
+        spp = self.samples_per_peak(level)
+        edges = np.linspace(start_ms, end_ms, width + 1) * self.sample_rate / 1000.0 / spp
+        edges = np.clip(edges.astype(np.int64), 0, len(data))
+        mins = np.zeros(width, dtype=np.float32)
+        maxs = np.zeros(width, dtype=np.float32)
+        # A column narrower than one peak samples the peak containing it, so a
+        # view zoomed in past level 0 is drawn with wide steps rather than gaps.
+        valid = edges[:-1] < len(data)
+        if valid.any():
+            starts = edges[:-1][valid]
+            window = data[starts[0]:max(edges[-1], starts[-1] + 1)]
+            mins[valid] = np.minimum.reduceat(window[:, 0], starts - starts[0]) / 32768.0
+            maxs[valid] = np.maximum.reduceat(window[:, 1], starts - starts[0]) / 32768.0
+        return mins, maxs
+
+
+def peaks_dir(path):
+    """Cache directory for a file's peaks; changes whenever the file does."""
+    key = hashlib.sha1(repr(storage.file_key(path)).encode('utf-8')).hexdigest()
+    return os.path.join(storage.cache_dir('peaks'), key)
+
+
+def _reduce(level):
+    usable = len(level) - len(level) % LEVEL_FACTOR
+    if usable == 0:
+        return level[:0]
+    groups = level[:usable].reshape(-1, LEVEL_FACTOR, 2)
+    reduced = np.empty((len(groups), 2), dtype=np.int16)
+    reduced[:, 0] = groups[:, :, 0].min(axis=1)
+    reduced[:, 1] = groups[:, :, 1].max(axis=1)
+    return reduced
+
+
+def build_peaks(path, progress=None):
+    """Decode path once (mono, native rate) and write its peak levels to the cache."""
+    with open(path, 'rb') as f:
+        info = mp3_frames.read_stream_info(f)
+    sample_rate = info.first.sample_rate
+    expected = max(mp3_frames.frame_count(info) * info.first.samples, 1)
+    blocks = []
+    carry = np.zeros(0, dtype=np.int16)
+    total = 0
+    for chunk in pcm_cache.decode_pcm(path, sample_rate=sample_rate, channels=1):
+        samples = np.concatenate([carry, np.frombuffer(chunk, dtype='<i2')])
+        total += len(samples) - len(carry)
+        usable = len(samples) - len(samples) % BASE_BLOCK
+        if usable:
+            view = samples[:usable].reshape(-1, BASE_BLOCK)
+            blocks.append(np.stack([view.min(axis=1), view.max(axis=1)], axis=1))
+        carry = samples[usable:]
+        if progress:
+            progress(min(total / expected, 1.0))
+    if len(carry):
+        blocks.append(np.array([[carry.min(), carry.max()]], dtype=np.int16))
+    level = np.concatenate(blocks) if blocks else np.zeros((0, 2), dtype=np.int16)
+
+    target = peaks_dir(path)
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    count = 0
+    while True:
+        np.save(os.path.join(tmp, f"level{count}.npy"), level)
+        count += 1
+        if len(level) < MIN_LEVEL_PEAKS * LEVEL_FACTOR:
+            break
+        level = _reduce(level)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump({'sample_rate': sample_rate, 'total_samples': total, 'levels': count}, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return Peaks(target)
+
+
+def load_peaks(path, progress=None):
+    """Return cached peaks for path, generating them on the first call."""
+    directory = peaks_dir(path)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        return Peaks(directory)
+    return build_peaks(path, progress)